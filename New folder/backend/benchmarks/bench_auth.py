@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Mixed Login/Browse Benchmark for Handicraft Marketplace Platform
+
+Serves create_app() from a run_benchmarks.py worker, registers a set of
+customers, then drives catalogue browsing (/api/products) alone and together
+with a login storm, once with the password hashing pool capped as configured
+and once with one hashing thread per login client. Reports logins/sec, browse
+requests/sec and browse latency percentiles per run, so the cost of a login
+storm to catalogue traffic can be compared with and without the cap.
+
+Usage (from the backend directory):
+    python benchmarks/bench_auth.py --duration 20 --login-clients 32 --browse-clients 8
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+
+import requests
+
+from run_benchmarks import free_port, percentile
+
+RUN_BENCHMARKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run_benchmarks.py')
+
+
+def start_worker(data_dir, size, env):
+    """Start a run_benchmarks.py worker with extra environment and wait until it serves /health"""
+    port = free_port()
+    worker = subprocess.Popen(
+        [sys.executable, RUN_BENCHMARKS, 'serve', '--size', str(size), '--data-dir', data_dir, '--port', str(port)],
+        env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 600
+    while time.time() < deadline:
+        if worker.poll() is not None:
+            raise RuntimeError(f"Benchmark worker exited with code {worker.returncode}")
+        try:
+            if os.path.exists(os.path.join(data_dir, 'manifest.json')) and \
+                    requests.get(f'{base_url}/health', timeout=5).status_code == 200:
+                return worker, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    worker.terminate()
+    raise RuntimeError('Benchmark worker did not start')
+
+
+def drive(base_url, users, duration, login_clients, browse_clients):
+    """Run login and browse clients side by side for duration seconds"""
+    samples = {'login': [], 'browse': []}
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def client(kind, seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        local = []
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                if kind == 'login':
+                    email, password = rng.choice(users)
+                    status = session.post(f'{base_url}/api/auth/login', json={'email': email.upper(), 'password': password},
+                                          timeout=60).status_code
+                else:
+                    status = session.get(f'{base_url}/api/products?page={rng.randint(1, 20)}', timeout=60).status_code
+            except requests.RequestException:
+                status = 'error'
+            local.append((time.perf_counter() - start, status))
+        session.close()
+        with lock:
+            samples[kind].extend(local)
+
+    threads = [threading.Thread(target=client, args=('login', i)) for i in range(login_clients)]
+    threads += [threading.Thread(target=client, args=('browse', 1000 + i)) for i in range(browse_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = {}
+    for kind, kind_samples in samples.items():
+        if not kind_samples:
+            continue
+        latencies = sorted(s[0] * 1000 for s in kind_samples)
+        statuses = {}
+        for _, status in kind_samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        result[kind] = {
+            'requests': len(kind_samples),
+            'ok_per_sec': statuses.get('200', 0) / duration,
+            'status_counts': statuses,
+            'latency_ms': {'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+                           'p99': percentile(latencies, 99)}
+        }
+    return result
+
+
+def run(name, env, args):
+    with tempfile.TemporaryDirectory(prefix='bench_auth_') as data_dir:
+        worker, base_url = start_worker(data_dir, args.size, env)
+        try:
+            users = [(f'bench.user{i}@example.com', f'password-{i}') for i in range(args.users)]
+            for i, (email, password) in enumerate(users):
+                requests.post(f'{base_url}/api/auth/register', json={
+                    'name': f'Bench User {i}', 'email': email, 'password': password,
+                    'address': '1 Benchmark Road, Jaipur, Rajasthan', 'phone': '+91 9000000000'
+                }, timeout=60).raise_for_status()
+
+            login_clients = 0 if name == 'browse_only' else args.login_clients
+            result = drive(base_url, users, args.duration, login_clients, args.browse_clients)
+        finally:
+            worker.terminate()
+            worker.wait()
+
+    browse = result['browse']
+    login = result.get('login', {})
+    print(f"{name:>16}: browse {browse['ok_per_sec']:8.1f}/s p95 {browse['latency_ms']['p95']:8.1f}ms  "
+          f"login {login.get('ok_per_sec', 0):7.1f}/s  login statuses {login.get('status_counts', {})}", file=sys.stderr)
+    return {'run': name, 'env': env, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark catalogue browsing under a login storm')
+    parser.add_argument('--size', type=int, default=1000, help='catalogue size (number of products)')
+    parser.add_argument('--users', type=int, default=20, help='customers registered before the run')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per run')
+    parser.add_argument('--login-clients', type=int, default=32)
+    parser.add_argument('--browse-clients', type=int, default=8)
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    runs = [
+        run('browse_only', {}, args),
+        run('login_capped', {}, args),
+        run('login_uncapped', {'PASSWORD_HASH_WORKERS': str(args.login_clients), 'PASSWORD_HASH_QUEUE': '0'}, args),
+    ]
+
+    output = json.dumps({'config': vars(args), 'cpu_count': os.cpu_count(), 'runs': runs}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Saved benchmark results to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Preload Memory Benchmark for Handicraft Marketplace Platform
+
+Generates a synthetic catalogue, serves create_app() from gunicorn with 1, 8
+and 32 sync workers, once with --preload (the master loads the catalogue,
+rollups and indexes and freezes them before forking) and once without (every
+worker loads its own), drives catalogue and transparency requests through every
+worker, and then reports each worker's unique set size (USS: pages only that
+process holds), proportional set size (PSS) and RSS from
+/proc/<pid>/smaps_rollup. Total PSS across the master and workers is the
+memory the deployment actually costs.
+
+Usage (from the backend directory):
+    python benchmarks/bench_preload.py --size 10000 --workers 1,8,32 --output preload.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import argparse
+import tempfile
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from run_benchmarks import BACKEND_SRC, free_port, catalogue_counts
+
+MB = 1024 * 1024
+
+
+def generate_catalogue(data_dir, size):
+    """Write the mock data files for a catalogue of size products"""
+    os.environ['MOCK_DATA_DIR'] = data_dir
+    sys.path.insert(0, BACKEND_SRC)
+    from utils.snowflake_connector import initialize_mock_data
+    initialize_mock_data(overwrite=True, **catalogue_counts(size))
+
+
+def worker_pids(master_pid):
+    """PIDs of the gunicorn master's child processes"""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # The command name may contain spaces, so fields are counted after its closing parenthesis
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == master_pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def read_smaps(pid):
+    """RSS, PSS and USS of a process in bytes"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return {
+        'rss_bytes': fields.get('Rss', 0),
+        'pss_bytes': fields.get('Pss', 0),
+        'uss_bytes': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def start_gunicorn(data_dir, workers, preload):
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '--chdir', BACKEND_SRC, '-w', str(workers),
+               '-b', f'127.0.0.1:{port}', '--timeout', '600', 'app:create_app()']
+    if preload:
+        command.insert(3, '--preload')
+    env = {**os.environ, 'MOCK_DATA_DIR': data_dir, 'WARMUP_ON_START': 'true', 'RATE_LIMIT_ENABLED': 'false'}
+    master = subprocess.Popen(command, env=env, cwd=data_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 600
+    while time.time() < deadline:
+        if master.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {master.returncode}")
+        try:
+            if len(worker_pids(master.pid)) == workers and \
+                    requests.get(f'{base_url}/health', timeout=5).status_code == 200:
+                return master, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    master.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def drive(base_url, size, total_requests, concurrency):
+    """Catalogue and transparency reads spread over the workers; returns status counts"""
+    rng = random.Random(0)
+    paths = []
+    for _ in range(total_requests):
+        product_id = rng.randint(1, size)
+        paths.append(rng.choice([
+            f'/api/products?page={rng.randint(1, 50)}',
+            f'/api/products/{product_id}',
+            f'/api/products/category/{rng.randint(1, 6)}',
+            f'/api/artisans?page={rng.randint(1, 20)}',
+            f'/api/transparency/{product_id}',
+        ]))
+
+    def fetch(path):
+        try:
+            return str(requests.get(f'{base_url}{path}', timeout=300).status_code)
+        except requests.RequestException:
+            return 'error'
+
+    statuses = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for status in executor.map(fetch, paths):
+            statuses[status] = statuses.get(status, 0) + 1
+    return statuses
+
+
+def run(data_dir, workers, preload, args):
+    master, base_url = start_gunicorn(data_dir, workers, preload)
+    try:
+        statuses = drive(base_url, args.size, args.requests_per_worker * workers, min(workers * 2, 64))
+        master_memory = read_smaps(master.pid)
+        worker_memory = [read_smaps(pid) for pid in worker_pids(master.pid)]
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait()
+
+    uss = [memory['uss_bytes'] for memory in worker_memory]
+    result = {
+        'workers': workers,
+        'preload': preload,
+        'status_counts': statuses,
+        'master': master_memory,
+        'worker_uss_mean_bytes': statistics.mean(uss),
+        'worker_uss_max_bytes': max(uss),
+        'worker_rss_mean_bytes': statistics.mean(memory['rss_bytes'] for memory in worker_memory),
+        'total_pss_bytes': master_memory['pss_bytes'] + sum(memory['pss_bytes'] for memory in worker_memory),
+        'per_worker': worker_memory
+    }
+    print(f"{workers:>3} workers {'preload' if preload else 'no preload':>10}: USS/worker {result['worker_uss_mean_bytes'] / MB:7.1f}MB "
+          f"(max {result['worker_uss_max_bytes'] / MB:.1f})  RSS/worker {result['worker_rss_mean_bytes'] / MB:7.1f}MB  "
+          f"total PSS {result['total_pss_bytes'] / MB:8.1f}MB  statuses {statuses}", file=sys.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-worker memory with and without gunicorn --preload')
+    parser.add_argument('--size', type=int, default=10000, help='catalogue size (number of products)')
+    parser.add_argument('--workers', default='1,8,32', help='comma-separated worker counts')
+    parser.add_argument('--requests-per-worker', type=int, default=40)
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory(prefix='bench_preload_') as data_dir:
+        generate_catalogue(data_dir, args.size)
+        for workers in [int(value) for value in args.workers.split(',')]:
+            for preload in (False, True):
+                runs.append(run(data_dir, workers, preload, args))
+
+    output = json.dumps({'config': vars(args), 'cpu_count': os.cpu_count(), 'runs': runs}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Saved benchmark results to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
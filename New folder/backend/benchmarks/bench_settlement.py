@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Settlement Benchmark for Handicraft Marketplace Platform
+
+Settles synthetic periods of increasing size with utils.settlement.settle and
+reports seconds and lines/sec per size, together with the platform totals and
+whether the settlement reconciles: its gross against a control total summed
+order by order outside settle(), as ORDERS.total_amount would hold it, and the
+partner and artisan statements against the platform totals.
+Lines come in orders of one to four items spread over partner sites with
+different commission rates and thousands of artisans.
+
+Usage (from the backend directory):
+    python benchmarks/bench_settlement.py --sizes 1000000,5000000,10000000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from utils.settlement import settle, to_basis_points
+
+COMMISSION_RATES = np.array([10.0, 12.0, 12.5, 15.0, 17.5, 20.0])
+
+
+def synthetic_lines(lines, partners=50, artisans=5000, string_keys=False, seed=42):
+    """Parallel order line arrays: order, partner and artisan keys, gross in paise and rates in basis points"""
+    rng = np.random.default_rng(seed)
+    order_ids = np.cumsum(rng.random(lines) < 0.45)  # about 2.2 lines per order
+    partner_ids = rng.integers(0, partners, lines)
+    artisan_ids = rng.integers(0, artisans, lines)
+    # Quantity 1-5 of items priced between Rs 99 and Rs 25,000, to the paisa
+    gross = rng.integers(1, 6, lines) * rng.integers(9900, 2500000, lines)
+    rate_bps = to_basis_points(rng.choice(COMMISSION_RATES, partners))[partner_ids]
+    if string_keys:
+        order_ids = np.char.add('ORD', order_ids.astype(str))
+        partner_ids = np.char.add('P', partner_ids.astype(str))
+        artisan_ids = np.char.add('A', artisan_ids.astype(str))
+    return order_ids, partner_ids, artisan_ids, gross, rate_bps
+
+
+def time_settlement(lines, string_keys=False):
+    order_ids, partner_ids, artisan_ids, gross, rate_bps = synthetic_lines(lines, string_keys=string_keys)
+    # Order totals (the lines of an order are adjacent), then their sum
+    order_starts = np.flatnonzero(np.r_[True, order_ids[1:] != order_ids[:-1]])
+    control_gross = int(np.add.reduceat(gross, order_starts).sum())
+
+    start = time.perf_counter()
+    settlement = settle(order_ids, partner_ids, artisan_ids, gross, rate_bps, control_gross=control_gross)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'lines': lines,
+        'string_keys': string_keys,
+        'partners': len(settlement['partners'][0]),
+        'artisans': len(settlement['artisans'][0]),
+        'gross_paise': settlement['gross'],
+        'control_gross_paise': control_gross,
+        'platform_fee_paise': settlement['platform_fee'],
+        'net_paise': settlement['net'],
+        'reconciled': settlement['reconciled'],
+        'seconds': elapsed,
+        'lines_per_sec': lines / elapsed if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batch revenue-sharing settlement')
+    parser.add_argument('--sizes', default='1000000,5000000,10000000', help='comma separated order line counts')
+    parser.add_argument('--string-keys', action='store_true', help='use string order, partner and artisan ids')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = []
+    for lines in [int(size) for size in args.sizes.split(',')]:
+        result = time_settlement(lines, args.string_keys)
+        results.append(result)
+        print(f"{lines:>10} lines: {result['seconds']:7.2f}s  {result['lines_per_sec']:>12,.0f} lines/s  "
+              f"reconciled {result['reconciled']}", file=sys.stderr)
+
+    output = json.dumps({'runs': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Saved benchmark results to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Catalogue Snapshot Benchmark for Handicraft Marketplace Platform
+
+Generates a synthetic catalogue for each requested size, builds a binary
+snapshot of it (utils/snapshot.py), and in fresh interpreters compares the JSON
+catalogue (parsed and indexed in memory) with the memory-mapped snapshot:
+time to open, product lookups by id and by category, 20-row pages, a full
+scan, and the process's anonymous (private) and file-backed (shared page
+cache) resident memory afterwards.
+
+Usage (from the backend directory):
+    python benchmarks/bench_snapshot.py --sizes 10000,100000 --output snapshot.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from run_benchmarks import BACKEND_SRC, catalogue_counts
+
+# Runs in the child interpreter against MOCK_DATA_DIR, or CATALOGUE_SNAPSHOT when set
+CHILD = """
+import sys, json, time, random
+size = int(sys.argv[1])
+start = time.perf_counter()
+from utils.catalogue import catalogue
+catalogue.load()
+opened = time.perf_counter()
+
+rng = random.Random(0)
+ids = [str(rng.randint(1, size)) for _ in range(1000)]
+start_lookup = time.perf_counter()
+found = sum(len(catalogue.where('products', 'PRODUCT_ID', product_id)) for product_id in ids)
+lookup = time.perf_counter()
+category_rows = sum(len(catalogue.where('products', 'CATEGORY_ID', str(category))) for category in range(1, 7))
+category = time.perf_counter()
+products = catalogue.rows('products')
+pages = [products[offset:offset + 20] for offset in range(0, 200 * 20, 20)]
+paged = time.perf_counter()
+matches = sum(1 for row in products if '7' in row['NAME'])
+scanned = time.perf_counter()
+
+memory = {}
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith(('RssAnon:', 'RssFile:')):
+            memory[line.split(':')[0]] = int(line.split()[1]) * 1024
+print(json.dumps({
+    'open_ms': (opened - start) * 1000,
+    'lookup_us': (lookup - start_lookup) / len(ids) * 1e6,
+    'category_lookup_ms': (category - lookup) / 6 * 1000,
+    'page_us': (paged - category) / len(pages) * 1e6,
+    'scan_ms': (scanned - paged) * 1000,
+    'rss_anon_bytes': memory.get('RssAnon'),
+    'rss_file_bytes': memory.get('RssFile'),
+    'found': found,
+    'category_rows': category_rows,
+    'scan_matches': matches
+}))
+"""
+
+
+def generate_catalogue(data_dir, size):
+    """Write the mock data files for a catalogue of size products (in a child, as DATA_DIR is fixed at import)"""
+    code = ('from utils.snowflake_connector import initialize_mock_data; '
+            f'initialize_mock_data(overwrite=True, **{catalogue_counts(size)!r})')
+    subprocess.run([sys.executable, '-c', code], cwd=BACKEND_SRC, check=True,
+                   env={**os.environ, 'PYTHONPATH': BACKEND_SRC, 'MOCK_DATA_DIR': data_dir})
+
+
+def measure(size, env):
+    result = subprocess.run([sys.executable, '-c', CHILD, str(size)], cwd=BACKEND_SRC, capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': BACKEND_SRC, **env})
+    if result.returncode != 0:
+        raise RuntimeError(f"Measurement failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_size(size):
+    with tempfile.TemporaryDirectory(prefix='bench_snapshot_') as data_dir:
+        generate_catalogue(data_dir, size)
+        snapshot_path = os.path.join(data_dir, 'catalogue.snapshot')
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'utils.snapshot', '--source', 'mock', '--output', snapshot_path],
+                       cwd=BACKEND_SRC, check=True, stdout=subprocess.DEVNULL,
+                       env={**os.environ, 'PYTHONPATH': BACKEND_SRC, 'MOCK_DATA_DIR': data_dir})
+        build_seconds = time.perf_counter() - start
+
+        json_bytes = sum(os.path.getsize(os.path.join(data_dir, f'{name}.json'))
+                         for name in ('products', 'artisans', 'partners', 'categories', 'regions'))
+        modes = {
+            'json': measure(size, {'MOCK_DATA_DIR': data_dir}),
+            'snapshot': measure(size, {'MOCK_DATA_DIR': data_dir, 'CATALOGUE_SNAPSHOT': snapshot_path}),
+        }
+        snapshot_bytes = os.path.getsize(snapshot_path)
+
+    for mode, m in modes.items():
+        print(f"{size:>8} {mode:>8}: open {m['open_ms']:9.2f}ms  id lookup {m['lookup_us']:7.1f}us  "
+              f"category {m['category_lookup_ms']:8.2f}ms  page {m['page_us']:7.1f}us  scan {m['scan_ms']:8.1f}ms  "
+              f"anon {m['rss_anon_bytes'] / 1024 / 1024:7.1f}MB  file {m['rss_file_bytes'] / 1024 / 1024:6.1f}MB",
+              file=sys.stderr)
+    return {'size': size, 'json_bytes': json_bytes, 'snapshot_bytes': snapshot_bytes,
+            'build_seconds': build_seconds, 'modes': modes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the JSON catalogue with the memory-mapped snapshot')
+    parser.add_argument('--sizes', default='10000,100000', help='comma-separated catalogue sizes (number of products)')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = [run_size(int(size)) for size in args.sizes.split(',')]
+
+    output = json.dumps({'config': vars(args), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Saved benchmark results to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
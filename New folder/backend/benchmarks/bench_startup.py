@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark for Handicraft Marketplace Platform
+
+Starts fresh interpreters that import the app, call create_app() and serve one
+request through the test client, and reports the median import time,
+create_app() time, first request time and time to first response (process
+start to first response) over several runs. Each run gets an empty mock data
+directory, so nothing is cached between runs. Runs once with the default lazy
+startup and once with WARMUP_ON_START, which moves the data loading from the
+first request into create_app().
+
+Exits with status 1 when the lazy startup's median import time or time to
+first response is over budget, so it can gate CI; tests/test_startup_budget.py
+checks the same budgets under pytest.
+
+Usage (from the backend directory):
+    python benchmarks/bench_startup.py --runs 5 --import-budget-ms 400 --first-response-budget-ms 1500
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BACKEND_SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+FIRST_PATH = '/api/products/1'
+IMPORT_BUDGET_MS = 400
+FIRST_RESPONSE_BUDGET_MS = 1500
+
+# Runs in the child interpreter; the timings start once the interpreter is up
+CHILD = """
+import sys, json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get(sys.argv[1]).status_code
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'status': status
+}))
+"""
+
+
+def run_once(path, env):
+    """Time one cold start in a new interpreter with its own empty data directory"""
+    with tempfile.TemporaryDirectory(prefix='bench_startup_') as data_dir:
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD, path], cwd=BACKEND_SRC, capture_output=True, text=True,
+            env={**os.environ, 'PYTHONPATH': BACKEND_SRC, 'MOCK_DATA_DIR': data_dir, **env}
+        )
+        first_response_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup run failed:\n{result.stderr}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['first_response_ms'] = first_response_ms
+    return timings
+
+
+def run(name, env, args):
+    samples = [run_once(args.path, env) for _ in range(args.runs)]
+    statuses = sorted({sample['status'] for sample in samples})
+    result = {'run': name, 'env': env, 'statuses': statuses}
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'first_response_ms'):
+        result[key] = statistics.median(sample[key] for sample in samples)
+    print(f"{name:>8}: import {result['import_ms']:7.1f}ms  create_app {result['create_app_ms']:7.1f}ms  "
+          f"first request {result['first_request_ms']:7.1f}ms  first response {result['first_response_ms']:7.1f}ms  "
+          f"statuses {statuses}", file=sys.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark import time and time to first response')
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per mode (medians are reported)')
+    parser.add_argument('--path', default=FIRST_PATH, help='path of the first request')
+    parser.add_argument('--import-budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--first-response-budget-ms', type=float, default=FIRST_RESPONSE_BUDGET_MS)
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    lazy = run('lazy', {'WARMUP_ON_START': 'false'}, args)
+    warm = run('warm', {'WARMUP_ON_START': 'true'}, args)
+
+    over_budget = []
+    if lazy['import_ms'] > args.import_budget_ms:
+        over_budget.append(f"import {lazy['import_ms']:.1f}ms > {args.import_budget_ms:.0f}ms")
+    if lazy['first_response_ms'] > args.first_response_budget_ms:
+        over_budget.append(f"first response {lazy['first_response_ms']:.1f}ms > {args.first_response_budget_ms:.0f}ms")
+
+    output = json.dumps({'config': vars(args), 'runs': [lazy, warm], 'over_budget': over_budget}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Saved benchmark results to {args.output}")
+    else:
+        print(output)
+
+    if over_budget:
+        print(f"Startup over budget: {'; '.join(over_budget)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+API Benchmark Suite for Handicraft Marketplace Platform
+
+Generates a synthetic catalogue for each requested size, serves create_app()
+against it from a separate worker process, drives every registered route with
+concurrent clients and reports throughput, latency percentiles and worker
+memory as machine-readable JSON.
+
+Usage (from the backend directory):
+    python benchmarks/run_benchmarks.py --sizes 1000,100000,1000000 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BACKEND_SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# Sample request bodies for routes that accept writes
+REQUEST_BODIES = {
+    ('POST', '/api/auth/register'): {
+        'name': 'Benchmark User',
+        'email': 'bench.user@example.com',
+        'password': 'bench-password',
+        'address': '1 Benchmark Road, Jaipur, Rajasthan',
+        'phone': '+91 9000000000'
+    },
+    ('POST', '/api/auth/login'): {
+        'email': 'bench.user@example.com',
+        'password': 'bench-password'
+    },
+    ('POST', '/api/orders'): {
+        'items': [{'product_id': '1', 'partner_id': '1', 'quantity': 1}],
+        'shipping_address': '1 Benchmark Road, Jaipur, Rajasthan',
+        'payment_method': 'UPI'
+    },
+    ('PUT', '/api/orders/<string:order_id>/status'): {
+        'status': 'Shipped',
+        'tracking_number': 'TRK000001'
+    }
+}
+
+# Query strings for routes that need one to do meaningful work
+QUERY_STRINGS = {
+    '/api/products/search': 'q=handcrafted+traditional'
+}
+
+# Routes that revoke the token they are sent, so every request gets a token pair of its own
+# (logout: the access token, and the refresh token in the body; refresh: the refresh token)
+SINGLE_USE_TOKEN_ROUTES = ('/api/auth/logout', '/api/auth/refresh')
+
+
+def catalogue_counts(size):
+    """Scale the other mock tables with the product count"""
+    return {
+        'num_products': size,
+        'num_artisans': max(20, size // 50),
+        'num_partners': max(10, size // 1000),
+        'num_orders': max(30, size // 30)
+    }
+
+
+def serve(args):
+    """Worker process: build the catalogue, write a manifest and serve the app"""
+    os.environ['MOCK_DATA_DIR'] = args.data_dir
+    # One client drives every route, so per-client rate limits would only measure the limiter
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    # Measure steady-state serving, not the first requests loading the data
+    os.environ.setdefault('WARMUP_ON_START', 'true')
+    os.chdir(args.data_dir)
+    sys.path.insert(0, BACKEND_SRC)
+
+    from werkzeug.serving import make_server
+    from flask_jwt_extended import create_access_token, create_refresh_token
+    from utils.snowflake_connector import initialize_mock_data, ORDERS_FILE
+
+    start = time.perf_counter()
+    initialize_mock_data(overwrite=True, **catalogue_counts(args.size))
+    setup_seconds = time.perf_counter() - start
+
+    from app import create_app
+    app = create_app()
+
+    with open(ORDERS_FILE, 'r') as f:
+        first_order = json.load(f)[0]
+
+    with app.app_context():
+        access_token = create_access_token(identity=first_order['CUSTOMER_ID'])
+        refresh_token = create_refresh_token(identity=first_order['CUSTOMER_ID'])
+        single_use_tokens = {
+            rule: [{'access_token': create_access_token(identity=first_order['CUSTOMER_ID']),
+                    'refresh_token': create_refresh_token(identity=first_order['CUSTOMER_ID'])}
+                   for _ in range(args.tokens)]
+            for rule in SINGLE_USE_TOKEN_ROUTES
+        }
+
+    routes = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            routes.append({'rule': rule.rule, 'method': method})
+
+    manifest = {
+        'setup_seconds': setup_seconds,
+        'routes': sorted(routes, key=lambda r: (r['rule'], r['method'])),
+        'path_params': {
+            'product_id': '1',
+            'artisan_id': '1',
+            'category_id': '1',
+            'region_id': '1',
+            'partner_id': '1',
+            'order_id': first_order['ORDER_ID'],
+            'user_id': first_order['CUSTOMER_ID'],
+            'craft_type': 'Weaver'
+        },
+        'access_token': access_token,
+        'refresh_token': refresh_token,
+        'single_use_tokens': single_use_tokens
+    }
+
+    manifest_path = os.path.join(args.data_dir, 'manifest.json')
+    with open(f"{manifest_path}.tmp", 'w') as f:
+        json.dump(manifest, f)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    make_server('127.0.0.1', args.port, app, threaded=True).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def read_memory(pid):
+    """Read current and peak resident set size of a process in bytes"""
+    memory = {}
+    with open(f'/proc/{pid}/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                memory['rss_bytes'] = int(line.split()[1]) * 1024
+            elif line.startswith('VmHWM:'):
+                memory['peak_rss_bytes'] = int(line.split()[1]) * 1024
+    return memory
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def build_requests(route, manifest, base_url, total_requests):
+    """Turn a route rule into total_requests concrete requests"""
+    path = route['rule']
+    for name, value in manifest['path_params'].items():
+        path = path.replace(f'<string:{name}>', value)
+
+    query = QUERY_STRINGS.get(route['rule'])
+    url = f"{base_url}{path}" + (f"?{query}" if query else '')
+    body = REQUEST_BODIES.get((route['method'], route['rule']))
+
+    if route['rule'] not in SINGLE_USE_TOKEN_ROUTES:
+        request_spec = {
+            'method': route['method'],
+            'url': url,
+            'json': body,
+            'headers': {'Authorization': f"Bearer {manifest['access_token']}"}
+        }
+        return [request_spec] * total_requests
+
+    pairs = manifest['single_use_tokens'][route['rule']]
+    if len(pairs) < total_requests:
+        raise RuntimeError(f"{route['rule']} needs {total_requests} tokens, the worker minted {len(pairs)}")
+    logout = route['rule'] == '/api/auth/logout'
+    return [{
+        'method': route['method'],
+        'url': url,
+        'json': {'refresh_token': pair['refresh_token']} if logout else body,
+        'headers': {'Authorization': f"Bearer {pair['access_token'] if logout else pair['refresh_token']}"}
+    } for pair in pairs[:total_requests]]
+
+
+def drive_route(request_specs, concurrency):
+    """Send every request using concurrency clients and time each one"""
+    per_client = [request_specs[i::concurrency] for i in range(concurrency)]
+
+    def client(specs):
+        session = requests.Session()
+        samples = []
+        for request_spec in specs:
+            start = time.perf_counter()
+            try:
+                status = session.request(timeout=300, **request_spec).status_code
+            except requests.RequestException:
+                status = 'error'
+            samples.append((time.perf_counter() - start, status))
+        session.close()
+        return samples
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = [s for batch in executor.map(client, per_client) for s in batch]
+    wall_seconds = time.perf_counter() - start
+
+    latencies = sorted(s[0] * 1000 for s in samples)
+    status_counts = {}
+    for _, status in samples:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+
+    return {
+        'requests': len(samples),
+        'errors': sum(n for status, n in status_counts.items() if status == 'error' or status.startswith('5')),
+        'status_counts': status_counts,
+        'wall_seconds': wall_seconds,
+        'throughput_rps': len(samples) / wall_seconds if wall_seconds else None,
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'max': latencies[-1] if latencies else None
+        }
+    }
+
+
+def benchmark_size(size, args):
+    """Benchmark every route against a catalogue of the given size"""
+    with tempfile.TemporaryDirectory(prefix=f'bench_{size}_') as data_dir:
+        port = free_port()
+        worker = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'serve',
+             '--size', str(size), '--data-dir', data_dir, '--port', str(port), '--tokens', str(args.requests)],
+            stdout=subprocess.DEVNULL if not args.verbose else None,
+            stderr=subprocess.DEVNULL if not args.verbose else None
+        )
+
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            manifest_path = os.path.join(data_dir, 'manifest.json')
+            deadline = time.time() + args.startup_timeout
+            while True:
+                if worker.poll() is not None:
+                    raise RuntimeError(f"Benchmark worker exited with code {worker.returncode}")
+                if time.time() > deadline:
+                    raise RuntimeError(f"Benchmark worker did not start within {args.startup_timeout}s")
+                if os.path.exists(manifest_path):
+                    try:
+                        if requests.get(f'{base_url}/health', timeout=5).status_code == 200:
+                            break
+                    except requests.RequestException:
+                        pass
+                time.sleep(0.2)
+
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+
+            idle_memory = read_memory(worker.pid)
+            route_results = []
+            for route in manifest['routes']:
+                if args.routes and route['rule'] not in args.routes:
+                    continue
+
+                print(f"  {size} products: {route['method']} {route['rule']}", file=sys.stderr)
+                result = drive_route(build_requests(route, manifest, base_url, args.requests), args.concurrency)
+                result.update({'route': route['rule'], 'method': route['method']})
+                result['worker_rss_bytes'] = read_memory(worker.pid)['rss_bytes']
+                route_results.append(result)
+
+            return {
+                'catalogue_size': size,
+                'catalogue_counts': catalogue_counts(size),
+                'setup_seconds': manifest['setup_seconds'],
+                'worker': {
+                    'pid': worker.pid,
+                    'idle_rss_bytes': idle_memory['rss_bytes'],
+                    **read_memory(worker.pid)
+                },
+                'routes': route_results
+            }
+        finally:
+            worker.terminate()
+            worker.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every API route against synthetic catalogues')
+    subparsers = parser.add_subparsers(dest='command')
+
+    serve_parser = subparsers.add_parser('serve', help='internal: run a benchmark worker')
+    serve_parser.add_argument('--size', type=int, required=True)
+    serve_parser.add_argument('--data-dir', required=True)
+    serve_parser.add_argument('--port', type=int, required=True)
+    serve_parser.add_argument('--tokens', type=int, default=0, help='token pairs to mint per single-use token route')
+
+    parser.add_argument('--sizes', default='1000,100000,1000000',
+                        help='comma-separated catalogue sizes (number of products)')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients per route')
+    parser.add_argument('--routes', nargs='*', help='only benchmark these route rules')
+    parser.add_argument('--startup-timeout', type=float, default=1800, help='seconds to wait for each worker')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    parser.add_argument('--verbose', action='store_true', help='show worker output')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args)
+        return
+
+    results = {
+        'generated_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'requests_per_route': args.requests,
+            'concurrency': args.concurrency
+        },
+        'results': []
+    }
+
+    for size in [int(s) for s in args.sizes.split(',') if s]:
+        print(f"Benchmarking catalogue of {size} products...", file=sys.stderr)
+        results['results'].append(benchmark_size(size, args))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Saved benchmark results to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Analytics API resources for the Handicraft Marketplace Platform.
+
+This module provides RESTful API endpoints for the ANALYTICS schema views,
+served from the in-memory rollups in utils.analytics. The analytics modules
+(and numpy) are imported by the first analytics request, not at startup.
+"""
+
+from datetime import date, timedelta
+from flask import request
+from flask_restful import Resource
+from utils.pagination import page_params
+from utils.operators import operator_required
+
+def paginate(rows, sort_key):
+    """Sort rows by sort_key (largest first) and return one page with pagination metadata"""
+    page, per_page, offset = page_params(20)
+    
+    rows = sorted(rows, key=lambda row: row[sort_key] or 0, reverse=True)
+    total = len(rows)
+    
+    return rows[offset:offset + per_page], {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'total_pages': (total + per_page - 1) // per_page
+    }
+
+class ProductSalesAnalyticsResource(Resource):
+    """Resource for PRODUCT_SALES_ANALYTICS"""
+    
+    def get(self):
+        """Get product sales, highest revenue first"""
+        from utils.analytics import engine
+        products, pagination = paginate(engine.product_sales(), 'TOTAL_REVENUE')
+        
+        return {
+            'products': products,
+            'pagination': pagination
+        }
+
+class PartnerPerformanceAnalyticsResource(Resource):
+    """Resource for PARTNER_PERFORMANCE_ANALYTICS"""
+    
+    def get(self):
+        """Get partner performance, highest revenue first"""
+        from utils.analytics import engine
+        partners, pagination = paginate(engine.partner_performance(), 'TOTAL_REVENUE')
+        
+        return {
+            'partners': partners,
+            'pagination': pagination
+        }
+
+class RegionTourismAnalyticsResource(Resource):
+    """Resource for REGION_TOURISM_SALES_CORRELATION"""
+    
+    def get(self):
+        """Get regional sales against tourist numbers, highest sales first"""
+        from utils.analytics import engine
+        regions, pagination = paginate(engine.region_tourism_sales(), 'TOTAL_SALES')
+        
+        return {
+            'regions': regions,
+            'pagination': pagination
+        }
+
+class OrderRollupResource(Resource):
+    """Resource for time-bucketed revenue, orders and platform fees"""
+    
+    def get(self):
+        """Get one bucket per day, week or month, overall or per region, category or partner"""
+        from utils.order_rollups import store, GRANULARITIES, DIMENSIONS
+        granularity = request.args.get('granularity', 'day')
+        dimension = request.args.get('dimension', 'all')
+        key = request.args.get('key')
+        
+        if granularity not in GRANULARITIES:
+            return {'error': f'Invalid granularity. Must be one of: {", ".join(GRANULARITIES)}'}, 400
+        
+        if dimension not in DIMENSIONS:
+            return {'error': f'Invalid dimension. Must be one of: {", ".join(DIMENSIONS)}'}, 400
+        
+        try:
+            end = date.fromisoformat(request.args.get('end', date.today().isoformat()))
+            start = date.fromisoformat(request.args.get('start', (end - timedelta(days=30)).isoformat()))
+        except (ValueError, OverflowError):
+            return {'error': 'start and end must be dates (YYYY-MM-DD)'}, 400
+        
+        try:
+            granularity_used, series, cells_read = store.query(start, end, granularity, dimension, key)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'granularity': granularity_used,
+            'dimension': dimension,
+            'cells_read': cells_read,
+            'series': series
+        }
+
+class AnalyticsRebuildResource(Resource):
+    """Resource for rebuilding the analytics rollups from the database (operators only)"""
+    
+    @operator_required()
+    def post(self):
+        """Recompute every rollup from ORDER_ITEMS"""
+        from utils.analytics import engine
+        from utils.order_rollups import store
+        engine.rebuild()
+        store.rebuild()
+        
+        return {
+            'message': 'Analytics rebuilt',
+            'products': len(engine.products),
+            'partners': len(engine.partners),
+            'region_years': len(engine.region_years)
+        }
+
+class SettlementResource(Resource):
+    """Resource for revenue-sharing settlement statements (operators only)"""
+    
+    @operator_required()
+    def get(self):
+        """Get platform, partner and artisan statements for [start, end), the current month by default"""
+        from utils.settlement import settle_period, month_bounds
+        default_start, default_end = month_bounds(date.today())
+        
+        try:
+            start = date.fromisoformat(request.args.get('start', default_start.isoformat()))
+            end = date.fromisoformat(request.args.get('end', default_end.isoformat()))
+        except ValueError:
+            return {'error': 'start and end must be dates (YYYY-MM-DD)'}, 400
+        
+        if end <= start:
+            return {'error': 'end must be after start'}, 400
+        
+        try:
+            return settle_period(start, end)
+        except ValueError as e:
+            return {'error': str(e)}, 500
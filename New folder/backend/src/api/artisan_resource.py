@@ -4,9 +4,9 @@ Artisan API resources for the Handicraft Marketplace Platform.
 This module provides RESTful API endpoints for artisan-related operations.
 """
 
-from flask import request
 from flask_restful import Resource
 from utils.snowflake_connector import execute_query
+from utils.pagination import page_params
 
 class ArtisanResource(Resource):
     """Resource for handling artisan collection operations"""
@@ -14,9 +14,7 @@ class ArtisanResource(Resource):
     def get(self):
         """Get a paginated list of artisans"""
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(20)
         
         # Query artisans with pagination
         query = f"""
@@ -131,9 +129,7 @@ class ArtisansByRegionResource(Resource):
     def get(self, region_id):
         """Get artisans by region"""
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(20)
         
         # Query artisans by region with pagination
         query = f"""
@@ -193,9 +189,7 @@ class ArtisansByCraftResource(Resource):
     def get(self, craft_type):
         """Get artisans by craft type"""
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(20)
         
         # Query artisans by craft type with pagination
         query = f"""
@@ -4,14 +4,12 @@ Authentication API resources for the Handicraft Marketplace Platform.
 This module provides RESTful API endpoints for user authentication operations.
 """
 
-import os
-import uuid
-import hashlib
-from datetime import datetime, timedelta
 from flask import request
 from flask_restful import Resource
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
-from utils.snowflake_connector import execute_query
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt, decode_token
+from utils.customers import store as customers, PasswordHashBusy
+from utils.token_revocation import revoke_token
+from utils.operators import operator_claims
 
 class RegisterResource(Resource):
     """Resource for user registration"""
@@ -27,44 +25,18 @@ class RegisterResource(Resource):
             if field not in data:
                 return {'error': f'Missing required field: {field}'}, 400
         
-        # Check if email already exists
-        email_check_query = f"SELECT customer_id FROM CUSTOMERS WHERE email = '{data['email']}'"
-        existing_user = execute_query(email_check_query)
-        
-        if existing_user:
-            return {'error': 'Email already registered'}, 409
-        
-        # Generate customer_id
-        customer_id = str(uuid.uuid4())
-        
-        # Hash password
-        password_hash = hashlib.sha256(data['password'].encode()).hexdigest()
-        
-        # Current timestamp
-        now = datetime.now().isoformat()
-        
-        # Insert new customer
-        insert_query = f"""
-            INSERT INTO CUSTOMERS (
-                customer_id, name, email, password_hash, address, phone, created_at, updated_at
-            ) VALUES (
-                '{customer_id}',
-                '{data['name']}',
-                '{data['email']}',
-                '{password_hash}',
-                '{data['address']}',
-                '{data['phone']}',
-                '{now}',
-                '{now}'
-            )
-        """
-        
         try:
-            execute_query(insert_query)
+            # Check the email (case-insensitively) and insert the customer with a KDF password hash
+            customer = customers.register(data['name'], data['email'], data['password'], data['address'], data['phone'])
+            
+            if not customer:
+                return {'error': 'Email already registered'}, 409
             
             # Generate tokens
-            access_token = create_access_token(identity=customer_id)
-            refresh_token = create_refresh_token(identity=customer_id)
+            customer_id = customer['CUSTOMER_ID']
+            claims = operator_claims(customer['EMAIL'])
+            access_token = create_access_token(identity=customer_id, additional_claims=claims)
+            refresh_token = create_refresh_token(identity=customer_id, additional_claims=claims)
             
             return {
                 'message': 'User registered successfully',
@@ -73,6 +45,9 @@ class RegisterResource(Resource):
                 'refresh_token': refresh_token
             }, 201
         
+        except PasswordHashBusy:
+            return {'error': 'Too many sign-ins in progress, please retry'}, 503, {'Retry-After': '1'}
+        
         except Exception as e:
             return {'error': f'Registration failed: {str(e)}'}, 500
 
@@ -88,31 +63,26 @@ class LoginResource(Resource):
         if 'email' not in data or 'password' not in data:
             return {'error': 'Email and password are required'}, 400
         
-        # Hash password
-        password_hash = hashlib.sha256(data['password'].encode()).hexdigest()
-        
-        # Query user
-        query = f"""
-            SELECT customer_id, name, email
-            FROM CUSTOMERS
-            WHERE email = '{data['email']}' AND password_hash = '{password_hash}'
-        """
-        
-        user = execute_query(query)
+        # Look up the user by email and verify the password on the hashing pool
+        try:
+            user = customers.authenticate(data['email'], data['password'])
+        except PasswordHashBusy:
+            return {'error': 'Too many sign-ins in progress, please retry'}, 503, {'Retry-After': '1'}
         
         if not user:
             return {'error': 'Invalid email or password'}, 401
         
         # Generate tokens
-        customer_id = user[0]['CUSTOMER_ID']
-        access_token = create_access_token(identity=customer_id)
-        refresh_token = create_refresh_token(identity=customer_id)
+        customer_id = user['CUSTOMER_ID']
+        claims = operator_claims(user['EMAIL'])
+        access_token = create_access_token(identity=customer_id, additional_claims=claims)
+        refresh_token = create_refresh_token(identity=customer_id, additional_claims=claims)
         
         return {
             'message': 'Login successful',
             'customer_id': customer_id,
-            'name': user[0]['NAME'],
-            'email': user[0]['EMAIL'],
+            'name': user['NAME'],
+            'email': user['EMAIL'],
             'access_token': access_token,
             'refresh_token': refresh_token
         }
@@ -122,12 +92,22 @@ class RefreshResource(Resource):
     
     @jwt_required(refresh=True)
     def post(self):
-        """Refresh access token"""
+        """Refresh access token, rotating the refresh token"""
         current_user = get_jwt_identity()
-        access_token = create_access_token(identity=current_user)
+        
+        # Each refresh token is used once: revoke it and issue a new one.
+        # A concurrent refresh with the same token loses the race and is rejected.
+        if not revoke_token(get_jwt()):
+            return {'error': 'Token has been revoked'}, 401
+        
+        # Operators keep their claim for as long as their email stays listed
+        claims = operator_claims(get_jwt().get('operator'))
+        access_token = create_access_token(identity=current_user, additional_claims=claims)
+        refresh_token = create_refresh_token(identity=current_user, additional_claims=claims)
         
         return {
-            'access_token': access_token
+            'access_token': access_token,
+            'refresh_token': refresh_token
         }
 
 class LogoutResource(Resource):
@@ -135,9 +115,22 @@ class LogoutResource(Resource):
     
     @jwt_required()
     def post(self):
-        """Logout a user"""
-        # Note: In a real implementation, we would blacklist the token
-        # For this prototype, we'll just return a success message
+        """Logout a user, revoking the access token and the refresh token if one is sent"""
+        data = request.get_json(silent=True) or {}
+        
+        # Revoke the refresh token too, so it cannot mint new access tokens
+        if data.get('refresh_token'):
+            try:
+                refresh_payload = decode_token(data['refresh_token'])
+            except Exception:
+                return {'error': 'Invalid refresh token'}, 400
+            
+            if refresh_payload.get('sub') != get_jwt_identity():
+                return {'error': 'Invalid refresh token'}, 400
+            
+            revoke_token(refresh_payload)
+        
+        revoke_token(get_jwt())
         
         return {
             'message': 'Logout successful'
@@ -9,7 +9,9 @@ from datetime import datetime
 from flask import request
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from utils.snowflake_connector import execute_query
+from utils.snowflake_connector import execute_query, execute_procedure
+from utils import procedures
+from utils.pagination import page_params
 
 class OrderResource(Resource):
     """Resource for handling order collection operations"""
@@ -21,9 +23,7 @@ class OrderResource(Resource):
         current_user = get_jwt_identity()
         
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(10)
         
         # Query orders with pagination
         query = f"""
@@ -191,6 +191,13 @@ class OrderResource(Resource):
                 """
                 execute_query(item_query)
             
+            # Update the analytics and time-bucketed rollups with the new order
+            from utils.analytics import engine as analytics
+            from utils.order_rollups import store as order_rollups
+            analytics.record_order(order_id, items, platform_fee, now)
+            order_rollups.record_order(order_id, items, platform_fee, now)
+            procedures.invalidate('CALCULATE_REVENUE_SHARING', order_id=order_id)
+            
             return {
                 'message': 'Order created successfully',
                 'order_id': order_id,
@@ -256,8 +263,9 @@ class OrderDetailResource(Resource):
         if order[0]['CUSTOMER_ID'] != current_user:
             return {'error': 'Unauthorized access to order'}, 403
         
-        # Add items to order
+        # Add items and the revenue split per partner site to order
         order[0]['items'] = items
+        order[0]['revenue_sharing'] = execute_procedure('CALCULATE_REVENUE_SHARING', {'order_id': order_id})
         
         # Return order details
         return order[0]
@@ -276,9 +284,7 @@ class OrdersByUserResource(Resource):
             return {'error': 'Unauthorized access to orders'}, 403
         
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 10))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(10)
         
         # Query orders by user with pagination
         query = f"""
@@ -377,6 +383,12 @@ class OrderStatusResource(Resource):
                 """
                 execute_query(tracking_query)
             
+            # Retract or re-apply the order in the analytics and time-bucketed rollups
+            from utils.analytics import engine as analytics
+            from utils.order_rollups import store as order_rollups
+            analytics.record_status(order_id, data['status'])
+            order_rollups.record_status(order_id, data['status'])
+            
             return {
                 'message': 'Order status updated successfully',
                 'order_id': order_id,
@@ -4,9 +4,9 @@ Partner API resources for the Handicraft Marketplace Platform.
 This module provides RESTful API endpoints for partner website-related operations.
 """
 
-from flask import request
 from flask_restful import Resource
 from utils.snowflake_connector import execute_query
+from utils.pagination import page_params
 
 class PartnerResource(Resource):
     """Resource for handling partner website collection operations"""
@@ -14,9 +14,7 @@ class PartnerResource(Resource):
     def get(self):
         """Get a paginated list of partner websites"""
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(20)
         
         # Query partner websites with pagination
         query = f"""
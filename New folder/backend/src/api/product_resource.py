@@ -7,6 +7,8 @@ This module provides RESTful API endpoints for product-related operations.
 from flask import request
 from flask_restful import Resource
 from utils.snowflake_connector import execute_query
+from utils.pagination import page_params
+from utils import single_flight
 
 class ProductResource(Resource):
     """Resource for handling product collection operations"""
@@ -14,9 +16,7 @@ class ProductResource(Resource):
     def get(self):
         """Get a paginated list of products"""
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(20)
         
         # Query products with pagination
         query = f"""
@@ -81,6 +81,22 @@ class ProductDetailResource(Resource):
     
     def get(self, product_id):
         """Get details of a specific product"""
+        # Concurrent requests for the same product share one run of the queries
+        try:
+            product = single_flight.group.do(('product_detail', product_id), self.load, product_id)
+        except single_flight.SingleFlightTimeout:
+            return {'error': 'Product lookup timed out, please retry'}, 503, {'Retry-After': '1'}
+        
+        # Check if product exists
+        if product is None:
+            return {'error': 'Product not found'}, 404
+        
+        # Return product details
+        return product
+    
+    @staticmethod
+    def load(product_id):
+        """Product details with partner offerings, or None if the product does not exist"""
         # Query product details
         query = f"""
             SELECT 
@@ -138,14 +154,11 @@ class ProductDetailResource(Resource):
         product = execute_query(query)
         partners = execute_query(partners_query)
         
-        # Check if product exists
         if not product:
-            return {'error': 'Product not found'}, 404
+            return None
         
         # Add partner offerings to product
         product[0]['partners'] = partners
-        
-        # Return product details
         return product[0]
 
 class ProductsByCategoryResource(Resource):
@@ -154,9 +167,7 @@ class ProductsByCategoryResource(Resource):
     def get(self, category_id):
         """Get products by category"""
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(20)
         
         # Query products by category with pagination
         query = f"""
@@ -208,9 +219,7 @@ class ProductsByRegionResource(Resource):
     def get(self, region_id):
         """Get products by region"""
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(20)
         
         # Query products by region with pagination
         query = f"""
@@ -261,9 +270,7 @@ class ProductsByArtisanResource(Resource):
     def get(self, artisan_id):
         """Get products by artisan"""
         # Get query parameters
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(20)
         
         # Query products by artisan with pagination
         query = f"""
@@ -315,9 +322,7 @@ class ProductSearchResource(Resource):
         """Search products by keywords"""
         # Get query parameters
         keywords = request.args.get('q', '')
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
-        offset = (page - 1) * per_page
+        page, per_page, offset = page_params(20)
         
         # Prepare search terms
         search_terms = keywords.split()
@@ -3,9 +3,18 @@ Handicraft Marketplace Platform - Flask Backend Application
 
 This is the main application file that initializes the Flask app,
 configures it, and registers all API endpoints.
+
+Startup does no data loading: the database, the mock data files, the analytics
+rollups, the customer index and the QR code libraries are all loaded by the
+first request that needs them. Set WARMUP_ON_START to load them in
+create_app() instead, so the first requests after a deploy are not slow. With
+gunicorn --preload that happens once in the master process: everything loaded
+is then frozen against the garbage collector, and the forked workers share it
+copy-on-write.
 """
 
 import os
+import gc
 from flask import Flask, jsonify
 from flask_restful import Api
 from flask_jwt_extended import JWTManager
@@ -22,9 +31,44 @@ from api.partner_resource import PartnerResource, PartnerDetailResource, Partner
 from api.qrcode_resource import QRCodeResource, TransparencyResource
 from api.auth_resource import RegisterResource, LoginResource, RefreshResource, LogoutResource
 from api.order_resource import OrderResource, OrderDetailResource, OrdersByUserResource, OrderStatusResource
+from api.analytics_resource import ProductSalesAnalyticsResource, PartnerPerformanceAnalyticsResource, RegionTourismAnalyticsResource, OrderRollupResource, AnalyticsRebuildResource, SettlementResource
 
 # Import database connection
 from utils.snowflake_connector import init_snowflake
+from utils import local_db
+from utils.catalogue import catalogue
+
+# Import instrumentation
+from utils import metrics, token_revocation, rate_limit
+
+WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'false').lower() in ('1', 'true', 'yes')
+
+def warm_up():
+    """Load the data and the heavy dependencies that requests would otherwise load on first use"""
+    # Build the local database, or create the mock data files and load the catalogue
+    init_snowflake()
+    if not local_db.is_enabled():
+        catalogue.load()
+    
+    # Build the analytics and time-bucketed rollups (imports numpy)
+    from utils.analytics import engine
+    from utils.order_rollups import store
+    engine.ensure_built()
+    store.ensure_built()
+    
+    # Load the customer email index
+    from utils.customers import store as customers
+    customers.load()
+    
+    # Import qrcode and Pillow
+    import qrcode.image.pil
+    
+    # Workers must not inherit the connection the build and the loads above opened
+    local_db.close()
+    
+    # Move everything loaded so far out of the collector's reach, so that collections
+    # in forked workers do not write to (and so copy) the pages shared with the master
+    gc.freeze()
 
 def create_app():
     """Create and configure the Flask application"""
@@ -43,9 +87,13 @@ def create_app():
     
     # Initialize JWT
     jwt = JWTManager(app)
+    token_revocation.init_app(jwt)
     
-    # Initialize Snowflake connection
-    init_snowflake()
+    # Instrument requests and expose /metrics
+    metrics.init_app(app)
+    
+    # Rate limit clients and shed low-priority traffic under load
+    rate_limit.init_app(app)
     
     # Initialize API
     api = Api(app)
@@ -87,6 +135,14 @@ def create_app():
     api.add_resource(OrdersByUserResource, '/api/orders/user/<string:user_id>')
     api.add_resource(OrderStatusResource, '/api/orders/<string:order_id>/status')
     
+    # Analytics endpoints
+    api.add_resource(ProductSalesAnalyticsResource, '/api/analytics/product-sales')
+    api.add_resource(PartnerPerformanceAnalyticsResource, '/api/analytics/partner-performance')
+    api.add_resource(RegionTourismAnalyticsResource, '/api/analytics/region-tourism-sales')
+    api.add_resource(OrderRollupResource, '/api/analytics/orders')
+    api.add_resource(AnalyticsRebuildResource, '/api/analytics/rebuild')
+    api.add_resource(SettlementResource, '/api/analytics/settlements')
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -101,6 +157,10 @@ def create_app():
     def health_check():
         return jsonify({'status': 'healthy', 'service': 'handicraft-marketplace-api'})
     
+    # Load data up front instead of on the first requests
+    if WARMUP_ON_START:
+        warm_up()
+    
     return app
 
 if __name__ == '__main__':
@@ -0,0 +1,379 @@
+"""
+Analytics rollups for the Handicraft Marketplace Platform.
+
+Keeps the aggregates behind the ANALYTICS schema views (PRODUCT_SALES_ANALYTICS,
+PARTNER_PERFORMANCE_ANALYTICS and REGION_TOURISM_SALES_CORRELATION) in memory,
+so the /api/analytics endpoints never run the multi-join GROUP BYs.
+
+The rollups are built once from ORDER_ITEMS with vectorized group-bys, then
+updated incrementally: an inserted order adds its items, and a status change
+into or out of 'Cancelled' retracts or re-applies the order. Apart from
+leaving out cancelled orders, every figure matches the view definitions in
+snowflake_setup.sql, including PARTNER_PERFORMANCE_ANALYTICS summing the order's
+platform fee once per item row.
+
+Each worker process holds its own rollups; ANALYTICS_REFRESH_SECONDS bounds how
+long orders written through another worker can be missing before a rebuild.
+Only one rebuild runs at a time and requests keep reading the current rollups
+while it does; orders and status changes recorded during a rebuild are
+replayed onto the rebuilt rollups, so none are lost (IncrementalRollup, shared
+with utils.order_rollups).
+"""
+
+import os
+import time
+import threading
+import numpy as np
+from utils.snowflake_connector import execute_query
+
+# Orders in these statuses are not counted as sales
+EXCLUDED_STATUSES = ('Cancelled',)
+
+REFRESH_SECONDS = float(os.getenv('ANALYTICS_REFRESH_SECONDS', 300))
+
+ITEMS_QUERY = """
+    SELECT
+        oi.order_id,
+        oi.product_id,
+        oi.partner_id,
+        oi.quantity,
+        oi.price,
+        oi.subtotal,
+        o.platform_fee,
+        o.order_date,
+        o.status
+    FROM ORDER_ITEMS oi
+    JOIN ORDERS o ON oi.order_id = o.order_id
+"""
+
+
+def order_year(order_date):
+    """Calendar year of an ISO order date"""
+    return int(str(order_date)[:4])
+
+
+def group_sums(codes, n, *weights):
+    """Per-group sums of each weight array"""
+    return [np.bincount(codes, weights=weight, minlength=n) for weight in weights]
+
+
+def distinct_counts(codes, order_codes, n):
+    """Number of distinct orders (order_codes) per group"""
+    stride = int(order_codes.max()) + 1
+    pairs = np.unique(codes.astype(np.int64) * stride + order_codes)
+    return np.bincount(pairs // stride, minlength=n)
+
+
+def rollup_dict(keys, values):
+    """{key: [values...]} from group keys and per-group value arrays"""
+    return {key: row for key, row in zip(keys, np.column_stack(values).tolist())}
+
+
+class IncrementalRollup:
+    """Base of rollups built from ORDER_ITEMS and then kept up to date order by order.
+
+    Subclasses implement load(), which reads the database and returns the new state as
+    {attribute: value} (including excluded_orders) with the set of order ids it read, and
+    _apply(items, platform_fee, order_date, sign). Orders and status changes recorded while a
+    rebuild runs are applied to the current state and queued; once the rebuilt state is
+    installed they are replayed onto it, except orders the rebuild already read."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.rebuild_lock = threading.Lock()
+        self.built_at = None
+        self.pending = None  # changes recorded during the running rebuild, None when none runs
+        self.excluded_orders = set()
+
+    def load(self):
+        raise NotImplementedError
+
+    def install(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def _rebuild(self):
+        """Rebuild while holding rebuild_lock"""
+        with self.lock:
+            self.pending = []
+        try:
+            state, read_orders = self.load()
+        except BaseException:
+            with self.lock:
+                self.pending = None
+            raise
+        with self.lock:
+            pending, self.pending = self.pending, None
+            self.install(state)
+            self.built_at = time.monotonic()
+            for kind, args in pending:
+                if kind == 'status':
+                    self._record_status(*args)
+                elif args[0] not in read_orders:
+                    self._record_order(*args)
+
+    def rebuild(self):
+        """Recompute the rollup from the database (after any rebuild already running)"""
+        with self.rebuild_lock:
+            self._rebuild()
+
+    def ensure_built(self):
+        """Build on first use, waiting for a build already running, and rebuild once older than
+        REFRESH_SECONDS; a stale rollup is rebuilt by one request while the others keep reading it"""
+        with self.lock:
+            built_at = self.built_at
+        if built_at is not None and time.monotonic() - built_at <= REFRESH_SECONDS:
+            return
+        if built_at is None:
+            with self.rebuild_lock:
+                if self.built_at is None:
+                    self._rebuild()
+        elif self.rebuild_lock.acquire(blocking=False):
+            try:
+                if time.monotonic() - self.built_at > REFRESH_SECONDS:
+                    self._rebuild()
+            finally:
+                self.rebuild_lock.release()
+
+    def _record_order(self, order_id, items, platform_fee, order_date, status):
+        if status in EXCLUDED_STATUSES:
+            self.excluded_orders.add(order_id)
+        else:
+            self._apply(items, platform_fee, order_date, 1)
+
+    def _record_status(self, order_id, now_excluded, items):
+        # Decided against the state it is applied to, so replaying it is safe
+        if (order_id in self.excluded_orders) == now_excluded:
+            return
+        if now_excluded:
+            self.excluded_orders.add(order_id)
+        else:
+            self.excluded_orders.discard(order_id)
+        if items:
+            self._apply(items, items[0]['platform_fee'], items[0]['order_date'], -1 if now_excluded else 1)
+
+    def record_order(self, order_id, items, platform_fee, order_date, status='Processing'):
+        """Apply a newly inserted order"""
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append(('order', (order_id, items, platform_fee, order_date, status)))
+            if self.built_at is not None:
+                self._record_order(order_id, items, platform_fee, order_date, status)
+            # Otherwise the first build will read it from the database
+
+    def record_status(self, order_id, status):
+        """Retract or re-apply an order whose status moved into or out of the excluded statuses"""
+        now_excluded = status in EXCLUDED_STATUSES
+        with self.lock:
+            if self.pending is None and (self.built_at is None or (order_id in self.excluded_orders) == now_excluded):
+                return
+
+        rows = execute_query(ITEMS_QUERY + f" WHERE oi.order_id = '{order_id}'", {'order_id': order_id})
+        items = [{key.lower(): value for key, value in row.items()} for row in rows]
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append(('status', (order_id, now_excluded, items)))
+            if self.built_at is not None:
+                self._record_status(order_id, now_excluded, items)
+
+
+class AnalyticsEngine(IncrementalRollup):
+    """In-memory rollups of the three analytics views"""
+
+    def __init__(self):
+        super().__init__()
+        self.products = {}     # product_id -> [orders, quantity, revenue, price_sum, item_rows]
+        self.partners = {}     # partner_id -> [orders, quantity, revenue, platform_fees]
+        self.region_years = {}  # (region_id, year) -> [orders, sales]
+        self.dimensions = {}
+
+    def load_dimensions(self):
+        """Names and keys the views join to; they are not written through the API"""
+        def by_key(rows, key):
+            return {row[key]: row for row in rows}
+
+        return {
+            'products': by_key(execute_query(
+                "SELECT product_id, name, category_id, region_id, artisan_id FROM PRODUCTS"), 'PRODUCT_ID'),
+            'categories': by_key(execute_query("SELECT category_id, name FROM CATEGORIES"), 'CATEGORY_ID'),
+            'regions': by_key(execute_query("SELECT region_id, name, state FROM REGIONS"), 'REGION_ID'),
+            'artisans': by_key(execute_query("SELECT artisan_id, name FROM ARTISANS"), 'ARTISAN_ID'),
+            'partners': by_key(execute_query("SELECT partner_id, name FROM PARTNER_SITES"), 'PARTNER_ID'),
+            'tourist_stats': {(row['REGION_ID'], int(row['YEAR'])): row for row in execute_query(
+                "SELECT region_id, year, domestic_count, foreign_count FROM TOURIST_STATS")},
+        }
+
+    def load(self):
+        """Compute every rollup from ORDER_ITEMS with vectorized group-bys"""
+        dimensions = self.load_dimensions()
+        rows = execute_query(ITEMS_QUERY)
+        read_orders = {row['ORDER_ID'] for row in rows}
+        products, partners, region_years = {}, {}, {}
+        excluded = set()
+
+        if rows:
+            columns = {key: np.array([row[key] for row in rows], dtype=object) for key in rows[0]}
+            excluded_rows = np.isin(columns['STATUS'], EXCLUDED_STATUSES)
+            excluded = set(columns['ORDER_ID'][excluded_rows].tolist())
+            active = ~excluded_rows
+            columns = {key: values[active] for key, values in columns.items()}
+
+        if rows and len(columns['ORDER_ID']):
+            quantity = columns['QUANTITY'].astype(float)
+            price = columns['PRICE'].astype(float)
+            subtotal = columns['SUBTOTAL'].astype(float)
+            fee = np.array([value or 0 for value in columns['PLATFORM_FEE']], dtype=float)
+            ones = np.ones(len(subtotal))
+            _, order_codes = np.unique(columns['ORDER_ID'].astype(str), return_inverse=True)
+
+            # PRODUCT_SALES_ANALYTICS
+            product_ids, product_codes = np.unique(columns['PRODUCT_ID'].astype(str), return_inverse=True)
+            n = len(product_ids)
+            products = rollup_dict(product_ids.tolist(), [distinct_counts(product_codes, order_codes, n)]
+                               + group_sums(product_codes, n, quantity, subtotal, price, ones))
+
+            # PARTNER_PERFORMANCE_ANALYTICS
+            partner_ids, codes = np.unique(columns['PARTNER_ID'].astype(str), return_inverse=True)
+            n = len(partner_ids)
+            partners = rollup_dict(partner_ids.tolist(), [distinct_counts(codes, order_codes, n)]
+                               + group_sums(codes, n, quantity, subtotal, fee))
+
+            # REGION_TOURISM_SALES_CORRELATION, keyed by the product's region and the order year
+            product_regions = np.array([(dimensions['products'].get(key) or {}).get('REGION_ID') or ''
+                                        for key in product_ids.tolist()], dtype=object)
+            regions = product_regions[product_codes]
+            years = np.array([str(value)[:4] for value in columns['ORDER_DATE']]).astype(int)
+            known = regions != ''
+            if known.any():
+                region_codes, codes = np.unique(regions[known].astype(str), return_inverse=True)
+                region_codes = region_codes.tolist()
+                year_base = int(years[known].min())
+                keys, codes = np.unique(codes.astype(np.int64) * 10000 + (years[known] - year_base), return_inverse=True)
+                n = len(keys)
+                rollup = rollup_dict(keys.tolist(), [distinct_counts(codes, order_codes[known], n)]
+                                 + group_sums(codes, n, subtotal[known]))
+                region_years = {(region_codes[key // 10000], year_base + key % 10000): values
+                                for key, values in rollup.items()}
+
+        return {
+            'dimensions': dimensions,
+            'products': products,
+            'partners': partners,
+            'region_years': region_years,
+            'excluded_orders': excluded,
+        }, read_orders
+
+    def _apply(self, items, platform_fee, order_date, sign):
+        """Add (sign=1) or retract (sign=-1) one order's items; every group it touches
+        gains or loses exactly one distinct order"""
+        year = order_year(order_date)
+        product_regions = self.dimensions.get('products', {})
+        touched = {'products': set(), 'partners': set(), 'region_years': set()}
+        for item in items:
+            product_id, partner_id = item['product_id'], item['partner_id']
+            quantity, subtotal = float(item['quantity']), float(item['subtotal'])
+
+            product = self.products.setdefault(product_id, [0, 0.0, 0.0, 0.0, 0])
+            product[1] += sign * quantity
+            product[2] += sign * subtotal
+            product[3] += sign * float(item['price'])
+            product[4] += sign
+            touched['products'].add(product_id)
+
+            partner = self.partners.setdefault(partner_id, [0, 0.0, 0.0, 0.0])
+            partner[1] += sign * quantity
+            partner[2] += sign * subtotal
+            partner[3] += sign * float(platform_fee or 0)
+            touched['partners'].add(partner_id)
+
+            region_id = (product_regions.get(product_id) or {}).get('REGION_ID')
+            if region_id:
+                region = self.region_years.setdefault((region_id, year), [0, 0.0])
+                region[1] += sign * subtotal
+                touched['region_years'].add((region_id, year))
+
+        for name, keys in touched.items():
+            rollup = getattr(self, name)
+            for key in keys:
+                rollup[key][0] += sign
+                if rollup[key][0] <= 0:
+                    del rollup[key]
+
+    def product_sales(self):
+        """Rows of PRODUCT_SALES_ANALYTICS"""
+        self.ensure_built()
+        with self.lock:
+            dims = self.dimensions
+            rows = []
+            for product_id, (orders, quantity, revenue, price_sum, item_rows) in self.products.items():
+                product = dims['products'].get(product_id)
+                # The view inner-joins categories, regions and artisans
+                if not product:
+                    continue
+                category = dims['categories'].get(product['CATEGORY_ID'])
+                region = dims['regions'].get(product['REGION_ID'])
+                artisan = dims['artisans'].get(product['ARTISAN_ID'])
+                if not (category and region and artisan):
+                    continue
+                rows.append({
+                    'PRODUCT_ID': product_id,
+                    'PRODUCT_NAME': product['NAME'],
+                    'CATEGORY_ID': product['CATEGORY_ID'],
+                    'CATEGORY_NAME': category['NAME'],
+                    'REGION_ID': product['REGION_ID'],
+                    'REGION_NAME': region['NAME'],
+                    'ARTISAN_ID': product['ARTISAN_ID'],
+                    'ARTISAN_NAME': artisan['NAME'],
+                    'TOTAL_ORDERS': int(orders),
+                    'TOTAL_QUANTITY_SOLD': int(quantity),
+                    'TOTAL_REVENUE': revenue,
+                    'AVERAGE_SELLING_PRICE': price_sum / item_rows if item_rows else None
+                })
+        return rows
+
+    def partner_performance(self):
+        """Rows of PARTNER_PERFORMANCE_ANALYTICS"""
+        self.ensure_built()
+        with self.lock:
+            rows = []
+            for partner_id, (orders, quantity, revenue, fees) in self.partners.items():
+                partner = self.dimensions['partners'].get(partner_id)
+                if not partner:
+                    continue
+                rows.append({
+                    'PARTNER_ID': partner_id,
+                    'PARTNER_NAME': partner['NAME'],
+                    'TOTAL_ORDERS': int(orders),
+                    'TOTAL_PRODUCTS_SOLD': int(quantity),
+                    'TOTAL_REVENUE': revenue,
+                    'TOTAL_PLATFORM_FEES': fees,
+                    'PARTNER_REVENUE': revenue - fees
+                })
+        return rows
+
+    def region_tourism_sales(self):
+        """Rows of REGION_TOURISM_SALES_CORRELATION"""
+        self.ensure_built()
+        with self.lock:
+            rows = []
+            for (region_id, year), (orders, sales) in self.region_years.items():
+                region = self.dimensions['regions'].get(region_id)
+                stats = self.dimensions['tourist_stats'].get((region_id, year))
+                if not (region and stats):
+                    continue
+                domestic, foreign = stats['DOMESTIC_COUNT'], stats['FOREIGN_COUNT']
+                rows.append({
+                    'REGION_ID': region_id,
+                    'REGION_NAME': region['NAME'],
+                    'STATE': region['STATE'],
+                    'YEAR': year,
+                    'DOMESTIC_COUNT': domestic,
+                    'FOREIGN_COUNT': foreign,
+                    'TOTAL_TOURISTS': domestic + foreign if domestic is not None and foreign is not None else None,
+                    'TOTAL_ORDERS': int(orders),
+                    'TOTAL_SALES': sales
+                })
+        return rows
+
+
+engine = AnalyticsEngine()
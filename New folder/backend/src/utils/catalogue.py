@@ -0,0 +1,109 @@
+"""
+In-memory catalogue for the mock backend of the Handicraft Marketplace Platform.
+
+The catalogue tables (products, artisans, partners, categories and regions)
+are read-only while the app runs, so instead of parsing their JSON files on
+every query the mock connector reads them from here: each table is parsed once
+and indexed by the columns the queries filter on. A table is reloaded when its
+file changes (by modification time and size), e.g. after
+initialize_mock_data(overwrite=True).
+
+Rows are shared by every request and must not be modified; the connector
+returns copies. Under gunicorn --preload with WARMUP_ON_START, the master
+process loads the catalogue in create_app() and freezes it against the garbage
+collector (gc.freeze()) before forking, so the workers share its pages
+copy-on-write instead of each holding a copy.
+
+When CATALOGUE_SNAPSHOT names a snapshot built by utils.snapshot, the tables
+are read from it instead: opening it maps the file without parsing any rows,
+rows are decoded when a query reads them, and processes share the file through
+the OS page cache rather than copy-on-write. The snapshot is reopened when the
+file is replaced.
+"""
+
+import os
+import json
+import threading
+
+SNAPSHOT_PATH = os.getenv('CATALOGUE_SNAPSHOT')
+
+# Indexed columns per table; every table is also indexed by its ID column
+INDEXES = {
+    'products': ('PRODUCT_ID', 'CATEGORY_ID', 'REGION_ID', 'ARTISAN_ID'),
+    'artisans': ('ARTISAN_ID',),
+    'partners': ('PARTNER_ID',),
+    'categories': ('CATEGORY_ID',),
+    'regions': ('REGION_ID',),
+}
+
+
+class Table:
+    """Rows of one catalogue file and their indexes: {column: {value: [rows]}}"""
+
+    def __init__(self, rows, columns, stamp):
+        self.rows = rows
+        self.stamp = stamp
+        self.indexes = {column: {} for column in columns}
+        for row in rows:
+            for column, index in self.indexes.items():
+                index.setdefault(row.get(column), []).append(row)
+
+    def where(self, column, value):
+        return self.indexes[column].get(value, [])
+
+
+class Catalogue:
+    """Catalogue tables by name, loaded from DATA_DIR/<name>.json on first use"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.snapshot = None
+
+    def path(self, name):
+        # Imported here because the connector reads the catalogue through this module
+        from utils.snowflake_connector import DATA_DIR
+        return os.path.join(DATA_DIR, f'{name}.json')
+
+    def _snapshot(self):
+        """The mapped snapshot, reopened if the file has been replaced"""
+        from utils.snapshot import Snapshot
+        stat = os.stat(SNAPSHOT_PATH)
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.stamp != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            with self.lock:
+                snapshot = self.snapshot
+                if snapshot is None or snapshot.stamp != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+                    snapshot = self.snapshot = Snapshot(SNAPSHOT_PATH)
+        return snapshot
+
+    def table(self, name):
+        """The table, reloaded if its file has changed since it was loaded"""
+        if SNAPSHOT_PATH:
+            return self._snapshot().table(name)
+        path = self.path(name)
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        table = self.tables.get(name)
+        if table is None or table.stamp != stamp:
+            with self.lock:
+                table = self.tables.get(name)
+                if table is None or table.stamp != stamp:
+                    with open(path, 'r') as f:
+                        table = Table(json.load(f), INDEXES[name], stamp)
+                    self.tables[name] = table
+        return table
+
+    def rows(self, name):
+        return self.table(name).rows
+
+    def where(self, name, column, value):
+        return self.table(name).where(column, value)
+
+    def load(self):
+        """Load every table now rather than on the first queries"""
+        for name in INDEXES:
+            self.table(name)
+
+
+catalogue = Catalogue()
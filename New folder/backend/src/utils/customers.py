@@ -0,0 +1,263 @@
+"""
+Customer accounts for the Handicraft Marketplace Platform.
+
+Customers are indexed in memory by case-normalized email, so the duplicate
+check on registration and the lookup on login are a dict probe. The index is
+loaded from CUSTOMERS once per process; an email it does not know is looked up
+by the (indexed) email column before being treated as new, which picks up
+customers registered by other workers. Emails are stored normalized.
+Snowflake does not enforce UNIQUE, so registration inserts only if no row has
+the email and then re-reads the email's rows: the earliest one is the account,
+and a worker whose row lost the race deletes it and reports a conflict.
+
+Passwords are hashed with an adaptive KDF, scrypt or PBKDF2-SHA256 (PASSWORD_KDF),
+in the format `algorithm$parameters$salt$hash`. Hashing runs on a bounded pool
+of PASSWORD_HASH_WORKERS threads (hashlib releases the GIL) with at most
+PASSWORD_HASH_QUEUE calls waiting, so a login storm uses a fixed share of the
+CPU and excess logins fail fast with PasswordHashBusy instead of starving
+catalogue requests. Legacy unsalted SHA-256 hashes are still accepted and are
+rehashed with the current KDF on the next successful login, as are hashes with
+weaker parameters than configured.
+"""
+
+import os
+import hmac
+import uuid
+import base64
+import hashlib
+import secrets
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from utils.snowflake_connector import execute_query
+
+KDF = os.getenv('PASSWORD_KDF', 'scrypt' if hasattr(hashlib, 'scrypt') else 'pbkdf2_sha256').lower()
+PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 600000))
+SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 14))
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', HASH_WORKERS * 8))
+HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+_pool = {}
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE)
+
+
+def _reset_after_fork():
+    """The pool's threads do not survive fork: start a new pool in the child"""
+    global _pool_lock, _slots
+    _pool.clear()
+    _pool_lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE)
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class PasswordHashBusy(Exception):
+    """The password hashing pool is full; the caller should retry later"""
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def _quote(value):
+    return str(value).replace("'", "''")
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def hash_password(password, salt=None):
+    """Hash a password with the configured KDF"""
+    salt = salt or secrets.token_bytes(16)
+    if KDF == 'scrypt':
+        digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                                maxmem=256 * SCRYPT_N * SCRYPT_R, dklen=32)
+        return f"scrypt${SCRYPT_N},{SCRYPT_R},{SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password, stored):
+    """Check a password against a stored hash. Returns (matches, needs_rehash)."""
+    if not stored:
+        return False, False
+
+    # Legacy unsalted SHA-256 hex digests
+    if '$' not in stored:
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored), True
+
+    algorithm, params, salt, expected = stored.split('$')
+    salt = base64.b64decode(salt)
+    if algorithm == 'scrypt':
+        n, r, p = (int(value) for value in params.split(','))
+        digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32)
+        weaker = KDF != 'scrypt' or n < SCRYPT_N
+    else:
+        iterations = int(params)
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+        weaker = KDF != 'pbkdf2_sha256' or iterations < PBKDF2_ITERATIONS
+    matches = hmac.compare_digest(_b64(digest), expected)
+    return matches, matches and weaker
+
+
+def _verify_and_rehash(password, stored):
+    """Verify, and hash again with the current KDF when the stored hash is outdated (one pool task)"""
+    matches, needs_rehash = verify_password(password, stored or _dummy_hash())
+    return matches, hash_password(password) if needs_rehash else None
+
+
+def run_password_task(fn, *args):
+    """Run a hashing function on the bounded pool and wait for it; raises PasswordHashBusy when full"""
+    if not _slots.acquire(blocking=False):
+        raise PasswordHashBusy()
+    try:
+        with _pool_lock:
+            if 'executor' not in _pool:
+                # Created on first use, and dropped on fork, so each worker starts its own threads
+                _pool['executor'] = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+        future = _pool['executor'].submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=HASH_TIMEOUT)
+    except FutureTimeoutError:
+        raise PasswordHashBusy()
+
+
+# Verified against when the email is unknown, so an unknown email costs as much as a wrong password
+_DUMMY_HASH = {}
+
+
+def _dummy_hash():
+    if 'hash' not in _DUMMY_HASH:
+        _DUMMY_HASH['hash'] = hash_password(secrets.token_hex(16))
+    return _DUMMY_HASH['hash']
+
+
+class CustomerStore:
+    """Customers by normalized email: {email: {'CUSTOMER_ID', 'NAME', 'EMAIL', 'PASSWORD_HASH'}}"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_email = None
+        self.registering = set()
+
+    def _index(self):
+        if self.by_email is None:
+            rows = execute_query("SELECT customer_id, name, email, password_hash FROM CUSTOMERS")
+            index = {}
+            for row in rows:
+                index.setdefault(normalize_email(row['EMAIL']), row)
+            with self.lock:
+                if self.by_email is None:
+                    self.by_email = index
+        return self.by_email
+
+    def load(self):
+        """Load the email index now rather than on the first lookup"""
+        self._index()
+
+    def find(self, email):
+        """The customer registered with email (in any case), or None"""
+        key = normalize_email(email)
+        customer = self._index().get(key)
+        if customer is None:
+            # Registered by another worker after the index was loaded
+            query = f"SELECT customer_id, name, email, password_hash FROM CUSTOMERS WHERE email = '{_quote(key)}'"
+            rows = execute_query(query, {'email': key})
+            if rows:
+                customer = rows[0]
+                with self.lock:
+                    self.by_email[key] = customer
+        return customer
+
+    def register(self, name, email, password, address, phone):
+        """Create a customer and return it, or None if the email is already registered"""
+        key = normalize_email(email)
+        with self.lock:
+            if key in self.registering:
+                return None
+            self.registering.add(key)
+        try:
+            if self.find(key):
+                return None
+
+            password_hash = run_password_task(hash_password, password)
+            customer_id = str(uuid.uuid4())
+            now = datetime.now().isoformat()
+            customer = {'CUSTOMER_ID': customer_id, 'NAME': name, 'EMAIL': key, 'PASSWORD_HASH': password_hash}
+
+            insert_query = f"""
+                INSERT INTO CUSTOMERS (
+                    customer_id, name, email, password_hash, address, phone, created_at, updated_at
+                )
+                SELECT
+                    '{customer_id}',
+                    '{_quote(name)}',
+                    '{_quote(key)}',
+                    '{password_hash}',
+                    '{_quote(address)}',
+                    '{_quote(phone)}',
+                    '{now}',
+                    '{now}'
+                WHERE NOT EXISTS (SELECT 1 FROM CUSTOMERS WHERE email = '{_quote(key)}')
+            """
+            try:
+                execute_query(insert_query, {'customer_data': {**customer, 'ADDRESS': address, 'PHONE': phone,
+                                                               'CREATED_AT': now, 'UPDATED_AT': now}})
+            except Exception as e:
+                # A database that does enforce the UNIQUE email constraint (the winning row may not be visible yet)
+                if self.find(key) or 'constraint' in str(e).lower():
+                    return None
+                raise
+
+            # Workers that both passed NOT EXISTS have both inserted: the earliest row is the account
+            rows = execute_query(
+                f"SELECT customer_id, name, email, password_hash FROM CUSTOMERS WHERE email = '{_quote(key)}' "
+                f"ORDER BY created_at, customer_id", {'email': key})
+            if not rows or rows[0]['CUSTOMER_ID'] != customer_id:
+                if any(row['CUSTOMER_ID'] == customer_id for row in rows):
+                    execute_query(f"DELETE FROM CUSTOMERS WHERE customer_id = '{customer_id}'", {'customer_id': customer_id})
+                if rows:
+                    with self.lock:
+                        self.by_email[key] = rows[0]
+                return None
+
+            with self.lock:
+                self.by_email[key] = customer
+            return customer
+        finally:
+            with self.lock:
+                self.registering.discard(key)
+
+    def authenticate(self, email, password):
+        """The customer if the email and password match, else None; outdated hashes are upgraded"""
+        customer = self.find(email)
+        stored = customer['PASSWORD_HASH'] if customer else None
+        matches, new_hash = run_password_task(_verify_and_rehash, password, stored)
+        if not customer or not matches:
+            return None
+
+        if new_hash:
+            update_query = f"""
+                UPDATE CUSTOMERS
+                SET password_hash = '{new_hash}', updated_at = '{datetime.now().isoformat()}'
+                WHERE customer_id = '{customer['CUSTOMER_ID']}'
+            """
+            execute_query(update_query, {'customer_id': customer['CUSTOMER_ID'], 'password_hash': new_hash})
+            with self.lock:
+                self.by_email[normalize_email(customer['EMAIL'])] = {**customer, 'PASSWORD_HASH': new_hash}
+        return customer
+
+
+store = CustomerStore()
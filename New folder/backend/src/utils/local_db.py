@@ -0,0 +1,396 @@
+"""
+Local embedded SQL backend for the Handicraft Marketplace Platform.
+
+Runs the resources' SQL against a local SQLite database (or DuckDB, when it is
+installed) instead of the JSON mock. The schema is translated from
+database/snowflake_setup.sql, the processed CSVs from database/processed_data
+are imported in one transaction, and every foreign key column is indexed.
+
+Select it with DB_BACKEND=sqlite or DB_BACKEND=duckdb. The database file is
+built on first use and rebuilt whenever the schema or the CSVs change, but
+never while another process has it open: every process using it holds a
+shared lock on DB_PATH.users, and a stale database is only replaced once the
+processes using it have exited (e.g. on the next deploy). DuckDB takes an
+exclusive lock on its file, so DB_BACKEND=duckdb serves from one process;
+run a single worker with it, or use SQLite.
+Each thread gets its own connection; SQLite runs in WAL mode so readers never
+block the writer. Connections are never shared across fork: a forked worker
+(gunicorn --preload after WARMUP_ON_START) drops the ones it inherited from the
+master and opens its own.
+"""
+
+import os
+import re
+import csv
+import json
+import fcntl
+import hashlib
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from utils import metrics
+
+BACKEND = os.getenv('DB_BACKEND', 'mock').lower()
+
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+SCHEMA_FILE = os.getenv('LOCAL_DB_SCHEMA', os.path.join(_REPO_DIR, 'database', 'snowflake_setup.sql'))
+CSV_DIR = os.getenv('LOCAL_DB_CSV_DIR', os.path.join(_REPO_DIR, 'database', 'processed_data'))
+DB_PATH = os.getenv('LOCAL_DB_PATH', os.path.join(
+    _REPO_DIR, 'backend', '.local_db', f"handicraft.{'duckdb' if BACKEND == 'duckdb' else 'sqlite'}"))
+
+# Snowflake column types -> (SQLite type, DuckDB type)
+TYPE_MAP = [
+    (r'VARCHAR\(\d+\)|TEXT|STRING', ('TEXT', 'VARCHAR')),
+    (r'DECIMAL\((\d+),\s*(\d+)\)', ('REAL', r'DECIMAL(\1,\2)')),
+    (r'TIMESTAMP_NTZ', ('TEXT', 'TIMESTAMP')),
+    (r'BOOLEAN', ('INTEGER', 'BOOLEAN')),
+    (r'INTEGER', ('INTEGER', 'BIGINT')),
+    (r'DATE', ('TEXT', 'DATE')),
+    (r'ARRAY|VARIANT', ('TEXT', 'JSON')),
+]
+
+_local = threading.local()
+_build_lock = threading.Lock()
+_duckdb = {}
+_users = {}  # 'file': DB_PATH.users, held with a shared lock while this process uses the database
+_ready = False
+_inherited = []  # connections opened before fork, kept unclosed so the child never touches them
+
+
+def _reset_after_fork():
+    """Forget the parent's connections in a forked child; closing them there could
+    checkpoint or release locks on the parent's behalf"""
+    global _local, _build_lock, _ready
+    _inherited.extend([getattr(_local, 'holder', None), _duckdb.pop('database', None)])
+    _local = threading.local()
+    _build_lock = threading.Lock()
+    _ready = False
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def is_enabled():
+    """Whether the resources' queries should run against the local database"""
+    return BACKEND in ('sqlite', 'duckdb')
+
+
+def _translate_type(column_sql, dialect):
+    for pattern, targets in TYPE_MAP:
+        target = targets[0] if dialect == 'sqlite' else targets[1]
+        translated, count = re.subn(rf'\b(?:{pattern})(?=\s|,|$)', target, column_sql, count=1)
+        if count:
+            return translated
+    return column_sql
+
+
+def translate_schema(setup_sql, dialect='sqlite'):
+    """Translate the Snowflake setup script into (tables, views, indexes) statements.
+
+    Tables keep their columns, keys and defaults with local types; analytics and
+    secure views drop their schema prefixes; every FOREIGN KEY column gets an index.
+    Procedures, grants and the sample INSERTs are Snowflake-only and skipped."""
+    tables, views, indexes = [], [], []
+
+    for name, body in re.findall(r'CREATE OR REPLACE TABLE (\w+) \((.*?)\n\);', setup_sql, re.S):
+        lines = []
+        for line in body.strip().splitlines():
+            line = line.strip().rstrip(',')
+            fk = re.match(r'FOREIGN KEY \((\w+)\) REFERENCES (\w+)\((\w+)\)', line)
+            if fk:
+                indexes.append(f"CREATE INDEX IF NOT EXISTS IDX_{name}_{fk.group(1).upper()} ON {name} ({fk.group(1)})")
+            else:
+                line = _translate_type(line, dialect).replace('CURRENT_TIMESTAMP()', 'CURRENT_TIMESTAMP')
+            lines.append(line)
+        tables.append(f"CREATE TABLE {name} (\n    " + ',\n    '.join(lines) + "\n)")
+
+    for name, body in re.findall(r'CREATE OR REPLACE (?:SECURE )?VIEW (\w+) AS\s*(.*?);', setup_sql, re.S):
+        body = re.sub(r'\bCORE\.', '', body)
+        if dialect == 'sqlite':
+            body = re.sub(r'EXTRACT\(YEAR FROM ([\w.]+)\)', r"CAST(strftime('%Y', \1) AS INTEGER)", body)
+        views.append(f"CREATE VIEW {name} AS\n{body.strip()}")
+
+    return tables, views, indexes
+
+
+def table_columns(setup_sql):
+    """Column names and local type declarations of every table, by table name"""
+    columns = {}
+    for statement in translate_schema(setup_sql)[0]:
+        name = re.match(r'CREATE TABLE (\w+)', statement).group(1)
+        columns[name] = {}
+        for line in statement.splitlines()[1:-1]:
+            parts = line.strip().rstrip(',').split()
+            if parts and parts[0] not in ('FOREIGN', 'PRIMARY'):
+                columns[name][parts[0]] = ' '.join(parts[1:])
+    return columns
+
+
+def _source_digest():
+    """Digest of the schema and every CSV, used to decide whether to rebuild"""
+    digest = hashlib.sha256()
+    for path in [SCHEMA_FILE] + sorted(
+            os.path.join(CSV_DIR, name) for name in os.listdir(CSV_DIR) if name.endswith('.csv')):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def _csv_rows(path, types):
+    """Rows of a processed CSV restricted to the table's columns; empty values become NULL,
+    except in NOT NULL columns, which keep the empty string"""
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        keep = [(i, col) for i, col in enumerate(header) if col in types]
+        rows = []
+        for record in reader:
+            row = []
+            for i, col in keep:
+                value = record[i] if i < len(record) else ''
+                if value == '':
+                    value = '' if 'NOT NULL' in types[col] else None
+                elif types[col].startswith('INTEGER') and value.lower() in ('true', 'false'):
+                    value = int(value.lower() == 'true')
+                row.append(value)
+            rows.append(row)
+    return [col for _, col in keep], rows
+
+
+def _build_sqlite(path, setup_sql):
+    tables, views, indexes = translate_schema(setup_sql, 'sqlite')
+    columns = table_columns(setup_sql)
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('BEGIN')
+        for statement in tables:
+            conn.execute(statement)
+        # Bulk import every processed CSV that matches a table, in the same transaction
+        for table, types in columns.items():
+            csv_path = os.path.join(CSV_DIR, f"{table.lower()}.csv")
+            if not os.path.exists(csv_path):
+                continue
+            names, rows = _csv_rows(csv_path, types)
+            if names:
+                placeholders = ', '.join('?' for _ in names)
+                conn.executemany(f"INSERT OR REPLACE INTO {table} ({', '.join(names)}) VALUES ({placeholders})", rows)
+        for statement in indexes + views:
+            conn.execute(statement)
+        conn.execute('COMMIT')
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+
+
+def _build_duckdb(path, setup_sql):
+    import duckdb
+    tables, views, indexes = translate_schema(setup_sql, 'duckdb')
+    columns = table_columns(setup_sql)
+
+    conn = duckdb.connect(path)
+    try:
+        conn.execute('BEGIN TRANSACTION')
+        # DuckDB does not allow indexes on columns that take part in foreign keys, so the
+        # constraints are dropped and the columns indexed instead
+        for statement in tables:
+            head, *body, tail = statement.splitlines()
+            lines = [line.strip().rstrip(',') for line in body if not line.strip().startswith('FOREIGN KEY')]
+            conn.execute(f"{head}\n    " + ',\n    '.join(lines) + f"\n{tail}")
+        for table, types in columns.items():
+            csv_path = os.path.join(CSV_DIR, f"{table.lower()}.csv")
+            if not os.path.exists(csv_path):
+                continue
+            with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+                names = [col for col in next(csv.reader(f), []) if col in types]
+            if names:
+                # INSERT OR REPLACE needs a single unique constraint in DuckDB (CUSTOMERS also has a
+                # unique email), so the conflict target is the primary key
+                key = next(col for col, declared in types.items() if 'PRIMARY KEY' in declared)
+                updates = ', '.join(f"{col} = EXCLUDED.{col}" for col in names if col != key)
+                conn.execute(
+                    f"INSERT INTO {table} ({', '.join(names)}) "
+                    f"SELECT {', '.join(names)} FROM read_csv(?, header = true, all_varchar = true) "
+                    f"ON CONFLICT ({key}) DO {f'UPDATE SET {updates}' if updates else 'NOTHING'}", [csv_path])
+        for statement in indexes + views:
+            conn.execute(statement)
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+
+
+def build_database(force=False):
+    """Build the local database from the schema and CSVs unless it is up to date, and
+    register this process as a user of it. A file lock makes concurrent workers wait
+    for a single build, and a database that other processes have open is left in place."""
+    digest = _source_digest()
+    stamp_path = f"{DB_PATH}.source"
+    os.makedirs(os.path.dirname(DB_PATH) or '.', exist_ok=True)
+
+    with open(f"{DB_PATH}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with open(stamp_path, 'r') as f:
+                current = f.read().strip() == digest and os.path.exists(DB_PATH)
+        except OSError:
+            current = False
+        if current and not force:
+            _use_database()
+            return False
+
+        # Replacing the file (and its WAL) under open connections could lose their writes
+        users_file = open(f"{DB_PATH}.users", 'a')
+        try:
+            fcntl.flock(users_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if os.path.exists(DB_PATH):
+                users_file.close()
+                print(f"Local database {DB_PATH} is out of date but open in other processes; "
+                      f"it will be rebuilt once they have exited")
+                _use_database()
+                return False
+        try:
+            with open(SCHEMA_FILE, 'r') as f:
+                setup_sql = f.read()
+            tmp_path = f"{DB_PATH}.{os.getpid()}.tmp"
+            for suffix in ('', '-wal', '-shm', '.wal'):
+                if os.path.exists(tmp_path + suffix):
+                    os.remove(tmp_path + suffix)
+            if BACKEND == 'duckdb':
+                _build_duckdb(tmp_path, setup_sql)
+            else:
+                _build_sqlite(tmp_path, setup_sql)
+            for suffix in ('-wal', '-shm', '.wal'):
+                if os.path.exists(DB_PATH + suffix):
+                    os.remove(DB_PATH + suffix)
+            os.replace(tmp_path, DB_PATH)
+            with open(stamp_path, 'w') as f:
+                f.write(digest)
+            fcntl.flock(users_file, fcntl.LOCK_SH)
+        except BaseException:
+            users_file.close()
+            raise
+        _use_database(users_file)
+        return True
+
+
+def _use_database(users_file=None):
+    """Hold a shared lock on DB_PATH.users for the life of the process (and its forked workers)"""
+    if 'file' in _users:
+        if users_file is not None:
+            users_file.close()
+        return
+    if users_file is None:
+        users_file = open(f"{DB_PATH}.users", 'a')
+        fcntl.flock(users_file, fcntl.LOCK_SH)
+    _users['file'] = users_file
+
+
+class ArrayAgg:
+    """ARRAY_AGG for SQLite: a JSON array of the non-null values, as Snowflake returns it"""
+
+    def __init__(self):
+        self.values = []
+
+    def step(self, value):
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self):
+        return json.dumps(self.values)
+
+
+class _ThreadConnection:
+    """Holds one thread's connection and closes it when the thread's locals are dropped"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        metrics.inc_gauge('db_connections_open')
+
+    def __del__(self):
+        try:
+            self.conn.close()
+        finally:
+            metrics.inc_gauge('db_connections_open', -1)
+
+
+def _connect():
+    """Open a connection for the calling thread"""
+    if BACKEND == 'duckdb':
+        import duckdb
+        with _build_lock:
+            if 'database' not in _duckdb:
+                try:
+                    _duckdb['database'] = duckdb.connect(DB_PATH)
+                except duckdb.IOException as e:
+                    raise RuntimeError(
+                        f"DB_BACKEND=duckdb serves from a single process, and {DB_PATH} is already open in "
+                        f"another one: run one worker (gunicorn -w 1) or use DB_BACKEND=sqlite ({e})") from e
+        # DuckDB is shared between threads through per-thread cursors
+        return _duckdb['database'].cursor()
+
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA busy_timeout = 5000')
+    conn.create_aggregate('ARRAY_AGG', 1, ArrayAgg)
+    return conn
+
+
+def connection():
+    """The calling thread's connection, opened on first use"""
+    holder = getattr(_local, 'holder', None)
+    if holder is None:
+        init()
+        holder = _ThreadConnection(_connect())
+        _local.holder = holder
+    return holder.conn
+
+
+def close():
+    """Close the calling thread's connection and the shared DuckDB database, e.g. in
+    the gunicorn master before it forks its workers"""
+    if getattr(_local, 'holder', None) is not None:
+        del _local.holder
+    database = _duckdb.pop('database', None)
+    if database is not None:
+        database.close()
+
+
+def init():
+    """Build the database once per process"""
+    global _ready
+    if not _ready:
+        with _build_lock:
+            if not _ready:
+                build_database()
+                _ready = True
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def execute_query(query, params=None):
+    """Run a query on the calling thread's connection and return rows as dicts with
+    uppercase keys, the way Snowflake returns unquoted identifiers"""
+    if isinstance(params, dict):
+        # Only bind the names the statement uses (:name or $name); DuckDB rejects the rest
+        params = {name: value for name, value in params.items() if re.search(rf'[:$]{re.escape(name)}\b', query)}
+    cursor = connection().execute(query, params or ())
+    if cursor.description is None:
+        return []
+    names = [col[0].upper() for col in cursor.description]
+    if BACKEND == 'sqlite':
+        # SQLite only returns str, int, float and None
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+    return [dict(zip(names, map(_json_value, row))) for row in cursor.fetchall()]
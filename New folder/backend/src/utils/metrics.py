@@ -0,0 +1,369 @@
+"""
+Metrics utility for the Handicraft Marketplace Platform.
+
+Records request, cache, database and QR code metrics and renders them in the
+Prometheus text exposition format. Each thread writes to its own shard so the
+request path never takes a lock; shards are only summed when /metrics is
+scraped. When a thread exits its shard is folded into a retired total, so a
+thread-per-request server keeps one shard per live thread. When METRICS_MULTIPROC_DIR is set, every gunicorn worker periodically
+writes its totals there and a scrape on any worker aggregates all of them. The
+flusher starts with a worker's first request, and a forked worker starts from
+empty shards, so with --preload neither the master's flusher nor its warm-up
+metrics are inherited.
+"""
+
+import os
+import json
+import time
+import glob
+import bisect
+import weakref
+import threading
+from contextlib import contextmanager
+
+# Latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Shared directory for aggregating metrics across gunicorn workers
+MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR')
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+# Metric metadata: name -> (type, help)
+METRICS = {
+    'http_requests_total': ('counter', 'Total HTTP requests by route, method and status code.'),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by route and method.'),
+    'http_requests_in_flight': ('gauge', 'HTTP requests currently being served.'),
+    'cache_requests_total': ('counter', 'Cache lookups by cache name and result.'),
+    'cache_hit_ratio': ('gauge', 'Cache hit ratio by cache name.'),
+    'db_queries_total': ('counter', 'Database queries executed.'),
+    'db_query_duration_seconds': ('histogram', 'Database query latency.'),
+    'db_connections_open': ('gauge', 'Database connections currently open.'),
+    'qr_render_duration_seconds': ('histogram', 'QR code render and save latency.'),
+    'token_revocation_checks_total': ('counter', 'JWT revocation checks by result (not_revoked, revoked, false_positive).'),
+    'requests_rejected_total': ('counter', 'Requests rejected by reason (rate_limited, shed) and priority.'),
+    'shed_queue_latency_seconds': ('gauge', 'Moving average of request queue latency used for load shedding.'),
+    'single_flight_calls_total': ('counter', 'Coalesced calls by role (leader computed, shared, timeout).'),
+    'procedure_duration_seconds': ('histogram', 'Stored procedure latency by procedure and path (local or remote).'),
+}
+
+# Per-thread shards by id, and the totals of threads that have exited; the lock is
+# only taken when a thread registers or retires its shard
+_local = threading.local()
+_shards = {}
+_shards_lock = threading.RLock()
+
+# Gauges computed at scrape time: name -> callable returning {labels: value}
+_gauge_callbacks = {}
+
+_flusher_pid = None
+
+
+def _new_shard():
+    return {'counters': {}, 'gauges': {}, 'histograms': {}}
+
+
+_retired = _new_shard()
+
+
+class _ShardHolder:
+    """Owns a thread's shard through its thread-local; dropped when the thread exits"""
+
+    def __init__(self, shard):
+        self.shard = shard
+
+
+def _merge(total, shard):
+    for kind in ('counters', 'gauges'):
+        values = total[kind]
+        for key, value in list(shard[kind].items()):
+            values[key] = values.get(key, 0) + value
+    for key, hist in list(shard['histograms'].items()):
+        summed = total['histograms'].setdefault(key, [0] * len(hist))
+        for i, value in enumerate(list(hist)):
+            summed[i] += value
+
+
+def _retire(shard_id, shard):
+    """Fold an exited thread's shard into the retired totals"""
+    with _shards_lock:
+        if _shards.pop(shard_id, None) is shard:
+            _merge(_retired, shard)
+
+
+def _shard():
+    """Return the calling thread's metric shard, creating it on first use"""
+    holder = getattr(_local, 'holder', None)
+    if holder is None:
+        shard = _new_shard()
+        holder = _ShardHolder(shard)
+        with _shards_lock:
+            _shards[id(shard)] = shard
+        weakref.finalize(holder, _retire, id(shard), shard)
+        _local.holder = holder
+    return holder.shard
+
+
+def _reset_after_fork():
+    """Start a forked worker from empty shards; the parent's belong to the parent's file"""
+    global _local, _shards, _shards_lock, _retired
+    _local = threading.local()
+    _shards = {}
+    _shards_lock = threading.RLock()
+    _retired = _new_shard()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())) if labels else ())
+
+
+def inc_counter(name, value=1, **labels):
+    """Increment a counter"""
+    counters = _shard()['counters']
+    key = _key(name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+
+def inc_gauge(name, value=1, **labels):
+    """Adjust a gauge by value (use a negative value to decrement)"""
+    gauges = _shard()['gauges']
+    key = _key(name, labels)
+    gauges[key] = gauges.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """Record an observation in a histogram"""
+    histograms = _shard()['histograms']
+    key = _key(name, labels)
+    hist = histograms.get(key)
+    if hist is None:
+        # One slot per bucket, one for +Inf, then the running sum
+        hist = [0] * (len(LATENCY_BUCKETS) + 2)
+        histograms[key] = hist
+    hist[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+    hist[-1] += value
+
+
+@contextmanager
+def timer(name, **labels):
+    """Time a block of code into a histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def record_cache(cache, hit):
+    """Record a cache hit or miss"""
+    inc_counter('cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+
+def register_gauge_callback(name, callback):
+    """Register a callable evaluated at scrape time returning {((label, value), ...): gauge_value}"""
+    _gauge_callbacks[name] = callback
+
+
+def snapshot():
+    """Sum the live thread shards and the retired totals of this process into a single snapshot"""
+    total = _new_shard()
+    with _shards_lock:
+        shards = list(_shards.values())
+        _merge(total, _retired)
+
+    for shard in shards:
+        _merge(total, shard)
+    counters, gauges, histograms = total['counters'], total['gauges'], total['histograms']
+
+    for name, callback in list(_gauge_callbacks.items()):
+        try:
+            for labels, value in callback().items():
+                gauges[(name, tuple(labels))] = value
+        except Exception as e:
+            print(f"Metrics gauge callback {name} failed: {str(e)}")
+
+    return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+
+def _encode(snap):
+    return {kind: [[name, [list(l) for l in labels], value] for (name, labels), value in values.items()]
+            for kind, values in snap.items()}
+
+
+def _decode(data):
+    return {kind: {(name, tuple(tuple(l) for l in labels)): value for name, labels, value in values}
+            for kind, values in data.items()}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def flush():
+    """Write this worker's snapshot to the multiprocess directory"""
+    if not MULTIPROC_DIR:
+        return
+
+    path = os.path.join(MULTIPROC_DIR, f"metrics_{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(_encode(snapshot()), f)
+    os.replace(tmp_path, path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception as e:
+            print(f"Metrics flush failed: {str(e)}")
+
+
+def start_flusher():
+    """Start the background thread that publishes this process's metrics, once per process"""
+    global _flusher_pid
+    pid = os.getpid()
+    if not MULTIPROC_DIR or _flusher_pid == pid:
+        return
+
+    with _shards_lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    threading.Thread(target=_flush_loop, name='metrics-flusher', daemon=True).start()
+
+
+def collect():
+    """Aggregate metrics of this process and, if configured, all other workers"""
+    merged = snapshot()
+    if not MULTIPROC_DIR:
+        return merged
+
+    for path in glob.glob(os.path.join(MULTIPROC_DIR, 'metrics_*.json')):
+        pid = int(os.path.basename(path)[len('metrics_'):-len('.json')])
+        if pid == os.getpid():
+            continue
+
+        try:
+            with open(path, 'r') as f:
+                other = _decode(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+        for key, value in other['counters'].items():
+            merged['counters'][key] = merged['counters'].get(key, 0) + value
+        for key, hist in other['histograms'].items():
+            total = merged['histograms'].setdefault(key, [0] * len(hist))
+            for i, value in enumerate(hist):
+                total[i] += value
+
+        # Gauges describe current state, so dead workers no longer contribute
+        if _pid_alive(pid):
+            for key, value in other['gauges'].items():
+                merged['gauges'][key] = merged['gauges'].get(key, 0) + value
+
+    return merged
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra) if extra else [])
+    if not items:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in items]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def _cache_hit_ratios(counters):
+    totals = {}
+    for (name, labels), value in counters.items():
+        if name != 'cache_requests_total':
+            continue
+        label_map = dict(labels)
+        hits, lookups = totals.get(label_map['cache'], (0, 0))
+        if label_map['result'] == 'hit':
+            hits += value
+        totals[label_map['cache']] = (hits, lookups + value)
+
+    return {(('cache', cache),): hits / lookups for cache, (hits, lookups) in totals.items() if lookups}
+
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format"""
+    data = collect()
+    gauges = dict(data['gauges'])
+    for labels, ratio in _cache_hit_ratios(data['counters']).items():
+        gauges[('cache_hit_ratio', labels)] = ratio
+
+    series = {}
+    for kind in ('counters', 'histograms'):
+        for (name, labels), value in data[kind].items():
+            series.setdefault(name, []).append((labels, value))
+    for (name, labels), value in gauges.items():
+        series.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name in sorted(series):
+        metric_type, help_text = METRICS.get(name, ('untyped', name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+        for labels, value in sorted(series[name]):
+            if metric_type != 'histogram':
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Instrument a Flask app and expose /metrics"""
+    from flask import g, request, Response
+
+    @app.before_request
+    def _start_request_metrics():
+        # Started here rather than in create_app, which gunicorn --preload runs in the master
+        start_flusher()
+        g.metrics_start = time.perf_counter()
+        inc_gauge('http_requests_in_flight')
+
+    @app.after_request
+    def _record_request_metrics(response):
+        if getattr(g, 'metrics_start', None) is None:
+            return response
+
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        elapsed = time.perf_counter() - g.metrics_start
+        g.metrics_start = None
+
+        inc_gauge('http_requests_in_flight', -1)
+        inc_counter('http_requests_total', method=request.method, route=route, status=str(response.status_code))
+        observe('http_request_duration_seconds', elapsed, method=request.method, route=route)
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(error=None):
+        # after_request is skipped when a request fails with an unhandled error
+        if getattr(g, 'metrics_start', None) is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            inc_gauge('http_requests_in_flight', -1)
+            inc_counter('http_requests_total', method=request.method, route=route, status='500')
+            g.metrics_start = None
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
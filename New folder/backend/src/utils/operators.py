@@ -0,0 +1,40 @@
+"""
+Operator access for the Handicraft Marketplace Platform.
+
+Settlement statements (every partner's and artisan's payouts) and analytics
+rebuilds are for the platform's operators, not for shoppers. Customers whose
+email is listed in OPERATOR_EMAILS (comma-separated) get an `operator` claim
+holding that email in the tokens issued at registration, login and refresh,
+and operator_required() only admits access tokens whose claim is still
+listed, so removing an email revokes its access on the next request. With no
+operators configured those routes are closed to everyone.
+"""
+
+import os
+from functools import wraps
+from flask_jwt_extended import jwt_required, get_jwt
+from utils.customers import normalize_email
+
+OPERATOR_EMAILS = {normalize_email(email) for email in os.getenv('OPERATOR_EMAILS', '').split(',') if email.strip()}
+
+
+def is_operator(email):
+    return bool(email) and normalize_email(email) in OPERATOR_EMAILS
+
+
+def operator_claims(email):
+    """Additional JWT claims for a customer with this email"""
+    return {'operator': normalize_email(email)} if is_operator(email) else {}
+
+
+def operator_required():
+    """Like jwt_required(), but answers 403 unless the token carries a listed operator claim"""
+    def decorator(fn):
+        @wraps(fn)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            if not is_operator(get_jwt().get('operator')):
+                return {'error': 'Operator access required'}, 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
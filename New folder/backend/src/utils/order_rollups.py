@@ -0,0 +1,246 @@
+"""
+Time-bucketed order rollups for the Handicraft Marketplace Platform.
+
+Keeps revenue, order counts and platform fees in fixed day, week (starting
+Monday) and month buckets, overall and broken down by region, category and
+partner. Every order is added to all three granularities when it is written,
+so a range query reads one pre-aggregated cell per bucket and breakdown value:
+a year by month is 12 cells per region, whatever the number of orders.
+
+Old fine-grained buckets are downsampled away: day cells are dropped after
+ROLLUP_DAY_RETENTION_DAYS and week cells after ROLLUP_WEEK_RETENTION_WEEKS,
+leaving the coarser buckets that already contain them. Queries over a range
+that has lost its day or week cells are answered at the finest granularity
+still kept. A query may span at most ROLLUP_MAX_QUERY_BUCKETS buckets of the
+granularity it is answered at.
+
+Platform fees are recorded per order, so they are shared out over the order's
+items in proportion to their subtotals. Cancelled orders are left out, and
+rebuilds and order updates go through the same IncrementalRollup, as in
+utils.analytics.
+"""
+
+import os
+from datetime import date, datetime, timedelta
+import numpy as np
+from utils.snowflake_connector import execute_query
+from utils.analytics import ITEMS_QUERY, EXCLUDED_STATUSES, IncrementalRollup, group_sums, distinct_counts
+
+GRANULARITIES = ('day', 'week', 'month')
+DIMENSIONS = ('all', 'region', 'category', 'partner')
+ALL = 'ALL'
+EPOCH = date(1970, 1, 1)
+
+DAY_RETENTION_DAYS = int(os.getenv('ROLLUP_DAY_RETENTION_DAYS', 90))
+WEEK_RETENTION_WEEKS = int(os.getenv('ROLLUP_WEEK_RETENTION_WEEKS', 104))
+MAX_QUERY_BUCKETS = int(os.getenv('ROLLUP_MAX_QUERY_BUCKETS', 1000))
+
+
+def bucket_start(day, granularity):
+    """First day of the bucket containing day"""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_bucket(start, granularity):
+    """First day of the following bucket, or None past date.max"""
+    try:
+        if granularity == 'day':
+            return start + timedelta(days=1)
+        if granularity == 'week':
+            return start + timedelta(days=7)
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    except OverflowError:
+        return None
+
+
+def bucket_count(start, end, granularity):
+    """Number of buckets from the one containing start to the one containing end"""
+    if granularity == 'day':
+        return (end - start).days + 1
+    if granularity == 'week':
+        return (end - bucket_start(start, 'week')).days // 7 + 1
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def to_date(value):
+    """Date of an ISO date or timestamp"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class OrderRollupStore(IncrementalRollup):
+    """Cells keyed by granularity and dimension: {bucket start: {dimension value: [revenue, orders, platform_fee]}}"""
+
+    def __init__(self):
+        super().__init__()
+        self.cells = {}
+        self.product_keys = {}
+        self.downsampled_on = None
+
+    def empty_cells(self):
+        return {(granularity, dimension): {} for granularity in GRANULARITIES for dimension in DIMENSIONS}
+
+    def load(self):
+        """Aggregate every order from ORDER_ITEMS into cells with vectorized group-bys"""
+        product_keys = {row['PRODUCT_ID']: (row['REGION_ID'], row['CATEGORY_ID'])
+                        for row in execute_query("SELECT product_id, region_id, category_id FROM PRODUCTS")}
+        rows = execute_query(ITEMS_QUERY)
+        read_orders = {row['ORDER_ID'] for row in rows}
+        cells = self.empty_cells()
+        excluded = {row['ORDER_ID'] for row in rows if row['STATUS'] in EXCLUDED_STATUSES}
+        rows = [row for row in rows if row['STATUS'] not in EXCLUDED_STATUSES]
+
+        if rows:
+            order_ids = np.array([row['ORDER_ID'] for row in rows], dtype=object).astype(str)
+            subtotal = np.array([row['SUBTOTAL'] for row in rows], dtype=float)
+            order_fee = np.array([row['PLATFORM_FEE'] or 0 for row in rows], dtype=float)
+            days = np.array([str(row['ORDER_DATE'])[:10] for row in rows], dtype='datetime64[D]')
+            _, order_codes = np.unique(order_ids, return_inverse=True)
+
+            # Share each order's fee over its items by subtotal
+            order_totals = np.bincount(order_codes, weights=subtotal)[order_codes]
+            fee = np.where(order_totals > 0, order_fee * subtotal / np.where(order_totals > 0, order_totals, 1), 0)
+
+            products = [product_keys.get(row['PRODUCT_ID'], (None, None)) for row in rows]
+            values = {
+                'all': np.full(len(rows), ALL, dtype=object),
+                'region': np.array([region or '' for region, _ in products], dtype=object),
+                'category': np.array([category or '' for _, category in products], dtype=object),
+                'partner': np.array([row['PARTNER_ID'] or '' for row in rows], dtype=object),
+            }
+            # 1970-01-01 was a Thursday: shift by 3 days to start weeks on Monday
+            buckets = {
+                'day': days,
+                'week': days - ((days.astype(np.int64) + 3) % 7).astype('timedelta64[D]'),
+                'month': days.astype('datetime64[M]').astype('datetime64[D]'),
+            }
+
+            for dimension, value in values.items():
+                known = value != ''
+                if not known.any():
+                    continue
+                value_ids, value_codes = np.unique(value[known].astype(str), return_inverse=True)
+                value_ids = value_ids.tolist()
+                for granularity, bucket in buckets.items():
+                    bucket_codes = bucket[known].astype(np.int64)
+                    base = int(bucket_codes.min())
+                    span = int(bucket_codes.max()) - base + 1
+                    keys, codes = np.unique(value_codes.astype(np.int64) * span + (bucket_codes - base), return_inverse=True)
+                    n = len(keys)
+                    revenue, fees = group_sums(codes, n, subtotal[known], fee[known])
+                    orders = distinct_counts(codes, order_codes[known], n)
+                    target = cells[(granularity, dimension)]
+                    for key, r, o, f in zip(keys.tolist(), revenue.tolist(), orders.tolist(), fees.tolist()):
+                        start = EPOCH + timedelta(days=base + key % span)
+                        target.setdefault(start, {})[value_ids[key // span]] = [r, o, f]
+
+        return {'cells': cells, 'product_keys': product_keys, 'excluded_orders': excluded}, read_orders
+
+    def install(self, state):
+        super().install(state)
+        self.downsampled_on = None
+        self.downsample()
+
+    def cutoffs(self, today=None):
+        """First bucket start still kept for each granularity (months are kept forever)"""
+        today = today or date.today()
+        return {
+            'day': today - timedelta(days=DAY_RETENTION_DAYS),
+            'week': bucket_start(today - timedelta(weeks=WEEK_RETENTION_WEEKS), 'week'),
+            'month': date.min,
+        }
+
+    def downsample(self, today=None):
+        """Drop day and week cells past their retention; the week and month cells keep their totals"""
+        today = today or date.today()
+        with self.lock:
+            if self.downsampled_on == today:
+                return
+            cutoffs = self.cutoffs(today)
+            for (granularity, _), buckets in self.cells.items():
+                for start in [start for start in buckets if start < cutoffs[granularity]]:
+                    del buckets[start]
+            self.downsampled_on = today
+
+    def _apply(self, items, platform_fee, order_date, sign):
+        """Add (sign=1) or retract (sign=-1) one order; each cell it touches gains or loses one order"""
+        day = to_date(order_date)
+        cutoffs = self.cutoffs()
+        granularities = [granularity for granularity in GRANULARITIES if bucket_start(day, granularity) >= cutoffs[granularity]]
+        total = sum(float(item['subtotal']) for item in items)
+        touched = set()
+        for item in items:
+            subtotal = float(item['subtotal'])
+            fee = float(platform_fee or 0) * subtotal / total if total else 0.0
+            region, category = self.product_keys.get(item['product_id'], (None, None))
+            values = {'all': ALL, 'region': region, 'category': category, 'partner': item['partner_id']}
+            for granularity in granularities:
+                start = bucket_start(day, granularity)
+                for dimension, value in values.items():
+                    if not value:
+                        continue
+                    cell = self.cells[(granularity, dimension)].setdefault(start, {}).setdefault(value, [0.0, 0, 0.0])
+                    cell[0] += sign * subtotal
+                    cell[2] += sign * fee
+                    touched.add((granularity, dimension, start, value))
+
+        for granularity, dimension, start, value in touched:
+            bucket = self.cells[(granularity, dimension)][start]
+            bucket[value][1] += sign
+            if bucket[value][1] <= 0:
+                del bucket[value]
+                if not bucket:
+                    del self.cells[(granularity, dimension)][start]
+
+    def _record_order(self, order_id, items, platform_fee, order_date, status):
+        super()._record_order(order_id, items, platform_fee, order_date, status)
+        self.downsample()
+
+    def resolve_granularity(self, start, granularity):
+        """The requested granularity, or the finest coarser one still kept for dates from start"""
+        cutoffs = self.cutoffs()
+        if granularity == 'day' and start < cutoffs['day']:
+            granularity = 'week'
+        if granularity == 'week' and bucket_start(start, 'week') < cutoffs['week']:
+            granularity = 'month'
+        return granularity
+
+    def query(self, start, end, granularity='day', dimension='all', key=None):
+        """Revenue, orders and platform fees per bucket from start to end (inclusive), per dimension
+        value (or only `key`). Returns (granularity used, series, number of cells read).
+        Raises ValueError if end is before start or the range spans more than MAX_QUERY_BUCKETS."""
+        if end < start:
+            raise ValueError('end must not be before start')
+        self.ensure_built()
+        granularity = self.resolve_granularity(start, granularity)
+        if bucket_count(start, end, granularity) > MAX_QUERY_BUCKETS:
+            raise ValueError(f'Range spans more than {MAX_QUERY_BUCKETS} {granularity} buckets')
+        series = []
+        cells_read = 0
+        with self.lock:
+            buckets = self.cells[(granularity, dimension)]
+            current = bucket_start(start, granularity)
+            while current is not None and current <= end:
+                values = buckets.get(current, {})
+                selected = {key: values[key]} if key is not None and key in values else ({} if key is not None else values)
+                cells_read += len(selected)
+                for value, (revenue, orders, fees) in sorted(selected.items()):
+                    series.append({
+                        'BUCKET_START': current.isoformat(),
+                        'KEY': value,
+                        'REVENUE': round(revenue, 2),
+                        'ORDERS': orders,
+                        'PLATFORM_FEES': round(fees, 2)
+                    })
+                current = next_bucket(current, granularity)
+        return granularity, series, cells_read
+
+
+store = OrderRollupStore()
@@ -0,0 +1,27 @@
+"""
+Pagination parameters for the Handicraft Marketplace Platform API.
+
+Every paginated endpoint reads page and per_page through page_params(), which
+caps per_page at MAX_PER_PAGE so a single request cannot ask for the whole
+catalogue, and treats missing, malformed or non-positive values as defaults.
+"""
+
+import os
+from flask import request
+
+MAX_PER_PAGE = int(os.getenv('MAX_PER_PAGE', 100))
+
+
+def _positive_int(name, default):
+    try:
+        value = int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+def page_params(default_per_page=20):
+    """page, per_page (at most MAX_PER_PAGE) and the row offset of the page"""
+    page = _positive_int('page', 1)
+    per_page = min(_positive_int('per_page', default_per_page), MAX_PER_PAGE)
+    return page, per_page, (page - 1) * per_page
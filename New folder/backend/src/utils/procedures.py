@@ -0,0 +1,292 @@
+"""
+Stored procedure registry for the Handicraft Marketplace Platform.
+
+Every procedure defined in database/snowflake_setup.sql is registered here with
+a local Python implementation, which runs the same queries through
+execute_query (mock JSON or the local SQL backend), and a remote path that
+CALLs it in Snowflake. PROCEDURE_BACKEND selects the path: local (default) or
+snowflake.
+
+Results are memoized per procedure and argument tuple for that procedure's
+TTL (PROCEDURE_TTL_<NAME> seconds), in a bounded LRU of PROCEDURE_CACHE_SIZE
+entries, so hot calls skip both the warehouse round trip and the
+recomputation. Concurrent misses for the same call are coalesced, so only one
+of them runs the procedure and the rest share its result. Writers drop stale
+results with invalidate(). Cached results are shared between callers and must
+not be modified.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from utils import metrics, single_flight
+from utils.snowflake_connector import execute_query
+
+BACKEND = os.getenv('PROCEDURE_BACKEND', 'local').lower()
+CACHE_SIZE = int(os.getenv('PROCEDURE_CACHE_SIZE', 1024))
+
+_remote = {}
+_remote_lock = threading.Lock()
+
+
+class Procedure:
+    """A registered procedure: its arguments, local implementation, return kind and result cache"""
+
+    def __init__(self, name, args, local, returns, ttl):
+        self.name = name
+        self.args = args
+        self.local = local
+        self.returns = returns  # 'variant' (one JSON value) or 'table' (rows)
+        self.ttl = float(os.getenv(f'PROCEDURE_TTL_{name}', ttl))
+        self.lock = threading.Lock()
+        self.results = OrderedDict()  # argument tuple -> (expires at, result)
+
+    def cached(self, key):
+        with self.lock:
+            entry = self.results.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.monotonic():
+                del self.results[key]
+                return False, None
+            self.results.move_to_end(key)
+            return True, entry[1]
+
+    def store(self, key, result):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.results[key] = (time.monotonic() + self.ttl, result)
+            self.results.move_to_end(key)
+            while len(self.results) > CACHE_SIZE:
+                self.results.popitem(last=False)
+
+    def invalidate(self, key=None):
+        with self.lock:
+            if key is None:
+                self.results.clear()
+            else:
+                self.results.pop(key, None)
+
+
+PROCEDURES = {}
+
+
+def procedure(name, args, returns='table', ttl=60):
+    """Register the decorated function as the local implementation of procedure `name`"""
+    def register(local):
+        PROCEDURES[name] = Procedure(name, tuple(args), local, returns, ttl)
+        return local
+    return register
+
+
+def is_registered(name):
+    return name.upper() in PROCEDURES
+
+
+def _remote_connection():
+    """Snowflake connection shared by the remote calls (needs snowflake-connector-python)"""
+    with _remote_lock:
+        if 'connection' not in _remote:
+            import snowflake.connector
+            _remote['connection'] = snowflake.connector.connect(
+                account=os.getenv('SNOWFLAKE_ACCOUNT'),
+                user=os.getenv('SNOWFLAKE_USER'),
+                password=os.getenv('SNOWFLAKE_PASSWORD'),
+                database=os.getenv('SNOWFLAKE_DATABASE', 'HANDICRAFT_MARKETPLACE'),
+                schema=os.getenv('SNOWFLAKE_SCHEMA', 'CORE'),
+                warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
+                role=os.getenv('SNOWFLAKE_ROLE'),
+            )
+        return _remote['connection']
+
+
+def call_remote(proc, values):
+    """CALL the procedure in Snowflake and return its VARIANT value or its rows with uppercase keys"""
+    cursor = _remote_connection().cursor()
+    try:
+        cursor.execute(f"CALL {proc.name}({', '.join(['%s'] * len(values))})", values)
+        names = [col[0].upper() for col in cursor.description or ()]
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    if proc.returns == 'variant':
+        value = rows[0][0] if rows else None
+        return json.loads(value) if isinstance(value, str) else value
+    return [dict(zip(names, row)) for row in rows]
+
+
+def call(name, params=None):
+    """Run a registered procedure with arguments taken from params, from its cache when fresh"""
+    proc = PROCEDURES[name.upper()]
+    params = params or {}
+    values = tuple(params.get(arg) for arg in proc.args)
+
+    hit, result = proc.cached(values)
+    metrics.record_cache(f"procedure_{proc.name.lower()}", hit)
+    if hit:
+        return result
+
+    return single_flight.group.do(('procedure', proc.name, values), _run, proc, values)
+
+
+def _run(proc, values):
+    """Run the procedure and cache its result (once per key at a time, see call)"""
+    path = 'remote' if BACKEND == 'snowflake' else 'local'
+    with metrics.timer('procedure_duration_seconds', procedure=proc.name, path=path):
+        result = call_remote(proc, values) if path == 'remote' else proc.local(*values)
+    proc.store(values, result)
+    return result
+
+
+def invalidate(name=None, **params):
+    """Drop cached results: of one call (name and its arguments), of one procedure, or of all"""
+    if name is None:
+        for proc in PROCEDURES.values():
+            proc.invalidate()
+        return
+    proc = PROCEDURES[name.upper()]
+    proc.invalidate(tuple(params.get(arg) for arg in proc.args) if params else None)
+
+
+@procedure('GET_QR_CODE_DATA', args=('product_id',), returns='variant', ttl=300)
+def get_qr_code_data(product_id):
+    """Product, artisan, region, GI tag, cultural story and partner pricing behind a product's QR code"""
+    query = f"""
+        SELECT
+            p.product_id,
+            p.name AS product_name,
+            p.description,
+            p.price AS base_price,
+            p.dimensions,
+            p.weight,
+            p.materials,
+            a.artisan_id,
+            a.name AS artisan_name,
+            a.location AS artisan_location,
+            a.craft_type,
+            a.years_active,
+            r.name AS region_name,
+            r.state,
+            CASE WHEN p.is_gi_tagged THEN g.name ELSE NULL END AS gi_tag_name,
+            CASE WHEN p.is_gi_tagged THEN g.description ELSE NULL END AS gi_tag_description,
+            cs.title AS story_title,
+            cs.content AS story_content,
+            cs.history,
+            cs.cultural_significance
+        FROM PRODUCTS p
+        LEFT JOIN ARTISANS a ON p.artisan_id = a.artisan_id
+        LEFT JOIN REGIONS r ON p.region_id = r.region_id
+        LEFT JOIN GI_TAGS g ON p.gi_tag_id = g.gi_tag_id
+        LEFT JOIN CULTURAL_STORIES cs ON p.story_id = cs.story_id
+        WHERE p.product_id = '{product_id}'
+    """
+    partners_query = f"""
+        SELECT
+            ps.partner_id,
+            ps.name,
+            ps.rating,
+            ps.review_count,
+            ps.commission_rate,
+            pp.price,
+            pp.shipping_fee,
+            pp.availability,
+            pp.estimated_delivery
+        FROM PRODUCT_PARTNER pp
+        JOIN PARTNER_SITES ps ON pp.partner_id = ps.partner_id
+        WHERE pp.product_id = '{product_id}'
+    """
+
+    rows = execute_query(query, {'product_id': product_id})
+    if not rows:
+        return {'error': 'Product not found'}
+    row = rows[0]
+
+    # Same shape as the JavaScript procedure's VARIANT. The mock backend returns the raw product
+    # row, without the query's aliases, so its NAME and PRICE stand in for them
+    product_data = {
+        'product_id': row.get('PRODUCT_ID'),
+        'product_name': row.get('PRODUCT_NAME', row.get('NAME')),
+        'description': row.get('DESCRIPTION'),
+        'base_price': row.get('BASE_PRICE', row.get('PRICE')),
+        'dimensions': row.get('DIMENSIONS'),
+        'weight': row.get('WEIGHT'),
+        'materials': row.get('MATERIALS'),
+        'artisan': {
+            'id': row.get('ARTISAN_ID'),
+            'name': row.get('ARTISAN_NAME'),
+            'location': row.get('ARTISAN_LOCATION'),
+            'craft_type': row.get('CRAFT_TYPE'),
+            'years_active': row.get('YEARS_ACTIVE')
+        },
+        'region': {
+            'name': row.get('REGION_NAME'),
+            'state': row.get('STATE')
+        },
+        'cultural_story': {
+            'title': row.get('STORY_TITLE'),
+            'content': row.get('STORY_CONTENT'),
+            'history': row.get('HISTORY'),
+            'cultural_significance': row.get('CULTURAL_SIGNIFICANCE')
+        }
+    }
+    if row.get('GI_TAG_NAME'):
+        product_data['gi_tag'] = {
+            'name': row.get('GI_TAG_NAME'),
+            'description': row.get('GI_TAG_DESCRIPTION')
+        }
+
+    product_data['partners'] = [{
+        'partner_id': partner.get('PARTNER_ID'),
+        'name': partner.get('NAME'),
+        'rating': partner.get('RATING'),
+        'review_count': partner.get('REVIEW_COUNT'),
+        'commission_rate': partner.get('COMMISSION_RATE'),
+        'price': partner.get('PRICE'),
+        'shipping_fee': partner.get('SHIPPING_FEE'),
+        'availability': partner.get('AVAILABILITY'),
+        'estimated_delivery': partner.get('ESTIMATED_DELIVERY')
+    } for partner in execute_query(partners_query, {'product_id': product_id})]
+
+    return product_data
+
+
+@procedure('CALCULATE_REVENUE_SHARING', args=('order_id',), returns='table', ttl=3600)
+def calculate_revenue_sharing(order_id):
+    """Gross amount, platform fee and partner revenue per partner site for one order.
+    Amounts are computed in paise with the settlement engine's rounding, so they add up."""
+    from utils.analytics import ITEMS_QUERY
+    from utils.settlement import to_paise, commission_basis_points, split_lines, PAISE_PER_RUPEE
+
+    items = execute_query(ITEMS_QUERY + f" WHERE oi.order_id = '{order_id}'", {'order_id': order_id})
+    if not items:
+        return []
+    partner_ids = sorted({item['PARTNER_ID'] for item in items})
+    partners_query = f"""
+        SELECT partner_id, name, commission_rate
+        FROM PARTNER_SITES
+        WHERE partner_id IN ({', '.join(f"'{partner_id}'" for partner_id in partner_ids)})
+    """
+    partners = {row['PARTNER_ID']: row for row in execute_query(partners_query)}
+
+    gross = to_paise([item['SUBTOTAL'] for item in items])
+    rates = commission_basis_points([partners.get(item['PARTNER_ID'], {}).get('COMMISSION_RATE') for item in items])
+    fee, net = split_lines(gross, rates)
+
+    totals = {}
+    for item, g, f, n in zip(items, gross.tolist(), fee.tolist(), net.tolist()):
+        total = totals.setdefault(item['PARTNER_ID'], [0, 0, 0])
+        total[0] += g
+        total[1] += f
+        total[2] += n
+
+    return [{
+        'PARTNER_ID': partner_id,
+        'PARTNER_NAME': partners.get(partner_id, {}).get('NAME'),
+        'GROSS_AMOUNT': g / PAISE_PER_RUPEE,
+        'PLATFORM_FEE': f / PAISE_PER_RUPEE,
+        'PARTNER_REVENUE': n / PAISE_PER_RUPEE
+    } for partner_id, (g, f, n) in totals.items()]
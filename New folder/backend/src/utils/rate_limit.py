@@ -0,0 +1,240 @@
+"""
+Rate limiting and load shedding for the Handicraft Marketplace Platform.
+
+Rate limiting: every client has a token bucket holding up to RATE_LIMIT_BURST
+tokens and refilled at RATE_LIMIT_RATE tokens per second. Clients are keyed by
+user (a valid JWT) or else by IP address, and each request takes its route's
+cost from the bucket: browsing costs 1, expensive routes (search, QR
+rendering, checkout, password hashing, settlements) cost more. A client whose
+bucket is short gets 429 with Retry-After set to when it will have refilled.
+At most RATE_LIMIT_MAX_BUCKETS buckets are kept; beyond that the least
+recently used one is dropped, which is normally a client idle long enough to
+have refilled anyway.
+
+Load shedding: at most SHED_MAX_IN_FLIGHT requests run at once per worker and
+the rest wait for a slot, highest priority first. The time requests spend
+queued (plus the proxy's queue time when it sends X-Request-Start) is tracked
+as a moving average; while it is above SHED_QUEUE_LATENCY_MS, low-priority
+browse traffic is rejected with 503 and Retry-After, and above twice that,
+normal traffic is too. Checkout and transparency scans are critical and are
+never shed, only queued.
+
+Buckets and queues are per worker process, so with N workers a client's
+effective limit is up to N times the configured rate.
+"""
+
+import os
+import math
+import time
+import heapq
+import itertools
+import threading
+from collections import OrderedDict
+from utils import metrics
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RATE = float(os.getenv('RATE_LIMIT_RATE', 10))
+BURST = float(os.getenv('RATE_LIMIT_BURST', 60))
+MAX_BUCKETS = int(os.getenv('RATE_LIMIT_MAX_BUCKETS', 100000))
+TRUST_FORWARDED_FOR = os.getenv('RATE_LIMIT_TRUST_FORWARDED_FOR', 'false').lower() in ('1', 'true', 'yes')
+
+SHED_ENABLED = os.getenv('SHED_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+MAX_IN_FLIGHT = int(os.getenv('SHED_MAX_IN_FLIGHT', 16))
+QUEUE_LATENCY = float(os.getenv('SHED_QUEUE_LATENCY_MS', 250)) / 1000
+MAX_WAIT = float(os.getenv('SHED_MAX_WAIT_MS', 2000)) / 1000
+CRITICAL_MAX_WAIT = float(os.getenv('SHED_CRITICAL_MAX_WAIT_MS', 30000)) / 1000
+LATENCY_SMOOTHING = 0.2
+
+CRITICAL, NORMAL, LOW = 0, 1, 2
+PRIORITY_NAMES = {CRITICAL: 'critical', NORMAL: 'normal', LOW: 'low'}
+
+# Routes that are neither limited nor shed
+EXEMPT_ROUTES = {'/health', '/metrics'}
+
+# Token cost per (method, route); anything else costs 1
+ROUTE_COSTS = {
+    ('GET', '/api/products/search'): lambda request: 2 + len(request.args.get('q', '').split()),
+    ('GET', '/api/qrcode/product/<string:product_id>'): 10,
+    ('POST', '/api/orders'): 5,
+    ('POST', '/api/auth/register'): 10,
+    ('POST', '/api/auth/login'): 10,
+    ('GET', '/api/analytics/settlements'): 20,
+    ('POST', '/api/analytics/rebuild'): 30,
+}
+
+# Checkout and QR-tag scans must keep working under load
+CRITICAL_ROUTES = {
+    ('POST', '/api/orders'),
+    ('PUT', '/api/orders/<string:order_id>/status'),
+    ('GET', '/api/transparency/<string:product_id>'),
+    ('GET', '/api/qrcode/product/<string:product_id>'),
+}
+
+# Catalogue browsing and dashboards give way first
+LOW_PRIORITY_PREFIXES = ('/api/products', '/api/artisans', '/api/partners', '/api/analytics')
+
+
+def route_priority(method, rule):
+    if (method, rule) in CRITICAL_ROUTES:
+        return CRITICAL
+    if method == 'GET' and rule.startswith(LOW_PRIORITY_PREFIXES):
+        return LOW
+    return NORMAL
+
+
+def route_cost(method, rule, request):
+    cost = ROUTE_COSTS.get((method, rule), 1)
+    return cost(request) if callable(cost) else cost
+
+
+class TokenBucketLimiter:
+    """Token buckets by client key, least recently used first: {key: [tokens, last refill time]}"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def take(self, key, cost):
+        """Take cost tokens from key's bucket. Returns 0 if allowed, else seconds until it would be."""
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= MAX_BUCKETS:
+                    self.buckets.popitem(last=False)
+                bucket = self.buckets[key] = [self.burst, now]
+            else:
+                self.buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            # A cost above the burst could never be paid, so it is capped at a full bucket
+            cost = min(cost, self.burst)
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0
+            return (cost - bucket[0]) / self.rate
+
+
+class LoadShedder:
+    """Admission control: MAX_IN_FLIGHT slots handed to waiting requests by priority"""
+
+    def __init__(self, max_in_flight, queue_latency):
+        self.max_in_flight = max_in_flight
+        self.queue_latency = queue_latency
+        self.cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = []  # heap of [priority, sequence, admitted]
+        self.sequence = itertools.count()
+        self.latency = 0.0  # moving average of queue latency in seconds
+
+    def _observe(self, seconds):
+        self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+
+    def _shedding(self, priority):
+        if priority == CRITICAL:
+            return False
+        return self.latency > self.queue_latency * (1 if priority == LOW else 2)
+
+    def retry_after(self):
+        return max(1, math.ceil(self.latency))
+
+    def acquire(self, priority, upstream_wait=0.0):
+        """Wait for a slot. Returns True when admitted, False when the request is shed."""
+        arrived = time.monotonic()
+        with self.cond:
+            if self._shedding(priority):
+                # Still a sample: the average has to come back down once the queue drains
+                self._observe(upstream_wait)
+                return False
+            if self.in_flight < self.max_in_flight and not self.waiting:
+                self.in_flight += 1
+                self._observe(upstream_wait)
+                return True
+
+            ticket = [priority, next(self.sequence), False]
+            heapq.heappush(self.waiting, ticket)
+            deadline = arrived + (CRITICAL_MAX_WAIT if priority == CRITICAL else MAX_WAIT)
+            while not ticket[2]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._shedding(priority):
+                    self.waiting.remove(ticket)
+                    heapq.heapify(self.waiting)
+                    self._observe(upstream_wait + time.monotonic() - arrived)
+                    return False
+                self.cond.wait(remaining)
+
+            self._observe(upstream_wait + time.monotonic() - arrived)
+            return True
+
+    def release(self):
+        """Hand the slot to the highest-priority waiting request, or free it"""
+        with self.cond:
+            if self.waiting:
+                heapq.heappop(self.waiting)[2] = True
+                self.cond.notify_all()
+            else:
+                self.in_flight -= 1
+
+
+limiter = TokenBucketLimiter(RATE, BURST)
+shedder = LoadShedder(MAX_IN_FLIGHT, QUEUE_LATENCY)
+
+
+def _upstream_wait(header):
+    """Seconds since the proxy received the request, from X-Request-Start (t=<seconds, ms or us>)"""
+    try:
+        value = float(header.strip().lstrip('t='))
+    except (AttributeError, ValueError):
+        return 0.0
+    # nginx sends seconds with millisecond precision; others send milli- or microseconds
+    while value > 1e11:
+        value /= 1000
+    return max(0.0, time.time() - value)
+
+
+def client_key(request):
+    """user:<id> for a request with a valid JWT, else ip:<address>"""
+    from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+    try:
+        if verify_jwt_in_request(optional=True):
+            return f"user:{get_jwt_identity()}"
+    except Exception:
+        pass
+    address = request.remote_addr
+    if TRUST_FORWARDED_FOR and request.headers.get('X-Forwarded-For'):
+        address = request.headers['X-Forwarded-For'].split(',')[0].strip()
+    return f"ip:{address}"
+
+
+def init_app(app):
+    """Rate limit and shed requests before they reach the resources"""
+    from flask import g, request
+
+    metrics.register_gauge_callback('shed_queue_latency_seconds', lambda: {(): shedder.latency})
+
+    @app.before_request
+    def _admit_request():
+        rule = request.url_rule.rule if request.url_rule else None
+        if rule is None or rule in EXEMPT_ROUTES:
+            return None
+        priority = route_priority(request.method, rule)
+
+        if RATE_LIMIT_ENABLED:
+            wait = limiter.take(client_key(request), route_cost(request.method, rule, request))
+            if wait:
+                metrics.inc_counter('requests_rejected_total', reason='rate_limited', priority=PRIORITY_NAMES[priority])
+                return {'error': 'Rate limit exceeded'}, 429, {'Retry-After': str(math.ceil(wait))}
+
+        if SHED_ENABLED:
+            if not shedder.acquire(priority, _upstream_wait(request.headers.get('X-Request-Start'))):
+                metrics.inc_counter('requests_rejected_total', reason='shed', priority=PRIORITY_NAMES[priority])
+                return {'error': 'Server busy, please retry'}, 503, {'Retry-After': str(shedder.retry_after())}
+            g.shed_slot = True
+        return None
+
+    @app.teardown_request
+    def _release_slot(exc):
+        if g.pop('shed_slot', False):
+            shedder.release()
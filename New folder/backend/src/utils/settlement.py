@@ -0,0 +1,183 @@
+"""
+Revenue-sharing settlement for the Handicraft Marketplace Platform.
+
+Settles a whole period of order lines in one vectorized pass, with the split
+used by CALCULATE_REVENUE_SHARING and TransparencyResource: the platform keeps
+commission_rate percent of each line's subtotal and the rest is paid out
+through the partner site to the artisan who made the product.
+
+All amounts are fixed-point integers in paise and commission rates are basis
+points, so the platform fee of a line is rounded once (half up) and every
+statement is an exact integer sum of its lines. A settlement is reconciled
+when its gross matches the ORDER_ITEMS subtotals of the settled orders, summed
+separately from the lines that were settled, when those orders' total_amount
+covers it, and when the partner and artisan statements add up to the platform
+totals. Cancelled orders are not settled.
+"""
+
+from datetime import date
+import numpy as np
+from utils.snowflake_connector import execute_query
+from utils.analytics import ITEMS_QUERY, EXCLUDED_STATUSES
+
+PAISE_PER_RUPEE = 100
+BASIS_POINTS = 10000  # basis points per 100%
+DEFAULT_COMMISSION_RATE = 15  # percent, as TransparencyResource assumes
+
+
+def to_paise(amounts):
+    """Rupee amounts as int64 paise"""
+    return np.rint(np.asarray(amounts, dtype=float) * PAISE_PER_RUPEE).astype(np.int64)
+
+
+def to_basis_points(rates):
+    """Commission rates in percent as int64 basis points"""
+    return np.rint(np.asarray(rates, dtype=float) * 100).astype(np.int64)
+
+
+def commission_basis_points(rates):
+    """Partner commission rates (percent, as PARTNER_SITES.commission_rate; None for unknown)
+    as int64 basis points. Raises ValueError for a rate outside 0-100 percent."""
+    rates = np.array([DEFAULT_COMMISSION_RATE if rate is None else rate for rate in rates], dtype=float)
+    invalid = ~((rates >= 0) & (rates <= 100))
+    if invalid.any():
+        raise ValueError(f"Commission rates must be percentages between 0 and 100, got {rates[invalid].tolist()}")
+    return to_basis_points(rates)
+
+
+def split_lines(gross, rate_bps):
+    """Platform fee and net payout of each line, in paise; the fee is rounded half up"""
+    fee = (gross * rate_bps + BASIS_POINTS // 2) // BASIS_POINTS
+    return fee, gross - fee
+
+
+def _statements(keys, order_codes, gross, fee, net):
+    """Per-key totals: (keys, lines, orders, gross, fee, net), all exact integer sums"""
+    ids, codes = np.unique(keys, return_inverse=True)
+    n = len(ids)
+    stride = int(order_codes.max()) + 1 if len(order_codes) else 1
+    # Distinct (key, order) pairs: sort the combined codes and keep the first of each run
+    pairs = np.sort(codes.astype(np.int64) * stride + order_codes)
+    first = np.ones(len(pairs), dtype=bool)
+    first[1:] = pairs[1:] != pairs[:-1]
+    orders = np.bincount(pairs[first] // stride, minlength=n)
+    # Sorted segment sums keep int64 exact (np.bincount would go through float64)
+    order = np.argsort(codes, kind='stable')
+    starts = np.searchsorted(codes[order], np.arange(n))
+    totals = [np.add.reduceat(amounts[order], starts) if n else amounts[:0] for amounts in (gross, fee, net)]
+    return ids, np.bincount(codes, minlength=n), orders, totals[0], totals[1], totals[2]
+
+
+def settle(order_ids, partner_ids, artisan_ids, gross, rate_bps, control_gross=None):
+    """Settle order lines given as parallel arrays (gross in paise, rates in basis points).
+    Returns the platform totals and per-partner and per-artisan statements as arrays.
+    control_gross is the same gross summed independently of the lines (in paise); without
+    it, reconciled only checks that the statements add up to the platform totals."""
+    gross = np.asarray(gross, dtype=np.int64)
+    rate_bps = np.asarray(rate_bps, dtype=np.int64)
+    fee, net = split_lines(gross, rate_bps)
+    _, order_codes = np.unique(order_ids, return_inverse=True)
+
+    settlement = {
+        'lines': len(gross),
+        'gross': int(gross.sum()),
+        'platform_fee': int(fee.sum()),
+        'net': int(net.sum()),
+        'partners': _statements(partner_ids, order_codes, gross, fee, net),
+        'artisans': _statements(artisan_ids, order_codes, gross, fee, net),
+    }
+    totals = (settlement['gross'], settlement['platform_fee'], settlement['net'])
+    settlement['reconciled'] = (
+        (control_gross is None or settlement['gross'] == control_gross)
+        and all(tuple(int(amounts.sum()) for amounts in statements[3:]) == totals
+                for statements in (settlement['partners'], settlement['artisans']))
+    )
+    return settlement
+
+
+def load_lines(start, end):
+    """Order lines with order dates in [start, end) that are not cancelled, with each line's
+    partner commission rate and the product's artisan"""
+    rows = execute_query(ITEMS_QUERY + f" WHERE o.order_date >= '{start.isoformat()}' AND o.order_date < '{end.isoformat()}'")
+    partners = execute_query("SELECT partner_id, name, commission_rate FROM PARTNER_SITES")
+    artisans = execute_query("SELECT product_id, artisan_id FROM PRODUCTS")
+
+    # The mock backend ignores WHERE clauses, so the period and status are applied here too
+    rows = [row for row in rows
+            if start.isoformat() <= str(row['ORDER_DATE'])[:10] < end.isoformat() and row['STATUS'] not in EXCLUDED_STATUSES]
+    rates = {row['PARTNER_ID']: row['COMMISSION_RATE'] for row in partners}
+    artisan_of = {row['PRODUCT_ID']: row['ARTISAN_ID'] for row in artisans}
+
+    partner_ids = np.array([row['PARTNER_ID'] or '' for row in rows], dtype=object).astype(str)
+    product_ids = np.array([row['PRODUCT_ID'] or '' for row in rows], dtype=object).astype(str)
+    # Join rates and artisans once per distinct key, then broadcast back to the lines
+    unique_partners, partner_codes = np.unique(partner_ids, return_inverse=True)
+    unique_products, product_codes = np.unique(product_ids, return_inverse=True)
+    rate_by_partner = commission_basis_points([rates.get(key) for key in unique_partners.tolist()])
+    artisan_by_product = np.array([artisan_of.get(key) or '' for key in unique_products.tolist()], dtype=object)
+
+    return {
+        'order_ids': np.array([row['ORDER_ID'] for row in rows], dtype=object).astype(str),
+        'partner_ids': partner_ids,
+        'artisan_ids': artisan_by_product[product_codes].astype(str) if rows else np.array([], dtype=str),
+        'gross': to_paise([row['SUBTOTAL'] for row in rows]),
+        'rate_bps': rate_by_partner[partner_codes] if rows else np.array([], dtype=np.int64),
+    }, {row['PARTNER_ID']: row['NAME'] for row in partners}
+
+
+def load_controls(start, end):
+    """Control totals in paise for [start, end), read apart from the settled lines: the
+    ORDER_ITEMS subtotals and the ORDERS total_amount of the orders that are settled"""
+    orders = [row for row in execute_query("SELECT order_id, order_date, status, total_amount FROM ORDERS")
+              if start.isoformat() <= str(row['ORDER_DATE'])[:10] < end.isoformat()
+              and row['STATUS'] not in EXCLUDED_STATUSES]
+    settled = {row['ORDER_ID'] for row in orders}
+    subtotals = [row['SUBTOTAL'] for row in execute_query("SELECT order_id, subtotal FROM ORDER_ITEMS")
+                 if row['ORDER_ID'] in settled]
+    return int(to_paise(subtotals).sum()), int(to_paise([row['TOTAL_AMOUNT'] for row in orders]).sum())
+
+
+def settle_period(start, end):
+    """Settle [start, end) and return JSON-ready statements, with amounts in paise"""
+    lines, partner_names = load_lines(start, end)
+    items_total, orders_total = load_controls(start, end)
+    settlement = settle(**lines, control_gross=items_total)
+    artisan_ids = [key for key in settlement['artisans'][0].tolist() if key]
+    artisan_names = {}
+    if artisan_ids:
+        artisan_names = {row['ARTISAN_ID']: row['NAME'] for row in execute_query("SELECT artisan_id, name FROM ARTISANS")}
+
+    def statements(parts, key_name, names):
+        ids, lines_count, orders, gross, fee, net = parts
+        return [{
+            key_name: key or None,
+            'NAME': names.get(key),
+            'LINES': int(n_lines),
+            'ORDERS': int(n_orders),
+            'GROSS_PAISE': int(g),
+            'PLATFORM_FEE_PAISE': int(f),
+            'NET_PAISE': int(p)
+        } for key, n_lines, n_orders, g, f, p in zip(ids.tolist(), lines_count, orders, gross, fee, net)]
+
+    return {
+        'period': {'start': start.isoformat(), 'end': end.isoformat()},
+        'totals': {
+            'LINES': settlement['lines'],
+            'GROSS_PAISE': settlement['gross'],
+            'PLATFORM_FEE_PAISE': settlement['platform_fee'],
+            'NET_PAISE': settlement['net'],
+            'ORDER_ITEMS_PAISE': items_total,
+            'ORDERS_TOTAL_PAISE': orders_total,
+            # total_amount also carries shipping, which is not shared, so it may exceed the gross
+            'RECONCILED': settlement['reconciled'] and orders_total >= settlement['gross']
+        },
+        'partners': statements(settlement['partners'], 'PARTNER_ID', partner_names),
+        'artisans': statements(settlement['artisans'], 'ARTISAN_ID', artisan_names),
+    }
+
+
+def month_bounds(day):
+    """First day of day's month and of the next month"""
+    start = day.replace(day=1)
+    end = date(start.year + (start.month == 12), start.month % 12 + 1, 1)
+    return start, end
@@ -0,0 +1,80 @@
+"""
+Request coalescing (single flight) for the Handicraft Marketplace Platform.
+
+When many requests need the same result at the same time (a product going
+viral, a group scanning the same QR tag), only the first one for a key runs the
+queries; the others wait for it and share its result. If the computation
+raises, every waiting request gets the same exception. A waiter gives up after
+SINGLE_FLIGHT_TIMEOUT seconds with SingleFlightTimeout, while the computation
+carries on for the requests still waiting.
+
+Nothing is kept once a computation finishes: the next request for the key
+starts a new one, so coalescing never serves data older than the flight it
+joined. Shared results must not be modified. Flights are per worker process.
+"""
+
+import os
+import threading
+from utils import metrics
+
+TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', 10))
+
+
+class SingleFlightTimeout(Exception):
+    """Waited longer than the timeout for another request's computation of the same key"""
+
+
+class _Flight:
+    """One computation in progress: waiters block on done, then read result or error"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """At most one computation in flight per key: {key: _Flight}"""
+
+    def __init__(self, timeout=TIMEOUT):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def do(self, key, fn, *args, timeout=None):
+        """Return fn(*args), sharing the call with concurrent callers of the same key"""
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+
+        if leader:
+            metrics.inc_counter('single_flight_calls_total', role='leader')
+            try:
+                flight.result = fn(*args)
+            except BaseException as error:
+                flight.error = error
+                raise
+            finally:
+                # Removed before waking the waiters so that later callers start a fresh computation
+                with self.lock:
+                    del self.flights[key]
+                flight.done.set()
+            return flight.result
+
+        if not flight.done.wait(self.timeout if timeout is None else timeout):
+            metrics.inc_counter('single_flight_calls_total', role='timeout')
+            raise SingleFlightTimeout(f"Timed out waiting for {key!r}")
+        metrics.inc_counter('single_flight_calls_total', role='shared')
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def in_flight(self):
+        """Number of keys being computed"""
+        with self.lock:
+            return len(self.flights)
+
+
+group = SingleFlight()
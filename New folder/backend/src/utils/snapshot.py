@@ -0,0 +1,361 @@
+"""
+Binary catalogue snapshots for the Handicraft Marketplace Platform.
+
+A snapshot holds the catalogue tables (products, artisans, partners,
+categories, regions) in one file that is opened with mmap instead of being
+parsed: opening reads a small manifest and nothing else, rows are decoded only
+when a query touches them, and every process that opens the file shares the
+same pages of the OS page cache.
+
+Layout (little-endian, sections aligned to 8 bytes):
+
+    header    MAGIC, manifest offset (u64), manifest length (u64)
+    columns   per column, one fixed-width array with a value per row:
+              int64 ('int'), float64 ('float') or uint8 ('bool'), plus a
+              uint8 null mask when the column has NULLs; strings ('str', and
+              'json' for lists, dicts and mixed types) are a uint64 offset and
+              a uint32 length per row into the table's string heap, with
+              length 0xFFFFFFFF for NULL
+    heap      the table's UTF-8 strings, each distinct value stored once
+    indexes   per indexed string column (catalogue.INDEXES), the row numbers
+              (uint32) sorted by key, searched by bisection over the heap
+    manifest  JSON: tables, row counts, column names, types and offsets
+
+Snapshots are built from mock_data/ or database/processed_data/:
+
+    cd backend/src
+    python -m utils.snapshot --source mock --output ../.local_db/catalogue.snapshot
+
+and used by the mock backend when CATALOGUE_SNAPSHOT points at one.
+"""
+
+import os
+import json
+import mmap
+import array
+import struct
+import argparse
+from collections.abc import Sequence
+from utils.catalogue import INDEXES
+
+MAGIC = b'HCSNAP01'
+HEADER = struct.Struct('<8sQQ')
+NULL_LENGTH = 0xFFFFFFFF
+ALIGNMENT = 8
+
+DEFAULT_PATH = os.getenv('CATALOGUE_SNAPSHOT') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), '.local_db', 'catalogue.snapshot')
+
+# processed_data CSV (snowflake_setup.sql table) behind each catalogue table
+PROCESSED_TABLES = {
+    'products': 'PRODUCTS',
+    'artisans': 'ARTISANS',
+    'partners': 'PARTNER_SITES',
+    'categories': 'CATEGORIES',
+    'regions': 'REGIONS',
+}
+
+# Fixed-width array type codes per column type
+TYPECODES = {'int': 'q', 'float': 'd', 'bool': 'B'}
+
+
+def column_type(values):
+    """Storage type for a column's values"""
+    kinds = {type(value) for value in values if value is not None}
+    if not kinds or kinds == {str}:
+        return 'str'
+    if kinds == {bool}:
+        return 'bool'
+    if kinds == {int}:
+        return 'int'
+    if kinds <= {int, float}:
+        return 'float'
+    return 'json'
+
+
+class _Writer:
+    """Appends aligned sections to the snapshot file and returns their offsets"""
+
+    def __init__(self, f):
+        self.f = f
+
+    def section(self, data):
+        padding = -self.f.tell() % ALIGNMENT
+        if padding:
+            self.f.write(b'\0' * padding)
+        offset = self.f.tell()
+        self.f.write(data)
+        return offset
+
+
+def _write_table(writer, rows, indexed):
+    names = []
+    for row in rows:
+        for name in row:
+            if name not in names:
+                names.append(name)
+
+    heap = bytearray()
+    heap_offsets = {}
+    columns = []
+    strings = []  # (meta, values) of the string columns, for the indexes
+    for name in names:
+        values = [row.get(name) for row in rows]
+        kind = column_type(values)
+        meta = {'name': name, 'type': kind}
+        if kind in TYPECODES:
+            nulls = bytes(value is None for value in values)
+            default = float('nan') if kind == 'float' else 0
+            data = array.array(TYPECODES[kind], [default if value is None else value for value in values])
+            meta['data'] = writer.section(data.tobytes())
+            meta['nulls'] = writer.section(nulls) if any(nulls) else None
+        else:
+            offsets = array.array('Q')
+            lengths = array.array('I')
+            for value in values:
+                if value is None:
+                    offsets.append(0)
+                    lengths.append(NULL_LENGTH)
+                    continue
+                encoded = (value if kind == 'str' else json.dumps(value)).encode('utf-8')
+                if encoded not in heap_offsets:
+                    heap_offsets[encoded] = len(heap)
+                    heap += encoded
+                offsets.append(heap_offsets[encoded])
+                lengths.append(len(encoded))
+            meta['offsets'] = writer.section(offsets.tobytes())
+            meta['lengths'] = writer.section(lengths.tobytes())
+            strings.append((meta, values))
+        columns.append(meta)
+
+    heap_offset = writer.section(bytes(heap))
+
+    indexes = {}
+    for meta, values in strings:
+        if meta['type'] == 'str' and meta['name'] in indexed:
+            order = sorted((i for i, value in enumerate(values) if value is not None),
+                           key=lambda i: (values[i].encode('utf-8'), i))
+            indexes[meta['name']] = {'offset': writer.section(array.array('I', order).tobytes()), 'length': len(order)}
+
+    return {'rows': len(rows), 'columns': columns, 'heap': heap_offset, 'heap_length': len(heap), 'indexes': indexes}
+
+
+def write_snapshot(path, tables, source=''):
+    """Write {table name: [row dicts]} to path (atomically, through a temporary file)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.tmp", 'wb') as f:
+        f.write(HEADER.pack(MAGIC, 0, 0))
+        writer = _Writer(f)
+        manifest = {'version': 1, 'source': source, 'tables': {}}
+        for name, rows in tables.items():
+            manifest['tables'][name] = _write_table(writer, rows, INDEXES.get(name, ()))
+        encoded = json.dumps(manifest).encode('utf-8')
+        manifest_offset = writer.section(encoded)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, manifest_offset, len(encoded)))
+    os.replace(f"{path}.tmp", path)
+
+
+class Column:
+    """One column of a mapped table, decoded on access"""
+
+    def __init__(self, snapshot, meta, rows, heap):
+        self.name = meta['name']
+        self.type = meta['type']
+        view = snapshot.view
+        self.mm = snapshot.mm
+        self.heap = heap
+        if self.type in TYPECODES:
+            width = struct.calcsize(TYPECODES[self.type])
+            self.data = view[meta['data']:meta['data'] + rows * width].cast(TYPECODES[self.type])
+            self.nulls = view[meta['nulls']:meta['nulls'] + rows] if meta['nulls'] is not None else None
+        else:
+            self.offsets = view[meta['offsets']:meta['offsets'] + rows * 8].cast('Q')
+            self.lengths = view[meta['lengths']:meta['lengths'] + rows * 4].cast('I')
+
+    def raw(self, i):
+        """Encoded string at row i (None for NULL), without decoding"""
+        length = self.lengths[i]
+        if length == NULL_LENGTH:
+            return None
+        start = self.heap + self.offsets[i]
+        return self.mm[start:start + length]
+
+    def values(self, start, stop):
+        """Values of rows [start, stop)"""
+        if self.type in TYPECODES:
+            values = self.data[start:stop].tolist()
+            if self.type == 'bool':
+                values = [bool(value) for value in values]
+            if self.nulls is not None:
+                values = [None if null else value for value, null in zip(self.nulls[start:stop].tolist(), values)]
+            return values
+
+        mm, heap = self.mm, self.heap
+        values = [None if length == NULL_LENGTH else mm[heap + offset:heap + offset + length].decode('utf-8')
+                  for offset, length in zip(self.offsets[start:stop].tolist(), self.lengths[start:stop].tolist())]
+        if self.type == 'json':
+            values = [None if value is None else json.loads(value) for value in values]
+        return values
+
+    def value(self, i):
+        """Value of row i"""
+        if self.type in TYPECODES:
+            if self.nulls is not None and self.nulls[i]:
+                return None
+            value = self.data[i]
+            return bool(value) if self.type == 'bool' else value
+
+        length = self.lengths[i]
+        if length == NULL_LENGTH:
+            return None
+        start = self.heap + self.offsets[i]
+        text = self.mm[start:start + length].decode('utf-8')
+        return text if self.type == 'str' else json.loads(text)
+
+
+class SnapshotRows(Sequence):
+    """A mapped table's rows as a sequence of dicts, decoded on access"""
+
+    CHUNK = 4096
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return self.table.count
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:
+                return self.table.decode(start, max(start, stop))
+            return [self.table.row(i) for i in range(start, stop, step)]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('snapshot row index out of range')
+        return self.table.row(key)
+
+    def __iter__(self):
+        for start in range(0, len(self), self.CHUNK):
+            yield from self.table.decode(start, min(start + self.CHUNK, len(self)))
+
+
+class SnapshotTable:
+    """A mapped catalogue table with the interface of catalogue.Table"""
+
+    def __init__(self, snapshot, meta):
+        self.count = meta['rows']
+        self.columns = [Column(snapshot, column, self.count, meta['heap']) for column in meta['columns']]
+        self.by_name = {column.name: column for column in self.columns}
+        self.indexes = {name: snapshot.view[index['offset']:index['offset'] + index['length'] * 4].cast('I')
+                        for name, index in meta['indexes'].items()}
+        self.rows = SnapshotRows(self)
+        self.stamp = snapshot.stamp
+
+    def decode(self, start, stop):
+        """Rows [start, stop) as dicts, decoded column by column"""
+        names = [column.name for column in self.columns]
+        return [dict(zip(names, values)) for values in zip(*(column.values(start, stop) for column in self.columns))]
+
+    def row(self, i):
+        """Row i as a dict"""
+        return {column.name: column.value(i) for column in self.columns}
+
+    def where(self, column, value):
+        """Rows whose column equals value, through the column's index when it has one"""
+        index = self.indexes.get(column)
+        if index is None or not isinstance(value, str):
+            return [row for row in self.rows if row.get(column) == value]
+
+        key = value.encode('utf-8')
+        values = self.by_name[column]
+        low, high = 0, len(index)
+        while low < high:
+            middle = (low + high) // 2
+            if values.raw(index[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        rows = []
+        while low < len(index) and values.raw(index[low]) == key:
+            rows.append(self.row(index[low]))
+            low += 1
+        return rows
+
+
+class Snapshot:
+    """A snapshot file mapped read-only; tables are opened without reading their rows"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self.view = memoryview(self.mm)
+        magic, manifest_offset, manifest_length = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalogue snapshot")
+        self.manifest = json.loads(self.mm[manifest_offset:manifest_offset + manifest_length])
+        self.tables = {name: SnapshotTable(self, meta) for name, meta in self.manifest['tables'].items()}
+
+    def table(self, name):
+        return self.tables[name]
+
+
+def mock_tables():
+    """Catalogue tables from the mock data files (created if missing)"""
+    from utils.snowflake_connector import DATA_DIR, initialize_mock_data
+    initialize_mock_data()
+    tables = {}
+    for name in INDEXES:
+        with open(os.path.join(DATA_DIR, f'{name}.json'), 'r') as f:
+            tables[name] = json.load(f)
+    return tables
+
+
+def processed_tables():
+    """Catalogue tables from the processed CSVs, typed by the schema in snowflake_setup.sql"""
+    from utils import local_db
+    with open(local_db.SCHEMA_FILE, 'r') as f:
+        schema = local_db.table_columns(f.read())
+    tables = {}
+    for name, table in PROCESSED_TABLES.items():
+        path = os.path.join(local_db.CSV_DIR, f'{table.lower()}.csv')
+        if not os.path.exists(path):
+            tables[name] = []
+            continue
+        types = schema[table]
+        columns, records = local_db._csv_rows(path, types)
+        casts = [float if types[column].startswith('REAL') else int if types[column].startswith('INTEGER') else None
+                 for column in columns]
+        tables[name] = [
+            {column.upper(): value if value in (None, '') or cast is None else cast(value)
+             for column, cast, value in zip(columns, casts, record)}
+            for record in records
+        ]
+    return tables
+
+
+def build(source, path):
+    """Write a snapshot of the mock or processed catalogue to path; returns the row count per table"""
+    tables = mock_tables() if source == 'mock' else processed_tables()
+    write_snapshot(path, tables, source)
+    return {name: len(rows) for name, rows in tables.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a binary catalogue snapshot')
+    parser.add_argument('--source', choices=('mock', 'processed'), default='mock',
+                        help='mock_data JSON files or database/processed_data CSVs')
+    parser.add_argument('--output', default=DEFAULT_PATH, help='snapshot file to write')
+    args = parser.parse_args()
+
+    counts = build(args.source, args.output)
+    print(f"Wrote {args.output} ({os.path.getsize(args.output)} bytes): "
+          + ', '.join(f"{name} {count}" for name, count in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,23 @@
 """
 Mock Snowflake connector utility for the Handicraft Marketplace Platform.
 Uses local JSON files instead of connecting to Snowflake.
+
+Importing this module does no I/O: the mock data files are created by
+init_snowflake() or, failing that, by the first mock query. Catalogue tables
+are served from utils.catalogue (parsed once and indexed); result rows are
+copies, so callers may modify them.
 """
 import os
+import re
 import json
 import random
+import threading
 from datetime import datetime
+from utils import metrics, local_db
+from utils.catalogue import catalogue
 
-# Path to mock data files
-DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mock_data')
-
-# Create mock_data directory if it doesn't exist
-os.makedirs(DATA_DIR, exist_ok=True)
+# Path to mock data files (MOCK_DATA_DIR lets benchmarks point at a generated catalogue)
+DATA_DIR = os.getenv('MOCK_DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mock_data'))
 
 # Mock data files
 PRODUCTS_FILE = os.path.join(DATA_DIR, 'products.json')
@@ -20,20 +26,24 @@ PARTNERS_FILE = os.path.join(DATA_DIR, 'partners.json')
 CATEGORIES_FILE = os.path.join(DATA_DIR, 'categories.json')
 REGIONS_FILE = os.path.join(DATA_DIR, 'regions.json')
 ORDERS_FILE = os.path.join(DATA_DIR, 'orders.json')
+CUSTOMERS_FILE = os.path.join(DATA_DIR, 'customers.json')
 
-# Initialize mock data if files don't exist
-def initialize_mock_data():
+# Initialize mock data if files don't exist (or unconditionally when overwrite is set)
+def initialize_mock_data(num_products=50, num_artisans=20, num_partners=10, num_orders=30, overwrite=False):
+    # Create mock_data directory if it doesn't exist
+    os.makedirs(DATA_DIR, exist_ok=True)
+    
     # Create mock products
-    if not os.path.exists(PRODUCTS_FILE):
+    if overwrite or not os.path.exists(PRODUCTS_FILE):
         products = []
-        for i in range(1, 51):
+        for i in range(1, num_products + 1):
             product = {
                 "PRODUCT_ID": str(i),
                 "NAME": f"Handcrafted Product {i}",
                 "DESCRIPTION": f"This is a beautiful handcrafted product from India. Product {i} showcases traditional craftsmanship.",
                 "PRICE": random.randint(500, 5000),
                 "CATEGORY_ID": str(random.randint(1, 6)),
-                "ARTISAN_ID": str(random.randint(1, 20)),
+                "ARTISAN_ID": str(random.randint(1, num_artisans)),
                 "REGION_ID": str(random.randint(1, 10)),
                 "MATERIALS": "Cotton, Silk, Wood",
                 "DIMENSIONS": f"{random.randint(10, 50)}cm x {random.randint(10, 50)}cm",
@@ -41,7 +51,7 @@ def initialize_mock_data():
                 "IS_GI_TAGGED": random.choice([True, False]),
                 "CREATED_AT": datetime.now().isoformat(),
                 "UPDATED_AT": datetime.now().isoformat(),
-                "ARTISAN_NAME": f"Artisan {random.randint(1, 20)}",
+                "ARTISAN_NAME": f"Artisan {random.randint(1, num_artisans)}",
                 "CATEGORY_NAME": random.choice(["Textiles", "Pottery", "Woodwork", "Metalwork", "Jewelry", "Paintings"]),
                 "REGION_NAME": random.choice(["Delhi", "Mumbai", "Kolkata", "Chennai", "Jaipur", "Varanasi"]),
                 "STATE": random.choice(["Uttar Pradesh", "Maharashtra", "West Bengal", "Tamil Nadu", "Rajasthan", "Bihar"]),
@@ -56,9 +66,9 @@ def initialize_mock_data():
             json.dump(products, f, indent=2)
     
     # Create mock artisans
-    if not os.path.exists(ARTISANS_FILE):
+    if overwrite or not os.path.exists(ARTISANS_FILE):
         artisans = []
-        for i in range(1, 21):
+        for i in range(1, num_artisans + 1):
             artisan = {
                 "ARTISAN_ID": str(i),
                 "NAME": f"Artisan {i}",
@@ -78,9 +88,9 @@ def initialize_mock_data():
             json.dump(artisans, f, indent=2)
     
     # Create mock partners
-    if not os.path.exists(PARTNERS_FILE):
+    if overwrite or not os.path.exists(PARTNERS_FILE):
         partners = []
-        for i in range(1, 11):
+        for i in range(1, num_partners + 1):
             partner = {
                 "PARTNER_ID": str(i),
                 "NAME": f"Local Handicraft Website {i}",
@@ -89,7 +99,7 @@ def initialize_mock_data():
                 "CONTACT_EMAIL": f"contact@localhandicraft{i}.example.com",
                 "CONTACT_PHONE": f"+91 9876543{i:03d}",
                 "REGION_ID": str(random.randint(1, 10 )),
-                "COMMISSION_RATE": random.uniform(0.1, 0.2),
+                "COMMISSION_RATE": round(random.uniform(10, 20), 2),  # percent, as PARTNER_SITES.commission_rate
                 "RATING": random.uniform(3.5, 5.0),
                 "REVIEW_COUNT": random.randint(10, 500),
                 "CREATED_AT": datetime.now().isoformat(),
@@ -101,7 +111,7 @@ def initialize_mock_data():
             json.dump(partners, f, indent=2)
     
     # Create mock categories
-    if not os.path.exists(CATEGORIES_FILE):
+    if overwrite or not os.path.exists(CATEGORIES_FILE):
         categories = [
             {"CATEGORY_ID": "1", "NAME": "Textiles", "DESCRIPTION": "Handwoven and handcrafted textiles including sarees, shawls, and fabrics."},
             {"CATEGORY_ID": "2", "NAME": "Pottery", "DESCRIPTION": "Traditional pottery and ceramics from various regions of India."},
@@ -115,7 +125,7 @@ def initialize_mock_data():
             json.dump(categories, f, indent=2)
     
     # Create mock regions
-    if not os.path.exists(REGIONS_FILE):
+    if overwrite or not os.path.exists(REGIONS_FILE):
         regions = [
             {"REGION_ID": "1", "NAME": "Delhi", "STATE": "Delhi", "DESCRIPTION": "The capital region known for various crafts."},
             {"REGION_ID": "2", "NAME": "Mumbai", "STATE": "Maharashtra", "DESCRIPTION": "Financial capital with rich artistic traditions."},
@@ -133,13 +143,13 @@ def initialize_mock_data():
             json.dump(regions, f, indent=2)
     
     # Create mock orders
-    if not os.path.exists(ORDERS_FILE):
+    if overwrite or not os.path.exists(ORDERS_FILE):
         orders = []
-        for i in range(1, 31):
+        for i in range(1, num_orders + 1):
             order_items = []
             for j in range(random.randint(1, 5)):
-                product_id = str(random.randint(1, 50))
-                partner_id = str(random.randint(1, 10))
+                product_id = str(random.randint(1, num_products))
+                partner_id = str(random.randint(1, num_partners))
                 price = random.randint(500, 5000)
                 quantity = random.randint(1, 3)
                 
@@ -172,116 +182,179 @@ def initialize_mock_data():
         
         with open(ORDERS_FILE, 'w') as f:
             json.dump(orders, f, indent=2)
+    
+    # Customers start empty and are added by registration
+    if overwrite or not os.path.exists(CUSTOMERS_FILE):
+        with open(CUSTOMERS_FILE, 'w') as f:
+            json.dump([], f, indent=2)
 
-# Initialize mock data
-initialize_mock_data()
+_mock_lock = threading.Lock()
+_mock_ready = False
+
+def _ensure_mock_data():
+    """
+    Create the mock data files once per process, before the first mock query reads them.
+    """
+    global _mock_ready
+    if not _mock_ready:
+        with _mock_lock:
+            if not _mock_ready:
+                initialize_mock_data()
+                _mock_ready = True
 
 def execute_query(query, params=None):
+    """
+    Execute a query and record its latency.
+    """
+    metrics.inc_counter('db_queries_total')
+    with metrics.timer('db_query_duration_seconds'):
+        if local_db.is_enabled():
+            return local_db.execute_query(query, params)
+        return _execute_mock_query(query, params)
+
+def _copies(rows):
+    """
+    Copy catalogue rows for a result; the catalogue's own rows are shared and must not be modified.
+    """
+    return [dict(row) for row in rows]
+
+def _mock_partner_offers(partners):
+    """
+    Randomly select 2-5 partners offering a product, with product-specific pricing.
+    """
+    num_partners = random.randint(2, 5)
+    selected_partners = _copies(random.sample(partners, min(num_partners, len(partners))))
+    
+    for partner in selected_partners:
+        partner['PRICE'] = random.randint(500, 5000)
+        partner['SHIPPING_FEE'] = random.randint(50, 200)
+        partner['ESTIMATED_DELIVERY'] = f"{random.randint(3, 10)} days"
+    
+    return selected_partners
+
+def _execute_mock_query(query, params=None):
     """
     Mock function to execute queries against local JSON files instead of Snowflake.
     """
+    _ensure_mock_data()
+    
     # Extract table name from query (very simplified parsing)
-    query_lower = query.lower()
+    query_lower = query.strip().lower()
     
     # Handle SELECT queries
     if query_lower.startswith('select'):
+        # Count queries (COUNT(*), COUNT(col), COUNT(DISTINCT col)) return a single TOTAL row
+        # over the matching records
+        count = re.search(r'count\(\s*(distinct\s+)?([\w.*]+)\s*\)', query_lower)
+        if count:
+            rows = _execute_mock_query(query_lower[:count.start()] + '*' + query_lower[count.end():], params)
+            if count.group(2) != '*':
+                column = count.group(2).split('.')[-1].upper()
+                values = [row.get(column) for row in rows if row.get(column) is not None]
+                return [{'TOTAL': len(set(values)) if count.group(1) else len(values)}]
+            return [{'TOTAL': len(rows)}]
+        
         # Products queries
         if 'products' in query_lower:
-            with open(PRODUCTS_FILE, 'r') as f:
-                products = json.load(f)
-            
-            # Filter by product ID
-            if params and 'product_id' in params:
-                return [p for p in products if p['PRODUCT_ID'] == params['product_id']]
-            
-            # Filter by category
-            if params and 'category_id' in params:
-                return [p for p in products if p['CATEGORY_ID'] == params['category_id']]
+            products = catalogue.rows('products')
             
-            # Filter by region
-            if params and 'region_id' in params:
-                return [p for p in products if p['REGION_ID'] == params['region_id']]
-            
-            # Filter by artisan
-            if params and 'artisan_id' in params:
-                return [p for p in products if p['ARTISAN_ID'] == params['artisan_id']]
+            # Filter by product ID, category, region or artisan
+            for column in ('product_id', 'category_id', 'region_id', 'artisan_id'):
+                if params and column in params:
+                    return _copies(catalogue.where('products', column.upper(), params[column]))
             
             # Search by name
             if params and 'search_term' in params:
                 search_term = params['search_term'].lower()
-                return [p for p in products if search_term in p['NAME'].lower() or search_term in p['DESCRIPTION'].lower()]
+                return _copies(p for p in products if search_term in p['NAME'].lower() or search_term in p['DESCRIPTION'].lower())
             
             # Pagination
             if params and 'limit' in params and 'offset' in params:
                 limit = params['limit']
                 offset = params['offset']
-                return products[offset:offset+limit]
+                return _copies(products[offset:offset+limit])
             
-            return products
+            return _copies(products)
         
         # Artisans queries
         elif 'artisans' in query_lower:
-            with open(ARTISANS_FILE, 'r') as f:
-                artisans = json.load(f)
+            artisans = catalogue.rows('artisans')
             
             # Filter by artisan ID
             if params and 'artisan_id' in params:
-                return [a for a in artisans if a['ARTISAN_ID'] == params['artisan_id']]
+                return _copies(catalogue.where('artisans', 'ARTISAN_ID', params['artisan_id']))
             
             # Pagination
             if params and 'limit' in params and 'offset' in params:
                 limit = params['limit']
                 offset = params['offset']
-                return artisans[offset:offset+limit]
+                return _copies(artisans[offset:offset+limit])
             
-            return artisans
+            return _copies(artisans)
         
         # Partners queries
         elif 'partners' in query_lower:
-            with open(PARTNERS_FILE, 'r') as f:
-                partners = json.load(f)
+            partners = catalogue.rows('partners')
             
             # Filter by partner ID
             if params and 'partner_id' in params:
-                return [p for p in partners if p['PARTNER_ID'] == params['partner_id']]
+                return _copies(catalogue.where('partners', 'PARTNER_ID', params['partner_id']))
             
             # Filter by product ID (mock relationship)
             if params and 'product_id' in params:
-                # Randomly select 2-5 partners for this product
-                num_partners = random.randint(2, 5)
-                selected_partners = random.sample(partners, min(num_partners, len(partners)))
-                
-                # Add product-specific pricing
-                for partner in selected_partners:
-                    partner['PRICE'] = random.randint(500, 5000)
-                    partner['SHIPPING_FEE'] = random.randint(50, 200)
-                    partner['ESTIMATED_DELIVERY'] = f"{random.randint(3, 10)} days"
-                
-                return selected_partners
+                return _mock_partner_offers(partners)
             
-            return partners
+            return _copies(partners)
         
         # Categories queries
         elif 'categories' in query_lower:
-            with open(CATEGORIES_FILE, 'r') as f:
-                categories = json.load(f)
-            
             # Filter by category ID
             if params and 'category_id' in params:
-                return [c for c in categories if c['CATEGORY_ID'] == params['category_id']]
+                return _copies(catalogue.where('categories', 'CATEGORY_ID', params['category_id']))
             
-            return categories
+            return _copies(catalogue.rows('categories'))
         
         # Regions queries
         elif 'regions' in query_lower:
-            with open(REGIONS_FILE, 'r') as f:
-                regions = json.load(f)
-            
             # Filter by region ID
             if params and 'region_id' in params:
-                return [r for r in regions if r['REGION_ID'] == params['region_id']]
+                return _copies(catalogue.where('regions', 'REGION_ID', params['region_id']))
+            
+            return _copies(catalogue.rows('regions'))
+        
+        # Partner offerings of one product (GET_QR_CODE_DATA's PRODUCT_PARTNER join)
+        elif 'from product_partner' in query_lower and params and 'product_id' in params:
+            return _mock_partner_offers(catalogue.rows('partners'))
+        
+        # Partner sites on their own (other joins with PRODUCT_PARTNER are not mocked)
+        elif 'from partner_sites' in query_lower and 'product_partner' not in query_lower:
+            return _copies(catalogue.rows('partners'))
+        
+        # Customers queries
+        elif 'from customers' in query_lower:
+            with open(CUSTOMERS_FILE, 'r') as f:
+                customers = json.load(f)
             
-            return regions
+            # Filter by email
+            if params and 'email' in params:
+                return [c for c in customers if c['EMAIL'] == params['email']]
+            
+            return customers
+        
+        # Order items, flattened out of their orders
+        elif 'from order_items' in query_lower:
+            with open(ORDERS_FILE, 'r') as f:
+                orders = json.load(f)
+            
+            # Filter by order ID
+            if params and 'order_id' in params:
+                orders = [o for o in orders if o['ORDER_ID'] == params['order_id']]
+            
+            return [
+                {**item, 'ORDER_ID': o['ORDER_ID'], 'PLATFORM_FEE': o.get('PLATFORM_FEE'),
+                 'ORDER_DATE': o.get('ORDER_DATE'), 'STATUS': o.get('STATUS')}
+                for o in orders for item in o.get('ITEMS', [])
+            ]
         
         # Orders queries
         elif 'orders' in query_lower:
@@ -312,6 +385,34 @@ def execute_query(query, params=None):
                 json.dump(orders, f, indent=2)
             
             return [{'ORDER_ID': order_data['ORDER_ID']}]
+        
+        if 'customers' in query_lower and params and 'customer_data' in params:
+            with open(CUSTOMERS_FILE, 'r') as f:
+                customers = json.load(f)
+            
+            # Registration inserts only when no customer has the email (WHERE NOT EXISTS)
+            customer_data = params['customer_data']
+            if any(c['EMAIL'] == customer_data['EMAIL'] for c in customers):
+                return []
+            customers.append(customer_data)
+            
+            with open(CUSTOMERS_FILE, 'w') as f:
+                json.dump(customers, f, indent=2)
+            
+            return [{'CUSTOMER_ID': customer_data['CUSTOMER_ID']}]
+    
+    # Handle UPDATE queries (simplified)
+    elif query_lower.startswith('update'):
+        if 'customers' in query_lower and params and 'customer_id' in params and 'password_hash' in params:
+            with open(CUSTOMERS_FILE, 'r') as f:
+                customers = json.load(f)
+            
+            for customer in customers:
+                if customer['CUSTOMER_ID'] == params['customer_id']:
+                    customer['PASSWORD_HASH'] = params['password_hash']
+            
+            with open(CUSTOMERS_FILE, 'w') as f:
+                json.dump(customers, f, indent=2)
     
     # Default empty response
     return []
@@ -321,6 +422,10 @@ def get_connection():
     Mock function to return a dummy connection object.
     """
     class MockConnection:
+        def __init__(self):
+            self.closed = False
+            metrics.inc_gauge('db_connections_open')
+        
         def cursor(self):
             class MockCursor:
                 def execute(self, query, params=None):
@@ -339,14 +444,22 @@ def get_connection():
             return MockCursor()
         
         def close(self):
-            pass
+            if not self.closed:
+                self.closed = True
+                metrics.inc_gauge('db_connections_open', -1)
     
     return MockConnection()
 
 def execute_procedure(procedure_name, params=None):
     """
-    Mock function to execute stored procedures.
+    Execute a stored procedure: registered procedures run through utils.procedures
+    (local implementation or Snowflake, memoized), others are mocked.
     """
+    # Imported here because the registry runs its local implementations through execute_query
+    from utils import procedures
+    if procedures.is_registered(procedure_name):
+        return procedures.call(procedure_name, params)
+    
     # For QR code generation, return a mock URL
     if procedure_name.lower() == 'generate_qr_code':
         product_id = params.get('product_id', '1')
@@ -359,7 +472,12 @@ def init_snowflake():
     """
     Mock function to initialize Snowflake connection.
     """
-    print("Mock Snowflake initialized with local JSON data")
+    if local_db.is_enabled():
+        local_db.init()
+        print(f"Local {local_db.BACKEND} database initialized from {local_db.CSV_DIR}")
+        return True
+    
     # Initialize mock data
-    initialize_mock_data()
+    _ensure_mock_data()
+    print("Mock Snowflake initialized with local JSON data")
     return True
@@ -0,0 +1,221 @@
+"""
+JWT revocation for the Handicraft Marketplace Platform.
+
+Revoked tokens are stored by `jti` until they would have expired anyway, so the
+store never holds more than the tokens revoked within one refresh-token
+lifetime. Every @jwt_required call checks the token's jti, so revocations are
+fronted by an in-process Bloom filter: a token that was never revoked (almost
+every request) is answered from memory without touching the store, and only
+Bloom positives (revoked tokens plus a TOKEN_REVOCATION_ERROR_RATE share of
+false positives) are confirmed against it.
+
+TOKEN_REVOCATION_BACKEND selects the store: memory (one process) or sqlite, a
+database file shared by every worker on the host (TOKEN_REVOCATION_DB). With
+sqlite each worker adds revocations made by the others to its filter at most
+TOKEN_REVOCATION_SYNC_SECONDS after they happen, reading only the new rows.
+A forked worker opens its own backend rather than using one opened before fork.
+"""
+
+import os
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from utils import metrics
+
+BACKEND = os.getenv('TOKEN_REVOCATION_BACKEND', 'memory').lower()
+DB_PATH = os.getenv('TOKEN_REVOCATION_DB', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), '.local_db', 'revoked_tokens.sqlite'))
+SYNC_SECONDS = float(os.getenv('TOKEN_REVOCATION_SYNC_SECONDS', 1))
+CAPACITY = int(os.getenv('TOKEN_REVOCATION_CAPACITY', 100000))
+ERROR_RATE = float(os.getenv('TOKEN_REVOCATION_ERROR_RATE', 0.001))
+
+
+class BloomFilter:
+    """Bit array with k hash positions per key, sized for `capacity` keys at `error_rate` false positives"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: position i is h1 + i * h2 over one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class MemoryBackend:
+    """Revoked jtis and their expiry in a dict (single-process deployments)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.revoked = {}
+
+    def add(self, jti, expires):
+        """Revoke jti; False if it was already revoked"""
+        with self.lock:
+            if jti in self.revoked:
+                return False
+            self.revoked[jti] = expires
+            return True
+
+    def contains(self, jti):
+        expires = self.revoked.get(jti)
+        return expires is not None and expires > time.time()
+
+    def changes(self, cursor):
+        """jtis revoked since cursor (nothing: the filter is updated on add) and the new cursor"""
+        return [], cursor
+
+    def live(self):
+        now = time.time()
+        with self.lock:
+            return [jti for jti, expires in self.revoked.items() if expires > now]
+
+    def purge(self):
+        now = time.time()
+        with self.lock:
+            for jti in [jti for jti, expires in self.revoked.items() if expires <= now]:
+                del self.revoked[jti]
+
+
+class SqliteBackend:
+    """Revoked jtis in a SQLite file shared by the workers on a host"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA busy_timeout = 5000')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS REVOKED_TOKENS (seq INTEGER PRIMARY KEY AUTOINCREMENT, jti TEXT NOT NULL UNIQUE, expires REAL NOT NULL)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS IDX_REVOKED_TOKENS_EXPIRES ON REVOKED_TOKENS (expires)')
+
+    def add(self, jti, expires):
+        with self.lock:
+            cursor = self.conn.execute('INSERT OR IGNORE INTO REVOKED_TOKENS (jti, expires) VALUES (?, ?)', (jti, expires))
+        return cursor.rowcount == 1
+
+    def contains(self, jti):
+        with self.lock:
+            row = self.conn.execute('SELECT expires FROM REVOKED_TOKENS WHERE jti = ?', (jti,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def changes(self, cursor):
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT seq, jti FROM REVOKED_TOKENS WHERE seq > ? AND expires > ? ORDER BY seq', (cursor, time.time())).fetchall()
+        return [jti for _, jti in rows], (rows[-1][0] if rows else cursor)
+
+    def live(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute('SELECT jti FROM REVOKED_TOKENS WHERE expires > ?', (time.time(),))]
+
+    def purge(self):
+        with self.lock:
+            self.conn.execute('DELETE FROM REVOKED_TOKENS WHERE expires <= ?', (time.time(),))
+
+
+class RevocationStore:
+    """Bloom filter in front of a revocation backend"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.backend = None
+        self.bloom = None
+        self.cursor = 0
+        self.synced_at = 0.0
+
+    def _ensure_backend(self):
+        if self.backend is None:
+            with self.lock:
+                if self.backend is None:
+                    self.backend = SqliteBackend(DB_PATH) if BACKEND == 'sqlite' else MemoryBackend()
+                    self._rebuild()
+        return self.backend
+
+    def _rebuild(self):
+        """Drop expired revocations and refill a filter sized for the rest (Bloom filters cannot delete)"""
+        self.backend.purge()
+        live = self.backend.live()
+        bloom = BloomFilter(max(CAPACITY, 2 * len(live)), ERROR_RATE)
+        for jti in live:
+            bloom.add(jti)
+        self.bloom = bloom
+        _, self.cursor = self.backend.changes(0)
+        self.synced_at = time.monotonic()
+
+    def _sync(self):
+        """Add revocations made by other workers since the last sync"""
+        if time.monotonic() - self.synced_at < SYNC_SECONDS:
+            return
+        with self.lock:
+            if time.monotonic() - self.synced_at < SYNC_SECONDS:
+                return
+            jtis, self.cursor = self.backend.changes(self.cursor)
+            for jti in jtis:
+                self.bloom.add(jti)
+            if self.bloom.count > self.bloom.capacity:
+                self._rebuild()
+            self.synced_at = time.monotonic()
+
+    def revoke(self, jti, expires):
+        """Revoke jti until expires (a Unix timestamp). Returns False if it was already revoked."""
+        backend = self._ensure_backend()
+        added = backend.add(jti, expires)
+        with self.lock:
+            self.bloom.add(jti)
+            if self.bloom.count > self.bloom.capacity:
+                self._rebuild()
+        return added
+
+    def is_revoked(self, jti):
+        """Whether jti has been revoked; no I/O unless the filter reports it"""
+        self._ensure_backend()
+        self._sync()
+        if jti not in self.bloom:
+            metrics.inc_counter('token_revocation_checks_total', result='not_revoked')
+            return False
+        revoked = self.backend.contains(jti)
+        metrics.inc_counter('token_revocation_checks_total', result='revoked' if revoked else 'false_positive')
+        return revoked
+
+
+store = RevocationStore()
+_inherited = []
+
+
+def _reset_after_fork():
+    """Forget the backend opened before fork (kept unclosed, as the parent still uses its file)"""
+    _inherited.append(store.backend)
+    store.__init__()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def revoke_token(payload):
+    """Revoke a decoded JWT until it expires. Returns False if it was already revoked."""
+    return store.revoke(payload['jti'], payload.get('exp', time.time() + 86400))
+
+
+def init_app(jwt):
+    """Reject revoked tokens on every @jwt_required endpoint"""
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return store.is_revoked(jwt_payload['jti'])
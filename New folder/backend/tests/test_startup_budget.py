@@ -0,0 +1,40 @@
+"""
+Startup budget check for the backend, measured as benchmarks/bench_startup.py
+does: cold starts of the default lazy startup in fresh interpreters, each with
+an empty mock data directory, compared by their median.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import statistics
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from bench_startup import run_once, FIRST_PATH, IMPORT_BUDGET_MS, FIRST_RESPONSE_BUDGET_MS
+
+RUNS = 3
+
+
+@pytest.fixture(scope='module')
+def lazy_startup():
+    return [run_once(FIRST_PATH, {'WARMUP_ON_START': 'false'}) for _ in range(RUNS)]
+
+
+def test_first_request_succeeds(lazy_startup):
+    assert {sample['status'] for sample in lazy_startup} == {200}
+
+
+def test_import_within_budget(lazy_startup):
+    import_ms = statistics.median(sample['import_ms'] for sample in lazy_startup)
+    assert import_ms <= IMPORT_BUDGET_MS, f"import {import_ms:.1f}ms > {IMPORT_BUDGET_MS}ms"
+
+
+def test_first_response_within_budget(lazy_startup):
+    first_response_ms = statistics.median(sample['first_response_ms'] for sample in lazy_startup)
+    assert first_response_ms <= FIRST_RESPONSE_BUDGET_MS, \
+        f"first response {first_response_ms:.1f}ms > {FIRST_RESPONSE_BUDGET_MS}ms"
@@ -11,125 +11,542 @@ import pandas as pd
 import numpy as np
 import json
 import uuid
+import zlib
+import hashlib
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
-# Create directory for processed data
-os.makedirs('/home/ubuntu/handicraft_marketplace/database/processed_data', exist_ok=True)
+from entity_linking import canonical_states, link_products, link_tourist_stats
+from dedup_artisans import deduplicate_artisans
+from table_store import INTERMEDIATE_EXTENSION, TableWriter, conform, write_table, read_table, export_csv
+
+# Directories for raw uploads, processed data, change sets and cached workbook conversions
+UPLOAD_DIR = os.getenv('ETL_UPLOAD_DIR', '/home/ubuntu/upload')
+PROCESSED_DATA_DIR = os.getenv('ETL_PROCESSED_DATA_DIR', '/home/ubuntu/handicraft_marketplace/database/processed_data')
+DELTA_DIR = os.path.join(PROCESSED_DATA_DIR, 'delta')
+STAGING_DIR = os.path.join(PROCESSED_DATA_DIR, 'staging')
+SNOWFLAKE_IMPORT_SCRIPT = os.path.join(os.path.dirname(PROCESSED_DATA_DIR), 'snowflake_import.sql')
+CACHE_DIR = os.getenv('ETL_CACHE_DIR', os.path.join(os.path.dirname(PROCESSED_DATA_DIR), '.etl_cache'))
+
+# Worker processes for per-file stages (None lets the pool use every CPU)
+ETL_WORKERS = int(os.getenv('ETL_WORKERS', 0)) or None
+
+# Rows per chunk when streaming source files (0 loads each file whole). Streaming keeps
+# peak memory bounded for workbooks larger than memory.
+ETL_CHUNK_ROWS = int(os.getenv('ETL_CHUNK_ROWS', 0))
+
+# Seed for generated sample data, and the date sample orders are placed relative to.
+# Pin ETL_REFERENCE_DATE to make generated orders reproducible across days.
+ETL_SEED = int(os.getenv('ETL_SEED', 42))
+REFERENCE_DATE = pd.Timestamp(os.getenv('ETL_REFERENCE_DATE', datetime.now().strftime('%Y-%m-%d')))
+
+# Column mapping rules per source: (field, substrings). For each source column the first
+# rule with a matching substring wins; when several columns map to the same field the
+# last one wins, matching the original row-by-row behaviour.
+ARTISAN_COLUMN_RULES = [
+    ('name', ('name',)),
+    ('location', ('location', 'address', 'village')),
+    ('craft_type', ('craft', 'art', 'skill')),
+    ('contact_info', ('contact', 'phone', 'mobile')),
+    ('years_active', ('experience', 'year')),
+]
+
+GI_TAG_COLUMN_RULES = [
+    ('name', ('name', 'product')),
+    ('description', ('description', 'details')),
+    ('region_name', ('region', 'location', 'place')),
+    ('state', ('state',)),
+    ('issue_date', ('date', 'issued')),
+]
+
+PRODUCT_COLUMN_RULES = [
+    ('artisan_name', ('artisan', 'maker', 'craftsman')),
+    ('name', ('name', 'product')),
+    ('description', ('description', 'details')),
+    ('price', ('price', 'cost')),
+    ('category_name', ('category', 'type')),
+    ('image_url', ('image', 'photo', 'url')),
+    ('region_name', ('region', 'location')),
+    ('materials', ('material',)),
+    ('dimensions', ('dimension', 'size')),
+    ('weight', ('weight',)),
+]
+
+TOURIST_STATS_COLUMN_RULES = [
+    ('region_name', ('region', 'location', 'place')),
+    ('year', ('year',)),
+    ('domestic_count', ('domestic',)),
+    ('foreign_count', ('foreign', 'international')),
+    ('growth_rate', ('growth',)),
+    ('peak_season', ('peak', 'season')),
+]
+
+# Function to create the random generator for a generated-data stage (same seed, same draws)
+def etl_rng(stage):
+    return np.random.default_rng([ETL_SEED, zlib.crc32(stage.encode('utf-8'))])
 
 # Function to generate UUIDs
 def generate_uuid():
     return str(uuid.uuid4())
 
+# Function to format an (n, 16) byte array as UUID strings with the given version
+def format_uuids(raw, version):
+    n = len(raw)
+    raw = raw.copy()
+    raw[:, 6] = (raw[:, 6] & 0x0f) | (version << 4)
+    raw[:, 8] = (raw[:, 8] & 0x3f) | 0x80  # RFC 4122 variant
+    hex_chars = np.frombuffer(raw.tobytes().hex().encode('ascii'), dtype=np.uint8).reshape(n, 32)
+    
+    # Lay the hex digits out as 8-4-4-4-12 groups
+    chars = np.full((n, 36), ord('-'), dtype=np.uint8)
+    for src, dst in ((0, 0), (8, 9), (12, 14), (16, 19), (20, 24)):
+        width = {0: 8, 20: 12}.get(src, 4)
+        chars[:, dst:dst + width] = hex_chars[:, src:src + width]
+    return chars.view('S36').ravel().astype(str).astype(object)
+
+# Function to generate a batch of random (version 4) UUIDs without a per-row Python loop
+def generate_uuids(n):
+    return format_uuids(np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16), 4)
+
+# Function to normalize key values so IDs survive case and whitespace edits in the source sheets.
+# Each distinct value is normalized once, which keeps repeated keys (e.g. partner IDs) cheap.
+def normalize_key(values):
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    normalized = np.array([' '.join(str(value).split()).lower() if not pd.isna(value) else '' for value in uniques] + [''], dtype=object)
+    return normalized[codes]
+
+# Function to derive deterministic (version 5 style) UUIDs from key columns. The same
+# namespace and key always give the same ID, so re-running the ETL does not re-key rows.
+def stable_uuids(namespace, *keys):
+    normalized = [normalize_key(key) for key in keys]
+    joined = normalized[0].tolist() if len(normalized) == 1 else ['\x1f'.join(parts) for parts in zip(*normalized)]
+    prefix = hashlib.sha1(f"{namespace}\x1f".encode('utf-8'))
+    
+    def digest(key):
+        h = prefix.copy()
+        h.update(key.encode('utf-8'))
+        return h.digest()[:16]
+    
+    digests = b''.join([digest(key) for key in joined])
+    raw = np.frombuffer(digests, dtype=np.uint8).reshape(len(joined), 16)
+    return format_uuids(raw, 5)
+
+# 64-bit mixing function (splitmix64 finalizer) used to combine ID words without a per-row loop
+def mix64(x):
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xbf58476d1ce4e5b9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94d049bb133111eb)
+    return x ^ (x >> np.uint64(31))
+
+# Function to derive deterministic UUIDs for child rows from their parents' UUIDs (and optional
+# integer columns such as line numbers). Unlike stable_uuids this needs no per-row hashing, which
+# matters for link tables with millions of rows.
+def derived_uuids(namespace, *columns):
+    n = len(columns[0])
+    seed = np.frombuffer(hashlib.sha1(namespace.encode('utf-8')).digest()[:16], dtype='>u8').astype(np.uint64)
+    high = np.full(n, seed[0], dtype=np.uint64)
+    low = np.full(n, seed[1], dtype=np.uint64)
+    
+    for column in columns:
+        column = np.asarray(column)
+        if column.dtype.kind in 'iu':
+            words = [column.astype(np.uint64)]
+        else:
+            raw = bytes.fromhex(''.join(column.tolist()).replace('-', ''))
+            pairs = np.frombuffer(raw, dtype='>u8').reshape(n, 2).astype(np.uint64)
+            words = [pairs[:, 0], pairs[:, 1]]
+        for word in words:
+            high = mix64(high ^ word)
+            low = mix64(low ^ word ^ high)
+    
+    raw = np.empty((n, 2), dtype='>u8')
+    raw[:, 0] = high
+    raw[:, 1] = low
+    return format_uuids(raw.view(np.uint8).reshape(n, 16), 5)
+
+# Function to derive a single deterministic UUID
+def stable_uuid(namespace, *parts):
+    return stable_uuids(namespace, *[[part] for part in parts])[0]
+
+# Function to number repeated keys (0, 1, ...) so duplicate names in a sheet still get distinct IDs.
+# When a sheet is streamed in chunks, pass the same `counts` dict for every chunk so numbering
+# continues where the previous chunk stopped (it holds one entry per distinct key).
+def occurrence(*keys, counts=None):
+    normalized = [normalize_key(key) for key in keys]
+    frame = pd.DataFrame(dict(enumerate(normalized)))
+    numbers = frame.groupby(list(frame.columns), sort=False).cumcount().to_numpy()
+    
+    if counts is not None:
+        joined = pd.Series(normalized[0] if len(normalized) == 1 else ['\x1f'.join(parts) for parts in zip(*normalized)], dtype=object)
+        numbers = numbers + joined.map(counts).fillna(0).to_numpy(dtype=np.int64)
+        for key, size in joined.value_counts(sort=False).items():
+            counts[key] = counts.get(key, 0) + int(size)
+    
+    return numbers.astype(str).astype(object)
+
 # Function to clean and standardize column names
 def clean_column_names(df):
     df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_').str.replace('-', '_')
     return df
 
-# Function to save processed dataframe to CSV
-def save_processed_df(df, filename):
-    output_path = f'/home/ubuntu/handicraft_marketplace/database/processed_data/{filename}'
-    df.to_csv(output_path, index=False)
+# Function to resolve which source column feeds each schema field (once per file)
+def resolve_column_mapping(columns, rules):
+    mapping = {}
+    for col in columns:
+        for field, patterns in rules:
+            if any(pattern in col for pattern in patterns):
+                mapping[field] = col
+                break
+    return mapping
+
+# Vectorized column converters: nulls become the given default, bad values are coerced
+def text_column(df, col):
+    values = df[col]
+    return values.astype(object).where(values.notna(), '').astype(str)
+
+def int_column(df, col, default=0):
+    return pd.to_numeric(df[col], errors='coerce').fillna(default).astype(np.int64)
+
+def float_column(df, col, default=0.0):
+    return pd.to_numeric(df[col], errors='coerce').fillna(default).astype(np.float64)
+
+def date_column(df, col):
+    dates = pd.to_datetime(df[col], errors='coerce')
+    return dates.dt.strftime('%Y-%m-%d').astype(object).where(dates.notna(), None)
+
+# Function to hash a source file's contents (identifies unchanged workbooks across runs)
+def file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Function to read a source sheet, reusing the columnar copy from a previous run if the file is unchanged
+def read_source_file(file_path):
+    cache_key = f"{file_digest(file_path)}-{pd.__version__}"
+    cache_path = os.path.join(CACHE_DIR, f"{cache_key}.pkl")
+    
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_pickle(cache_path)
+        except Exception as e:
+            print(f"Ignoring unreadable cache entry {cache_path}: {str(e)}")
+    
+    if file_path.endswith('.csv'):
+        df = pd.read_csv(file_path)
+    else:
+        df = pd.read_excel(file_path)
+    
+    # Write to a temporary name first so concurrent workers never see a partial entry
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, cache_path)
+    return df
+
+# Function to read a source sheet in chunks of at most chunk_rows rows with cleaned column names.
+# Excel files are streamed through openpyxl's read-only mode, so no whole sheet is ever loaded.
+def iter_source_chunks(file_path, chunk_rows):
+    if file_path.endswith('.csv'):
+        for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+            yield clean_column_names(chunk)
+        return
+    
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = pd.Index([str(col) if col is not None else f"unnamed:_{i}" for i, col in enumerate(header)])
+        
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_rows:
+                yield clean_column_names(pd.DataFrame(batch, columns=columns))
+                batch = []
+        if batch:
+            yield clean_column_names(pd.DataFrame(batch, columns=columns))
+    finally:
+        workbook.close()
+
+# Columns that change on every run and are therefore excluded from change detection
+VOLATILE_COLUMNS = ('created_at', 'updated_at')
+
+# Tables exported as CSV for the warehouse load, in load order
+EXPORT_TABLES = ['regions', 'artisans', 'categories', 'gi_tags', 'cultural_stories', 'products', 'tourist_stats',
+                 'partner_sites', 'product_partner', 'customers', 'orders', 'order_items']
+
+# Function to get the path of a typed intermediate table (e.g. 'products' or 'staging/products')
+def table_path(table):
+    return os.path.join(PROCESSED_DATA_DIR, f"{table}{INTERMEDIATE_EXTENSION}")
+
+# Function to read a typed intermediate table written by save_processed_df
+def load_table(table, columns=None):
+    return read_table(table_path(table), os.path.basename(table), columns)
+
+# Function to hash each row's content, ignoring timestamps (list and date values are hashed as text)
+def row_hashes(df):
+    content = df[[col for col in df.columns if col not in VOLATILE_COLUMNS]].copy()
+    for col in content.columns:
+        if content[col].dtype == object:
+            content[col] = content[col].map(lambda v: '\x1f'.join(v) if isinstance(v, list) else v if v is None else str(v))
+    return pd.util.hash_pandas_object(content, index=False).to_numpy()
+
+# Function to compare a conformed table with its previous output: returns (current, inserted, updated, deleted).
+# Unchanged rows keep their previous timestamps and updated rows keep created_at, so the
+# full snapshot only differs from the last one where the data did.
+def compute_delta(current, previous, key):
+    current = current.copy()
+    if previous is None or list(previous.columns) != list(current.columns):
+        # No usable previous output (first run or schema change): everything is new
+        deleted = previous.iloc[0:0] if previous is not None else current.iloc[0:0]
+        return current, current, current.iloc[0:0], deleted
+    
+    previous = previous.drop_duplicates(key, ignore_index=True)
+    previous_rows = pd.Series(np.arange(len(previous)), index=previous[key].to_numpy())
+    matched = previous_rows.reindex(current[key].to_numpy()).to_numpy()
+    is_existing = ~np.isnan(matched)
+    previous_index = matched[is_existing].astype(np.int64)
+    
+    changed = np.zeros(len(current), dtype=bool)
+    changed[is_existing] = row_hashes(current[is_existing]) != row_hashes(previous.iloc[previous_index])
+    unchanged = is_existing & ~changed
+    
+    for col in VOLATILE_COLUMNS:
+        if col not in current.columns:
+            continue
+        previous_values = previous[col].to_numpy()[previous_index]
+        keep = unchanged[is_existing] if col == 'updated_at' else np.ones(len(previous_index), dtype=bool)
+        values = current[col].to_numpy().copy()
+        values[np.flatnonzero(is_existing)[keep]] = previous_values[keep]
+        current[col] = values
+    
+    inserted = current[~is_existing]
+    updated = current[changed]
+    deleted = previous[~previous[key].isin(current[key])]
+    return current, inserted, updated, deleted
+
+# Function to save a processed dataframe as a typed intermediate table. The frame is conformed to
+# the table's schema first. When a key is given, the previous output is diffed against the new
+# one and the inserted, updated and deleted rows are exported to DELTA_DIR so a refresh only has
+# to load what changed.
+def save_processed_df(df, table, key=None):
+    output_path = table_path(table)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    df = conform(df, os.path.basename(table))
+    
+    if key is not None:
+        previous = None
+        if os.path.exists(output_path):
+            try:
+                previous = load_table(table)
+            except Exception as e:
+                print(f"Ignoring unreadable previous output {output_path}: {str(e)}")
+        df, inserted, updated, deleted = compute_delta(df, previous, key)
+        
+        os.makedirs(DELTA_DIR, exist_ok=True)
+        for change, rows in (('inserted', inserted), ('updated', updated), ('deleted', deleted)):
+            export_csv(rows, os.path.join(DELTA_DIR, f"{table}.{change}.csv"), table)
+        print(f"Changes in {table}: {len(inserted)} inserted, {len(updated)} updated, {len(deleted)} deleted")
+    
+    write_table(df, output_path, os.path.basename(table))
+    print(f"Saved processed data to {output_path}")
+    return output_path
+
+# Export the final tables as CSV for the warehouse load (CSV is not read back by the ETL)
+def export_csv_tables():
+    paths = []
+    for table in EXPORT_TABLES:
+        csv_path = os.path.join(PROCESSED_DATA_DIR, f"{table}.csv")
+        export_csv(load_table(table), csv_path, table)
+        paths.append(csv_path)
+    print(f"Exported {len(paths)} tables as CSV to {PROCESSED_DATA_DIR}")
+    return paths
+
+# Transform one state's artisan sheet (or one chunk of it, see occurrence) into the ARTISANS schema
+def transform_artisans(df, state_name, counts=None):
+    mapping = resolve_column_mapping(df.columns, ARTISAN_COLUMN_RULES)
+    
+    # Skip records without names (all of them if there is no name column)
+    if 'name' not in mapping:
+        df = df.iloc[0:0]
+    names = text_column(df, mapping['name']) if 'name' in mapping else pd.Series([], dtype=object)
+    keep = (names != '').to_numpy()
+    df = df[keep]
+    names = names[keep]
+    n = len(df)
+    
+    artisans = pd.DataFrame({
+        'artisan_id': stable_uuids('artisans', [state_name] * n, names, occurrence(names, counts=counts)),
+        'state': canonical_states([state_name])[0],
+        'name': names.to_numpy(),
+        'location': text_column(df, mapping['location']).to_numpy() if 'location' in mapping else state_name,
+        'craft_type': text_column(df, mapping['craft_type']).to_numpy() if 'craft_type' in mapping else 'Traditional Craft',
+        'contact_info': text_column(df, mapping['contact_info']).to_numpy() if 'contact_info' in mapping else '',
+        'years_active': int_column(df, mapping['years_active']).to_numpy() if 'years_active' in mapping else 0,
+    }, index=pd.RangeIndex(n))
+    
+    # Add timestamps
+    now = datetime.now().isoformat()
+    artisans['created_at'] = now
+    artisans['updated_at'] = now
+    
+    # Add bio placeholder
+    artisans['bio'] = 'Skilled ' + artisans['craft_type'] + ' artisan from ' + artisans['location'] + f", {state_name}."
+    
+    # Add image_url placeholder
+    artisans['image_url'] = ''
+    
+    return artisans
+
+# Process one state's artisan workbook (runs in a worker process)
+def process_artisan_file(file_path):
+    try:
+        print(f"Processing {file_path}...")
+        state_name = os.path.basename(file_path).replace('.xlsx', '').replace(' ARTSIAN DATA', '')
+        
+        # Read Excel file
+        df = read_source_file(file_path)
+        
+        # Clean column names
+        df = clean_column_names(df)
+        
+        # Print column names for debugging
+        print(f"Columns in {state_name}: {df.columns.tolist()}")
+        
+        artisan_data = transform_artisans(df, state_name)
+        print(f"Processed {len(artisan_data)} artisans from {state_name}")
+        return artisan_data
+    
+    except Exception as e:
+        print(f"Error processing {file_path}: {str(e)}")
+        return None
+
+# Stream state artisan workbooks chunk by chunk into one table, in input-file order. Any
+# error aborts the whole table, so a half-read workbook never reaches the output.
+def stream_artisan_files(artisan_files, output_path, chunk_rows):
+    with TableWriter(output_path, 'artisans') as writer:
+        for file_path in artisan_files:
+            print(f"Streaming {file_path} in chunks of {chunk_rows} rows...")
+            state_name = os.path.basename(file_path).replace('.xlsx', '').replace('.csv', '').replace(' ARTSIAN DATA', '')
+            counts = {}
+            rows_before = writer.rows
+            for chunk in iter_source_chunks(file_path, chunk_rows):
+                writer.write(transform_artisans(chunk, state_name, counts))
+            print(f"Processed {writer.rows - rows_before} artisans from {state_name}")
     print(f"Saved processed data to {output_path}")
     return output_path
 
 # Process artisan data from multiple states
-def process_artisan_data():
+def process_artisan_data(max_workers=ETL_WORKERS, chunk_rows=ETL_CHUNK_ROWS):
     artisan_files = [
-        '/home/ubuntu/upload/UTTARPRADESH.xlsx',
-        '/home/ubuntu/upload/AP.xlsx',
-        '/home/ubuntu/upload/MEGHALAYA ARTSIAN DATA.xlsx',
-        '/home/ubuntu/upload/MAHARASTRA.xlsx',
-        '/home/ubuntu/upload/KARNATAKA.xlsx'
+        os.path.join(UPLOAD_DIR, 'UTTARPRADESH.xlsx'),
+        os.path.join(UPLOAD_DIR, 'AP.xlsx'),
+        os.path.join(UPLOAD_DIR, 'MEGHALAYA ARTSIAN DATA.xlsx'),
+        os.path.join(UPLOAD_DIR, 'MAHARASTRA.xlsx'),
+        os.path.join(UPLOAD_DIR, 'KARNATAKA.xlsx')
     ]
     
-    all_artisans = []
-    
-    for file_path in artisan_files:
+    # Streaming mode reads the workbooks one after another with bounded memory
+    if chunk_rows:
         try:
-            print(f"Processing {file_path}...")
-            state_name = os.path.basename(file_path).replace('.xlsx', '').replace(' ARTSIAN DATA', '')
-            
-            # Read Excel file
-            df = pd.read_excel(file_path)
-            
-            # Clean column names
-            df = clean_column_names(df)
-            
-            # Print column names for debugging
-            print(f"Columns in {state_name}: {df.columns.tolist()}")
-            
-            # Extract relevant columns (adjust based on actual column names)
-            # We'll try to map various column naming patterns to our standardized schema
-            artisan_data = []
-            
-            for _, row in df.iterrows():
-                artisan = {
-                    'artisan_id': generate_uuid(),
-                    'state': state_name
-                }
-                
-                # Map common column patterns to our schema
-                for col in df.columns:
-                    if 'name' in col:
-                        artisan['name'] = str(row[col]) if not pd.isna(row[col]) else ''
-                    elif 'location' in col or 'address' in col or 'village' in col:
-                        artisan['location'] = str(row[col]) if not pd.isna(row[col]) else ''
-                    elif 'craft' in col or 'art' in col or 'skill' in col:
-                        artisan['craft_type'] = str(row[col]) if not pd.isna(row[col]) else ''
-                    elif 'contact' in col or 'phone' in col or 'mobile' in col:
-                        artisan['contact_info'] = str(row[col]) if not pd.isna(row[col]) else ''
-                    elif 'experience' in col or 'year' in col:
-                        try:
-                            artisan['years_active'] = int(row[col]) if not pd.isna(row[col]) else 0
-                        except:
-                            artisan['years_active'] = 0
-                
-                # Ensure required fields have values
-                if 'name' not in artisan or not artisan['name']:
-                    continue  # Skip records without names
-                
-                # Add default values for missing fields
-                if 'location' not in artisan:
-                    artisan['location'] = state_name
-                if 'craft_type' not in artisan:
-                    artisan['craft_type'] = 'Traditional Craft'
-                if 'contact_info' not in artisan:
-                    artisan['contact_info'] = ''
-                if 'years_active' not in artisan:
-                    artisan['years_active'] = 0
-                
-                # Add timestamps
-                artisan['created_at'] = datetime.now().isoformat()
-                artisan['updated_at'] = datetime.now().isoformat()
-                
-                # Add bio placeholder
-                artisan['bio'] = f"Skilled {artisan['craft_type']} artisan from {artisan['location']}, {state_name}."
-                
-                # Add image_url placeholder
-                artisan['image_url'] = ''
-                
-                artisan_data.append(artisan)
-            
-            all_artisans.extend(artisan_data)
-            print(f"Processed {len(artisan_data)} artisans from {state_name}")
-            
+            return stream_artisan_files(artisan_files, table_path(os.path.join('staging', 'artisans')), chunk_rows)
         except Exception as e:
-            print(f"Error processing {file_path}: {str(e)}")
+            print(f"Error streaming artisan data: {str(e)}")
+            return None
     
-    # Convert to DataFrame
-    artisans_df = pd.DataFrame(all_artisans)
+    # Parse and transform the workbooks in parallel; map() yields results in input order
+    if max_workers == 1:
+        results = [process_artisan_file(file_path) for file_path in artisan_files]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(process_artisan_file, artisan_files))
     
-    # Save processed data
-    return save_processed_df(artisans_df, 'artisans.csv')
+    # Combine all states in input-file order
+    all_artisans = [artisan_data for artisan_data in results if artisan_data is not None]
+    artisans_df = pd.concat(all_artisans, ignore_index=True) if all_artisans else pd.DataFrame()
+    
+    # Save to staging; deduplicate_artisan_data() writes the final table
+    return save_processed_df(artisans_df, os.path.join('staging', 'artisans'))
+
+# Merge artisans listed more than once (spelling variants across and within the state workbooks)
+def deduplicate_artisan_data():
+    try:
+        artisans_df = load_table(os.path.join('staging', 'artisans'))
+        canonical_df, merges_df = deduplicate_artisans(artisans_df)
+        print(f"Merged {len(merges_df)} duplicate artisans into {merges_df['canonical_artisan_id'].nunique()} records "
+              f"({len(artisans_df)} -> {len(canonical_df)})")
+        
+        # Save processed data; the merge map lets references to merged IDs be repointed
+        artisans_path = save_processed_df(canonical_df, 'artisans', key='artisan_id')
+        merges_path = save_processed_df(merges_df, 'artisan_merges')
+        
+        return artisans_path, merges_path
+    
+    except Exception as e:
+        print(f"Error deduplicating artisans: {str(e)}")
+        return None, None
+
+# Transform the GI tagged products sheet into GI_TAGS and REGIONS
+def transform_gi_tags(df):
+    mapping = resolve_column_mapping(df.columns, GI_TAG_COLUMN_RULES)
+    
+    # Skip records without names
+    if 'name' not in mapping:
+        df = df.iloc[0:0]
+    names = text_column(df, mapping['name']) if 'name' in mapping else pd.Series([], dtype=object)
+    keep = (names != '').to_numpy()
+    df = df[keep]
+    names = names[keep].to_numpy()
+    n = len(df)
+    
+    gi_tags_df = pd.DataFrame({
+        'gi_tag_id': None,
+        'region_id': None,
+        'name': names,
+        'description': text_column(df, mapping['description']).to_numpy() if 'description' in mapping else 'GI tagged product: ' + pd.Series(names, dtype=object),
+        'region_name': text_column(df, mapping['region_name']).to_numpy() if 'region_name' in mapping else 'Unknown Region',
+        'state': canonical_states(text_column(df, mapping['state'])) if 'state' in mapping else 'Unknown State',
+        'issue_date': date_column(df, mapping['issue_date']).to_numpy() if 'issue_date' in mapping else None,
+        'issuing_body': 'Geographical Indications Registry, India',
+    }, index=pd.RangeIndex(n))
+    
+    # Derive IDs from the tag and region names so they are stable across runs
+    gi_tags_df['gi_tag_id'] = stable_uuids('gi_tags', gi_tags_df['state'], gi_tags_df['name'], occurrence(gi_tags_df['state'], gi_tags_df['name']))
+    gi_tags_df['region_id'] = stable_uuids('regions', gi_tags_df['state'], gi_tags_df['region_name'])
+    
+    # Add timestamps
+    now = datetime.now().isoformat()
+    gi_tags_df['created_at'] = now
+    gi_tags_df['updated_at'] = now
+    
+    # Create regions dataframe from GI tags (one row per region, named after its first tag)
+    regions_df = pd.DataFrame({
+        'region_id': gi_tags_df['region_id'],
+        'name': gi_tags_df['region_name'],
+        'state': gi_tags_df['state'],
+        'description': 'Region known for ' + gi_tags_df['name'],
+        'famous_for': gi_tags_df['name'],
+        'image_url': '',
+        'created_at': now,
+        'updated_at': now
+    }).drop_duplicates('region_id', ignore_index=True)
+    
+    return gi_tags_df, regions_df
 
 # Process GI tagged products
 def process_gi_tagged_products():
     try:
-        file_path = '/home/ubuntu/upload/GI tagged products.xlsx'
+        file_path = os.path.join(UPLOAD_DIR, 'GI tagged products.xlsx')
         print(f"Processing {file_path}...")
         
         # Read Excel file
-        df = pd.read_excel(file_path)
+        df = read_source_file(file_path)
         
         # Clean column names
         df = clean_column_names(df)
@@ -138,90 +555,105 @@ def process_gi_tagged_products():
         print(f"Columns in GI tagged products: {df.columns.tolist()}")
         
         # Process data
-        gi_tags = []
-        
-        for _, row in df.iterrows():
-            gi_tag = {
-                'gi_tag_id': generate_uuid(),
-                'region_id': generate_uuid()  # This will be linked to regions later
-            }
-            
-            # Map columns based on patterns
-            for col in df.columns:
-                if 'name' in col or 'product' in col:
-                    gi_tag['name'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'description' in col or 'details' in col:
-                    gi_tag['description'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'region' in col or 'location' in col or 'place' in col:
-                    gi_tag['region_name'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'state' in col:
-                    gi_tag['state'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'date' in col or 'issued' in col:
-                    try:
-                        gi_tag['issue_date'] = row[col].strftime('%Y-%m-%d') if not pd.isna(row[col]) else None
-                    except:
-                        gi_tag['issue_date'] = None
-            
-            # Add default values for missing fields
-            if 'name' not in gi_tag or not gi_tag['name']:
-                continue  # Skip records without names
-            
-            if 'description' not in gi_tag:
-                gi_tag['description'] = f"GI tagged product: {gi_tag['name']}"
-            if 'region_name' not in gi_tag:
-                gi_tag['region_name'] = 'Unknown Region'
-            if 'state' not in gi_tag:
-                gi_tag['state'] = 'Unknown State'
-            if 'issue_date' not in gi_tag:
-                gi_tag['issue_date'] = None
-            
-            # Add issuing body
-            gi_tag['issuing_body'] = 'Geographical Indications Registry, India'
-            
-            # Add timestamps
-            gi_tag['created_at'] = datetime.now().isoformat()
-            gi_tag['updated_at'] = datetime.now().isoformat()
-            
-            gi_tags.append(gi_tag)
-        
-        # Convert to DataFrame
-        gi_tags_df = pd.DataFrame(gi_tags)
-        
-        # Create regions dataframe from GI tags
-        regions = []
-        for gi_tag in gi_tags:
-            region = {
-                'region_id': gi_tag['region_id'],
-                'name': gi_tag['region_name'],
-                'state': gi_tag['state'],
-                'description': f"Region known for {gi_tag['name']}",
-                'famous_for': gi_tag['name'],
-                'image_url': '',
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            regions.append(region)
-        
-        regions_df = pd.DataFrame(regions)
+        gi_tags_df, regions_df = transform_gi_tags(df)
         
         # Save processed data
-        gi_tags_path = save_processed_df(gi_tags_df, 'gi_tags.csv')
-        regions_path = save_processed_df(regions_df, 'regions.csv')
+        gi_tags_path = save_processed_df(gi_tags_df, 'gi_tags', key='gi_tag_id')
+        regions_path = save_processed_df(regions_df, 'regions', key='region_id')
         
         return gi_tags_path, regions_path
-        
+    
     except Exception as e:
         print(f"Error processing GI tagged products: {str(e)}")
         return None, None
 
+# Transform the products sheet (or one chunk of it) into PRODUCTS, CATEGORIES and CULTURAL_STORIES
+def transform_products(df, counts=None):
+    mapping = resolve_column_mapping(df.columns, PRODUCT_COLUMN_RULES)
+    
+    # Skip records without names
+    if 'name' not in mapping:
+        df = df.iloc[0:0]
+    names = text_column(df, mapping['name']) if 'name' in mapping else pd.Series([], dtype=object)
+    keep = (names != '').to_numpy()
+    df = df[keep]
+    names = pd.Series(names[keep].to_numpy(), dtype=object)
+    n = len(df)
+    
+    def text_or(field, default):
+        return text_column(df, mapping[field]).to_numpy() if field in mapping else default
+    
+    product_key = (names, occurrence(names, counts=counts))
+    category_names = text_or('category_name', 'Traditional Handicraft')
+    region_names = text_or('region_name', 'Traditional Region')
+    
+    products_df = pd.DataFrame({
+        'product_id': stable_uuids('products', *product_key),
+        'artisan_id': None,  # Resolved by link_entities
+        'category_id': stable_uuids('categories', np.broadcast_to(category_names, n)),
+        'region_id': None,   # Resolved by link_entities
+        'story_id': stable_uuids('cultural_stories', *product_key),
+        'name': names.to_numpy(),
+        'description': text_or('description', ('Handcrafted ' + names).to_numpy()),
+        'price': float_column(df, mapping['price']).to_numpy() if 'price' in mapping else 1500.0,  # Default price
+        'category_name': category_names,
+        'image_url': text_or('image_url', ''),
+        'region_name': region_names,
+        'artisan_name': text_or('artisan_name', ''),  # The maker named by the source, if any
+        'materials': text_or('materials', 'Traditional materials'),
+        'dimensions': text_or('dimensions', 'Various sizes'),
+        'weight': float_column(df, mapping['weight']).to_numpy() if 'weight' in mapping else 0.5,
+    }, index=pd.RangeIndex(n))
+    
+    # Set GI tag fields
+    products_df['is_gi_tagged'] = False
+    products_df['gi_tag_id'] = None
+    
+    # Convert image_url to array format
+    products_df['image_urls'] = [[url] if url else [] for url in products_df['image_url']]
+    
+    # Add timestamps
+    now = datetime.now().isoformat()
+    products_df['created_at'] = now
+    products_df['updated_at'] = now
+    
+    # Create categories dataframe (category IDs are derived from the name, matching the products)
+    categories = products_df[['category_id', 'category_name']].drop_duplicates('category_id')
+    categories_df = pd.DataFrame({
+        'category_id': categories['category_id'].to_numpy(),
+        'name': categories['category_name'].to_numpy(),
+        'description': 'Collection of ' + categories['category_name'].str.lower().to_numpy() + ' items',
+        'image_url': '',
+        'created_at': now,
+        'updated_at': now
+    })
+    
+    # Create cultural stories dataframe
+    category_lower = products_df['category_name'].str.lower()
+    stories_df = pd.DataFrame({
+        'story_id': products_df['story_id'],
+        'title': 'The Story of ' + products_df['name'],
+        'content': 'Discover the rich cultural heritage behind this traditional ' + category_lower + '.',
+        'history': 'This craft has been practiced for generations in ' + products_df['region_name'] + '.',
+        'cultural_significance': 'This ' + category_lower + ' represents an important cultural tradition.',
+        'image_urls': products_df['image_urls'],
+        'video_url': '',
+        'created_at': now,
+        'updated_at': now
+    })
+    
+    return products_df, categories_df, stories_df
+
 # Process products and images
-def process_products_and_images():
+def process_products_and_images(chunk_rows=ETL_CHUNK_ROWS):
     try:
-        file_path = '/home/ubuntu/upload/images adn products.xlsx'
+        file_path = os.path.join(UPLOAD_DIR, 'images adn products.xlsx')
+        if chunk_rows:
+            return stream_products_file(file_path, chunk_rows)
         print(f"Processing {file_path}...")
         
         # Read Excel file
-        df = pd.read_excel(file_path)
+        df = read_source_file(file_path)
         
         # Clean column names
         df = clean_column_names(df)
@@ -230,136 +662,99 @@ def process_products_and_images():
         print(f"Columns in products and images: {df.columns.tolist()}")
         
         # Process data
-        products = []
-        categories = set()
-        
-        for _, row in df.iterrows():
-            product = {
-                'product_id': generate_uuid(),
-                'artisan_id': generate_uuid(),  # This will be linked to artisans later
-                'category_id': generate_uuid(),  # This will be linked to categories later
-                'region_id': generate_uuid(),    # This will be linked to regions later
-                'story_id': generate_uuid()      # This will be linked to stories later
-            }
-            
-            # Map columns based on patterns
-            for col in df.columns:
-                if 'name' in col or 'product' in col:
-                    product['name'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'description' in col or 'details' in col:
-                    product['description'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'price' in col or 'cost' in col:
-                    try:
-                        product['price'] = float(row[col]) if not pd.isna(row[col]) else 0.0
-                    except:
-                        product['price'] = 0.0
-                elif 'category' in col or 'type' in col:
-                    product['category_name'] = str(row[col]) if not pd.isna(row[col]) else ''
-                    categories.add(product['category_name'])
-                elif 'image' in col or 'photo' in col or 'url' in col:
-                    product['image_url'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'region' in col or 'location' in col:
-                    product['region_name'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'material' in col:
-                    product['materials'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'dimension' in col or 'size' in col:
-                    product['dimensions'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'weight' in col:
-                    try:
-                        product['weight'] = float(row[col]) if not pd.isna(row[col]) else 0.0
-                    except:
-                        product['weight'] = 0.0
-            
-            # Add default values for missing fields
-            if 'name' not in product or not product['name']:
-                continue  # Skip records without names
-            
-            if 'description' not in product:
-                product['description'] = f"Handcrafted {product['name']}"
-            if 'price' not in product:
-                product['price'] = 1500.0  # Default price
-            if 'category_name' not in product:
-                product['category_name'] = 'Traditional Handicraft'
-                categories.add(product['category_name'])
-            if 'image_url' not in product:
-                product['image_url'] = ''
-            if 'region_name' not in product:
-                product['region_name'] = 'Traditional Region'
-            if 'materials' not in product:
-                product['materials'] = 'Traditional materials'
-            if 'dimensions' not in product:
-                product['dimensions'] = 'Various sizes'
-            if 'weight' not in product:
-                product['weight'] = 0.5
-            
-            # Set GI tag fields
-            product['is_gi_tagged'] = False
-            product['gi_tag_id'] = None
-            
-            # Convert image_url to array format
-            product['image_urls'] = [product['image_url']] if product['image_url'] else []
-            
-            # Add timestamps
-            product['created_at'] = datetime.now().isoformat()
-            product['updated_at'] = datetime.now().isoformat()
-            
-            products.append(product)
-        
-        # Convert to DataFrame
-        products_df = pd.DataFrame(products)
-        
-        # Create categories dataframe
-        categories_list = []
-        for category_name in categories:
-            category = {
-                'category_id': generate_uuid(),
-                'name': category_name,
-                'description': f"Collection of {category_name.lower()} items",
-                'image_url': '',
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            categories_list.append(category)
-        
-        categories_df = pd.DataFrame(categories_list)
-        
-        # Create cultural stories dataframe
-        stories = []
-        for product in products:
-            story = {
-                'story_id': product['story_id'],
-                'title': f"The Story of {product['name']}",
-                'content': f"Discover the rich cultural heritage behind this traditional {product['category_name'].lower()}.",
-                'history': f"This craft has been practiced for generations in {product['region_name']}.",
-                'cultural_significance': f"This {product['category_name'].lower()} represents an important cultural tradition.",
-                'image_urls': product['image_urls'],
-                'video_url': '',
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat()
-            }
-            stories.append(story)
-        
-        stories_df = pd.DataFrame(stories)
+        products_df, categories_df, stories_df = transform_products(df)
         
-        # Save processed data
-        products_path = save_processed_df(products_df, 'products.csv')
-        categories_path = save_processed_df(categories_df, 'categories.csv')
-        stories_path = save_processed_df(stories_df, 'cultural_stories.csv')
+        # Save processed data (products are finalized by link_entities)
+        products_path = save_processed_df(products_df, os.path.join('staging', 'products'))
+        categories_path = save_processed_df(categories_df, 'categories', key='category_id')
+        stories_path = save_processed_df(stories_df, 'cultural_stories', key='story_id')
         
         return products_path, categories_path, stories_path
-        
+    
     except Exception as e:
         print(f"Error processing products and images: {str(e)}")
         return None, None, None
 
+# Stream the products sheet chunk by chunk. Products and cultural stories are appended as they
+# are produced; only the (small) categories table is collected. Stories skip change detection,
+# which would need the whole previous table, so their delta files are removed to make loaders
+# fall back to the full snapshot.
+def stream_products_file(file_path, chunk_rows):
+    print(f"Streaming {file_path} in chunks of {chunk_rows} rows...")
+    counts = {}
+    categories = []
+    products_path = table_path(os.path.join('staging', 'products'))
+    stories_path = table_path('cultural_stories')
+    
+    with TableWriter(products_path, 'products') as products_writer, TableWriter(stories_path, 'cultural_stories') as stories_writer:
+        for chunk in iter_source_chunks(file_path, chunk_rows):
+            products_df, categories_df, stories_df = transform_products(chunk, counts)
+            products_writer.write(products_df)
+            stories_writer.write(stories_df)
+            categories.append(categories_df)
+    print(f"Processed {products_writer.rows} products; saved processed data to {products_path} and {stories_path}")
+    
+    for change in ('inserted', 'updated', 'deleted'):
+        stale_delta = os.path.join(DELTA_DIR, f"cultural_stories.{change}.csv")
+        if os.path.exists(stale_delta):
+            os.remove(stale_delta)
+    
+    categories_df = pd.concat(categories, ignore_index=True).drop_duplicates('category_id', ignore_index=True) if categories else pd.DataFrame()
+    categories_path = save_processed_df(categories_df, 'categories', key='category_id')
+    return products_path, categories_path, stories_path
+
+# Transform the tourist statistics sheet (or one chunk of it) into TOURIST_STATS
+def transform_tourist_stats(df, counts=None):
+    mapping = resolve_column_mapping(df.columns, TOURIST_STATS_COLUMN_RULES)
+    
+    # Skip records without region names
+    if 'region_name' not in mapping:
+        df = df.iloc[0:0]
+    region_names = text_column(df, mapping['region_name']) if 'region_name' in mapping else pd.Series([], dtype=object)
+    keep = (region_names != '').to_numpy()
+    df = df[keep]
+    n = len(df)
+    current_year = datetime.now().year
+    region_names = region_names[keep].to_numpy()
+    years = int_column(df, mapping['year'], current_year).to_numpy() if 'year' in mapping else np.full(n, current_year)
+    
+    stats_df = pd.DataFrame({
+        'stat_id': stable_uuids('tourist_stats', region_names, years, occurrence(region_names, years, counts=counts)),
+        'region_id': None,  # Resolved by link_entities
+        'region_name': region_names,
+        'year': years,
+        'domestic_count': int_column(df, mapping['domestic_count']).to_numpy() if 'domestic_count' in mapping else 100000,
+        'foreign_count': int_column(df, mapping['foreign_count']).to_numpy() if 'foreign_count' in mapping else 25000,
+        'growth_rate': float_column(df, mapping['growth_rate']).to_numpy() if 'growth_rate' in mapping else 5.0,
+        'peak_season': text_column(df, mapping['peak_season']).to_numpy() if 'peak_season' in mapping else 'October-March',
+    }, index=pd.RangeIndex(n))
+    
+    # Add timestamps
+    now = datetime.now().isoformat()
+    stats_df['created_at'] = now
+    stats_df['updated_at'] = now
+    
+    return stats_df
+
 # Process tourist statistics
-def process_tourist_stats():
+def process_tourist_stats(chunk_rows=ETL_CHUNK_ROWS):
     try:
-        file_path = '/home/ubuntu/upload/stats.csv'
+        file_path = os.path.join(UPLOAD_DIR, 'stats.csv')
+        if chunk_rows:
+            # Streaming mode: transform and append one chunk at a time
+            print(f"Streaming {file_path} in chunks of {chunk_rows} rows...")
+            output_path = table_path(os.path.join('staging', 'tourist_stats'))
+            counts = {}
+            with TableWriter(output_path, 'tourist_stats') as writer:
+                for chunk in iter_source_chunks(file_path, chunk_rows):
+                    writer.write(transform_tourist_stats(chunk, counts))
+            print(f"Saved processed data to {output_path}")
+            return output_path
+        
         print(f"Processing {file_path}...")
         
         # Read CSV file
-        df = pd.read_csv(file_path)
+        df = read_source_file(file_path)
         
         # Clean column names
         df = clean_column_names(df)
@@ -368,77 +763,47 @@ def process_tourist_stats():
         print(f"Columns in tourist stats: {df.columns.tolist()}")
         
         # Process data
-        stats = []
-        
-        for _, row in df.iterrows():
-            stat = {
-                'stat_id': generate_uuid(),
-                'region_id': generate_uuid()  # This will be linked to regions later
-            }
-            
-            # Map columns based on patterns
-            for col in df.columns:
-                if 'region' in col or 'location' in col or 'place' in col:
-                    stat['region_name'] = str(row[col]) if not pd.isna(row[col]) else ''
-                elif 'year' in col:
-                    try:
-                        stat['year'] = int(row[col]) if not pd.isna(row[col]) else datetime.now().year
-                    except:
-                        stat['year'] = datetime.now().year
-                elif 'domestic' in col:
-                    try:
-                        stat['domestic_count'] = int(row[col]) if not pd.isna(row[col]) else 0
-                    except:
-                        stat['domestic_count'] = 0
-                elif 'foreign' in col or 'international' in col:
-                    try:
-                        stat['foreign_count'] = int(row[col]) if not pd.isna(row[col]) else 0
-                    except:
-                        stat['foreign_count'] = 0
-                elif 'growth' in col:
-                    try:
-                        stat['growth_rate'] = float(row[col]) if not pd.isna(row[col]) else 0.0
-                    except:
-                        stat['growth_rate'] = 0.0
-                elif 'peak' in col or 'season' in col:
-                    stat['peak_season'] = str(row[col]) if not pd.isna(row[col]) else ''
-            
-            # Add default values for missing fields
-            if 'region_name' not in stat or not stat['region_name']:
-                continue  # Skip records without region names
-            
-            if 'year' not in stat:
-                stat['year'] = datetime.now().year
-            if 'domestic_count' not in stat:
-                stat['domestic_count'] = 100000
-            if 'foreign_count' not in stat:
-                stat['foreign_count'] = 25000
-            if 'growth_rate' not in stat:
-                stat['growth_rate'] = 5.0
-            if 'peak_season' not in stat:
-                stat['peak_season'] = 'October-March'
-            
-            # Add timestamps
-            stat['created_at'] = datetime.now().isoformat()
-            stat['updated_at'] = datetime.now().isoformat()
-            
-            stats.append(stat)
-        
-        # Convert to DataFrame
-        stats_df = pd.DataFrame(stats)
-        
-        # Save processed data
-        return save_processed_df(stats_df, 'tourist_stats.csv')
+        stats_df = transform_tourist_stats(df)
         
+        # Save processed data (finalized by link_entities)
+        return save_processed_df(stats_df, os.path.join('staging', 'tourist_stats'))
+    
     except Exception as e:
         print(f"Error processing tourist stats: {str(e)}")
         return None
 
+# Resolve product and tourist statistic foreign keys against the processed reference tables
+def link_entities():
+    try:
+        regions_df = load_table('regions')
+        products_df, product_reports = link_products(
+            load_table(os.path.join('staging', 'products')), regions_df, load_table('gi_tags'),
+            load_table('categories'), load_table('cultural_stories', ['story_id']), load_table('artisans'))
+        stats_df, stats_reports = link_tourist_stats(load_table(os.path.join('staging', 'tourist_stats')), regions_df)
+        
+        # Report match rates
+        reports = product_reports + stats_reports
+        for report in reports:
+            print(f"Linked {report['link']}: {report['matched']}/{report['rows']} ({report['match_rate']:.1%})")
+        report_path = os.path.join(PROCESSED_DATA_DIR, 'linking_report.json')
+        with open(report_path, 'w') as f:
+            json.dump(reports, f, indent=2)
+        
+        # Save processed data
+        products_path = save_processed_df(products_df, 'products', key='product_id')
+        stats_path = save_processed_df(stats_df, 'tourist_stats', key='stat_id')
+        
+        return products_path, stats_path, report_path
+    
+    except Exception as e:
+        print(f"Error linking entities: {str(e)}")
+        return None, None, None
+
 # Generate sample partner websites
 def generate_partner_websites():
     partners = [
         {
-            'partner_id': generate_uuid(),
+            'partner_id': stable_uuid('partner_sites', 'Rajasthan Crafts'),
             'name': 'Rajasthan Crafts',
             'website_url': 'https://www.rajasthancrafts.com',
             'rating': 4.7,
@@ -455,7 +820,7 @@ def generate_partner_websites():
             'updated_at': datetime.now().isoformat()
         },
         {
-            'partner_id': generate_uuid(),
+            'partner_id': stable_uuid('partner_sites', 'Jaipur Pottery House'),
             'name': 'Jaipur Pottery House',
             'website_url': 'https://www.jaipurpotteryhouse.com',
             'rating': 4.5,
@@ -472,7 +837,7 @@ def generate_partner_websites():
             'updated_at': datetime.now().isoformat()
         },
         {
-            'partner_id': generate_uuid(),
+            'partner_id': stable_uuid('partner_sites', 'Artisan Collective'),
             'name': 'Artisan Collective',
             'website_url': 'https://www.artisancollective.in',
             'rating': 4.9,
@@ -490,7 +855,7 @@ def generate_partner_websites():
             'updated_at': datetime.now().isoformat()
         },
         {
-            'partner_id': generate_uuid(),
+            'partner_id': stable_uuid('partner_sites', 'Varanasi Silk Emporium'),
             'name': 'Varanasi Silk Emporium',
             'website_url': 'https://www.varanasisilk.com',
             'rating': 4.8,
@@ -507,7 +872,7 @@ def generate_partner_websites():
             'updated_at': datetime.now().isoformat()
         },
         {
-            'partner_id': generate_uuid(),
+            'partner_id': stable_uuid('partner_sites', 'Karnataka Handicrafts'),
             'name': 'Karnataka Handicrafts',
             'website_url': 'https://www.karnatakahandicrafts.com',
             'rating': 4.6,
@@ -529,50 +894,56 @@ def generate_partner_websites():
     partners_df = pd.DataFrame(partners)
     
     # Save processed data
-    return save_processed_df(partners_df, 'partner_sites.csv')
+    return save_processed_df(partners_df, 'partner_sites', key='partner_id')
+
+# Build product-partner relationships: each product is listed by min(3, #partners) distinct
+# partners, with all assignments and price/availability draws made as whole arrays
+def build_product_partner_relationships(products_df, partners_df, rng):
+    num_products = len(products_df)
+    num_partners = min(len(partners_df), 3)
+    
+    # Sample partners without replacement per product: rank a row of random keys per product
+    if num_partners:
+        keys = rng.random((num_products, len(partners_df)))
+        chosen = np.argsort(keys, axis=1)[:, :num_partners].ravel()
+    else:
+        chosen = np.empty(0, dtype=np.int64)
+    product_index = np.repeat(np.arange(num_products), num_partners)
+    n = len(product_index)
+    
+    product_ids = products_df['product_id'].to_numpy()[product_index]
+    partner_ids = partners_df['partner_id'].to_numpy()[chosen]
+    
+    # Calculate a slightly different price for each partner (0.9 to 1.1 variation)
+    base_prices = products_df['price'].to_numpy(dtype=np.float64)[product_index]
+    partner_prices = np.round(base_prices * (0.9 + 0.2 * rng.random(n)), 2)
+    
+    now = datetime.now().isoformat()
+    return pd.DataFrame({
+        'id': derived_uuids('product_partner', product_ids, partner_ids),
+        'product_id': product_ids,
+        'partner_id': partner_ids,
+        'price': partner_prices,
+        'shipping_fee': 100 + 50 * rng.random(n),  # 100-150 shipping fee
+        'availability': rng.choice(np.array(['In Stock', 'Limited Stock', 'Out of Stock'], dtype=object), n, p=[0.7, 0.2, 0.1]),
+        'estimated_delivery': rng.choice(np.array(['3-5 days', '5-7 days', '7-10 days'], dtype=object), n),
+        'created_at': now,
+        'updated_at': now
+    })
 
 # Generate product-partner relationships
-def generate_product_partner_relationships(products_path):
+def generate_product_partner_relationships():
     try:
         # Read processed products
-        products_df = pd.read_csv(products_path)
+        products_df = load_table('products', ['product_id', 'price'])
         
         # Read processed partners
-        partners_df = pd.read_csv('/home/ubuntu/handicraft_marketplace/database/processed_data/partner_sites.csv')
-        
-        relationships = []
-        
-        # For each product, create 1-3 partner relationships
-        for _, product in products_df.iterrows():
-            # Randomly select 1-3 partners
-            num_partners = min(len(partners_df), 3)
-            selected_partners = partners_df.sample(n=num_partners)
-            
-            for _, partner in selected_partners.iterrows():
-                # Calculate a slightly different price for each partner
-                base_price = product['price']
-                price_variation = (0.9 + (0.2 * np.random.random()))  # 0.9 to 1.1 variation
-                partner_price = round(base_price * price_variation, 2)
-                
-                relationship = {
-                    'id': generate_uuid(),
-                    'product_id': product['product_id'],
-                    'partner_id': partner['partner_id'],
-                    'price': partner_price,
-                    'shipping_fee': 100 + (50 * np.random.random()),  # 100-150 shipping fee
-                    'availability': np.random.choice(['In Stock', 'Limited Stock', 'Out of Stock'], p=[0.7, 0.2, 0.1]),
-                    'estimated_delivery': np.random.choice(['3-5 days', '5-7 days', '7-10 days']),
-                    'created_at': datetime.now().isoformat(),
-                    'updated_at': datetime.now().isoformat()
-                }
-                
-                relationships.append(relationship)
-        
-        # Convert to DataFrame
-        relationships_df = pd.DataFrame(relationships)
+        partners_df = load_table('partner_sites', ['partner_id'])
+        
+        relationships_df = build_product_partner_relationships(products_df, partners_df, etl_rng('product_partner'))
         
         # Save processed data
-        return save_processed_df(relationships_df, 'product_partner.csv')
+        return save_processed_df(relationships_df, 'product_partner', key='id')
         
     except Exception as e:
         print(f"Error generating product-partner relationships: {str(e)}")
@@ -582,7 +953,7 @@ def generate_product_partner_relationships(products_path):
 def generate_sample_customers():
     customers = [
         {
-            'customer_id': generate_uuid(),
+            'customer_id': stable_uuid('customers', 'priya.sharma@example.com'),
             'name': 'Priya Sharma',
             'email': 'priya.sharma@example.com',
             'password_hash': 'hashed_password_placeholder',
@@ -592,7 +963,7 @@ def generate_sample_customers():
             'updated_at': datetime.now().isoformat()
         },
         {
-            'customer_id': generate_uuid(),
+            'customer_id': stable_uuid('customers', 'rahul.patel@example.com'),
             'name': 'Rahul Patel',
             'email': 'rahul.patel@example.com',
             'password_hash': 'hashed_password_placeholder',
@@ -602,7 +973,7 @@ def generate_sample_customers():
             'updated_at': datetime.now().isoformat()
         },
         {
-            'customer_id': generate_uuid(),
+            'customer_id': stable_uuid('customers', 'ananya.singh@example.com'),
             'name': 'Ananya Singh',
             'email': 'ananya.singh@example.com',
             'password_hash': 'hashed_password_placeholder',
@@ -612,7 +983,7 @@ def generate_sample_customers():
             'updated_at': datetime.now().isoformat()
         },
         {
-            'customer_id': generate_uuid(),
+            'customer_id': stable_uuid('customers', 'vikram.mehta@example.com'),
             'name': 'Vikram Mehta',
             'email': 'vikram.mehta@example.com',
             'password_hash': 'hashed_password_placeholder',
@@ -622,7 +993,7 @@ def generate_sample_customers():
             'updated_at': datetime.now().isoformat()
         },
         {
-            'customer_id': generate_uuid(),
+            'customer_id': stable_uuid('customers', 'neha.gupta@example.com'),
             'name': 'Neha Gupta',
             'email': 'neha.gupta@example.com',
             'password_hash': 'hashed_password_placeholder',
@@ -637,92 +1008,84 @@ def generate_sample_customers():
     customers_df = pd.DataFrame(customers)
     
     # Save processed data
-    return save_processed_df(customers_df, 'customers.csv')
+    return save_processed_df(customers_df, 'customers', key='customer_id')
+
+# Build sample orders and their line items from whole-array draws
+def build_sample_orders(product_partner_df, customers_df, rng, num_orders=10):
+    # Select a random customer and status per order
+    customer_index = rng.integers(0, len(customers_df), num_orders)
+    statuses = rng.choice(np.array(['Processing', 'Shipped', 'Delivered'], dtype=object), num_orders, p=[0.3, 0.3, 0.4])
+    payment_methods = rng.choice(np.array(['Credit Card', 'UPI', 'Net Banking', 'Cash on Delivery'], dtype=object), num_orders)
+    tracking_numbers = rng.integers(100000, 999999, num_orders)
+    
+    # Orders are spread over the 90 days before the reference date
+    order_dates = REFERENCE_DATE - pd.to_timedelta(rng.integers(0, 90 * 86400, num_orders), unit='s')
+    order_dates = np.asarray(order_dates.strftime('%Y-%m-%dT%H:%M:%S'), dtype=object)
+    
+    # Select 1-5 distinct product-partner combinations per order
+    num_items = np.minimum(rng.integers(1, 6, num_orders), len(product_partner_df))
+    order_index = np.repeat(np.arange(num_orders), num_items)
+    line_number = np.arange(len(order_index)) - np.repeat(np.cumsum(num_items) - num_items, num_items)
+    selected = rng.integers(0, len(product_partner_df), len(order_index))
+    
+    # Redraw lines that repeat a combination already in the same order
+    while True:
+        duplicate = pd.DataFrame({'order': order_index, 'item': selected}).duplicated().to_numpy()
+        if not duplicate.any():
+            break
+        selected[duplicate] = rng.integers(0, len(product_partner_df), int(duplicate.sum()))
+    
+    quantities = rng.integers(1, 4, len(order_index))
+    prices = product_partner_df['price'].to_numpy(dtype=np.float64)[selected]
+    subtotals = prices * quantities
+    
+    order_ids = stable_uuids('orders', np.arange(num_orders))
+    order_items_df = pd.DataFrame({
+        'item_id': derived_uuids('order_items', order_ids[order_index], line_number),
+        'order_id': order_ids[order_index],
+        'product_id': product_partner_df['product_id'].to_numpy()[selected],
+        'partner_id': product_partner_df['partner_id'].to_numpy()[selected],
+        'quantity': quantities,
+        'price': prices,
+        'subtotal': subtotals,
+        'created_at': order_dates[order_index]
+    })
+    
+    # Order totals include a flat shipping cost; platform fee assumes a 15% average
+    shipping_cost = 150
+    item_totals = np.bincount(order_index, weights=subtotals, minlength=num_orders)
+    
+    orders_df = pd.DataFrame({
+        'order_id': order_ids,
+        'customer_id': customers_df['customer_id'].to_numpy()[customer_index],
+        'order_date': order_dates,
+        'total_amount': item_totals + shipping_cost,
+        'status': statuses,
+        'shipping_address': customers_df['address'].to_numpy()[customer_index],
+        'payment_method': payment_methods,
+        'tracking_number': np.where(statuses != 'Processing', np.char.add('TRK', tracking_numbers.astype(str)).astype(object), None),
+        'platform_fee': item_totals * 0.15,
+        'created_at': order_dates,
+        'updated_at': order_dates
+    })
+    
+    return orders_df, order_items_df
 
 # Generate sample orders and order items
-def generate_sample_orders(products_partner_path, customers_path):
+def generate_sample_orders():
     try:
         # Read processed product-partner relationships
-        product_partner_df = pd.read_csv(products_partner_path)
+        product_partner_df = load_table('product_partner', ['product_id', 'partner_id', 'price'])
         
         # Read processed customers
-        customers_df = pd.read_csv(customers_path)
-        
-        orders = []
-        order_items = []
+        customers_df = load_table('customers', ['customer_id', 'address'])
         
         # Generate 10 sample orders
-        for i in range(10):
-            # Select a random customer
-            customer = customers_df.sample(n=1).iloc[0]
-            
-            # Generate order details
-            order_id = generate_uuid()
-            order_date = datetime.now().isoformat()
-            status = np.random.choice(['Processing', 'Shipped', 'Delivered'], p=[0.3, 0.3, 0.4])
-            
-            # Select 1-5 random product-partner combinations
-            num_items = np.random.randint(1, 6)
-            selected_items = product_partner_df.sample(n=num_items)
-            
-            # Calculate order totals
-            total_amount = 0
-            platform_fee = 0
-            
-            for _, item in selected_items.iterrows():
-                # Generate order item
-                item_id = generate_uuid()
-                quantity = np.random.randint(1, 4)
-                price = item['price']
-                subtotal = price * quantity
-                
-                # Add to total
-                total_amount += subtotal
-                
-                # Calculate platform fee (assuming 15% average)
-                item_platform_fee = subtotal * 0.15
-                platform_fee += item_platform_fee
-                
-                order_item = {
-                    'item_id': item_id,
-                    'order_id': order_id,
-                    'product_id': item['product_id'],
-                    'partner_id': item['partner_id'],
-                    'quantity': quantity,
-                    'price': price,
-                    'subtotal': subtotal,
-                    'created_at': order_date
-                }
-                
-                order_items.append(order_item)
-            
-            # Add shipping cost
-            shipping_cost = 150
-            total_amount += shipping_cost
-            
-            order = {
-                'order_id': order_id,
-                'customer_id': customer['customer_id'],
-                'order_date': order_date,
-                'total_amount': total_amount,
-                'status': status,
-                'shipping_address': customer['address'],
-                'payment_method': np.random.choice(['Credit Card', 'UPI', 'Net Banking', 'Cash on Delivery']),
-                'tracking_number': f'TRK{np.random.randint(100000, 999999)}' if status != 'Processing' else None,
-                'platform_fee': platform_fee,
-                'created_at': order_date,
-                'updated_at': order_date
-            }
-            
-            orders.append(order)
-        
-        # Convert to DataFrames
-        orders_df = pd.DataFrame(orders)
-        order_items_df = pd.DataFrame(order_items)
+        orders_df, order_items_df = build_sample_orders(product_partner_df, customers_df, etl_rng('orders'))
         
         # Save processed data
-        orders_path = save_processed_df(orders_df, 'orders.csv')
-        order_items_path = save_processed_df(order_items_df, 'order_items.csv')
+        orders_path = save_processed_df(orders_df, 'orders', key='order_id')
+        order_items_path = save_processed_df(order_items_df, 'order_items', key='item_id')
         
         return orders_path, order_items_path
         
@@ -884,44 +1247,15 @@ UNION ALL
 SELECT 'TOURIST_STATS', COUNT(*) FROM TOURIST_STATS;
 """
     
-    output_path = '/home/ubuntu/handicraft_marketplace/database/snowflake_import.sql'
+    output_path = SNOWFLAKE_IMPORT_SCRIPT
     with open(output_path, 'w') as f:
         f.write(script)
     
     print(f"Generated Snowflake import script: {output_path}")
     return output_path
 
-# Main execution
+# Main execution: the processing steps are run as stages by etl_runner.py
 if __name__ == "__main__":
-    print("Starting dataset analysis and processing...")
-    
-    # Process artisan data
-    artisans_path = process_artisan_data()
-    
-    # Process GI tagged products
-    gi_tags_path, regions_path = process_gi_tagged_products()
-    
-    # Process products and images
-    products_path, categories_path, stories_path = process_products_and_images()
-    
-    # Process tourist statistics
-    tourist_stats_path = process_tourist_stats()
-    
-    # Generate partner websites
-    partners_path = generate_partner_websites()
-    
-    # Generate product-partner relationships
-    product_partner_path = generate_product_partner_relationships(products_path)
-    
-    # Generate sample customers
-    customers_path = generate_sample_customers()
-    
-    # Generate sample orders
-    orders_path, order_items_path = generate_sample_orders(product_partner_path, customers_path)
-    
-    # Generate Snowflake import script
-    snowflake_import_script = generate_snowflake_import_script()
-    
-    print("Dataset processing complete!")
-    print("All processed data files are available in: /home/ubuntu/handicraft_marketplace/database/processed_data/")
-    print(f"Snowflake import script generated: {snowflake_import_script}")
+    import sys
+    from etl_runner import main
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Artisan Deduplication Benchmark for Handicraft Marketplace Platform
+
+Runs deduplicate_artisans on synthetic artisan tables of increasing size in
+which a share of artisans is listed again under a spelling variant of their
+name. Reports seconds and rows/sec per size (near-constant rows/sec means
+near-linear scaling) and pairwise precision and recall against the known
+duplicates.
+
+Usage (from the database directory):
+    python benchmarks/bench_dedup.py --sizes 250000,1000000,3000000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyze_datasets import generate_uuids
+from dedup_artisans import cluster_artisans, deduplicate_artisans
+
+STATES = np.array(['UTTARPRADESH', 'Andhra Pradesh', 'Meghalaya', 'MAHARASTRA', 'Karnataka'], dtype=object)
+FIRST_NAMES = ['Ramesh', 'Sunita', 'Iqbal', 'Lakshmi', 'Gopal', 'Meena', 'Phrangsngi', 'Bandana', 'Shankar',
+               'Kavita', 'Mohammed', 'Savitri', 'Venkatesh', 'Pooja', 'Bhupinder', 'Sheela', 'Dinesh', 'Radha',
+               'Arjun', 'Fatima', 'Krishna', 'Geeta', 'Suresh', 'Anita', 'Raju', 'Parvati', 'Imran', 'Usha']
+LAST_NAMES = ['Prajapati', 'Ansari', 'Marak', 'Reddy', 'Patil', 'Vishwakarma', 'Lyngdoh', 'Sheikh', 'Kumhar',
+              'Chaudhary', 'Naidu', 'Gowda', 'Shinde', 'Sangma', 'Qureshi', 'Bhat', 'Kharkongor', 'Yadav']
+CRAFTS = np.array(['Pottery', 'Zari Zardozi', 'Woodcraft', 'Bamboo', 'Kalamkari', 'Bidriware'], dtype=object)
+
+# Spelling variants seen in the workbooks: transliteration, doubled letters, case and dropped letters
+VARIANTS = [
+    lambda name: name.replace('sh', 's').replace('Sh', 'S'),
+    lambda name: name.replace('ee', 'i').replace('a', 'aa', 1),
+    lambda name: name.upper(),
+    lambda name: name.replace('v', 'w').replace('V', 'W'),
+    lambda name: name[:-1] if len(name) > 6 else name + 'h',
+    lambda name: f" {name}. ",
+]
+
+
+def synthetic_artisans(rows, duplicate_share=0.1, seed=42):
+    """Artisan rows plus the entity each row belongs to; duplicate_share of the rows are
+    re-listings of another artisan under a name variant, sometimes without a phone number"""
+    rng = np.random.default_rng(seed)
+    entities = int(rows * (1 - duplicate_share))
+
+    # Middle names make most artisans distinct; common names still collide within a state
+    middle = np.array([''] + [f"{chr(65 + i)}." for i in range(26)] + FIRST_NAMES, dtype=object)
+    names = pd.Series(rng.choice(FIRST_NAMES, entities)) + ' ' + pd.Series(rng.choice(middle, entities)) + ' ' \
+        + pd.Series(rng.choice(LAST_NAMES, entities))
+    names = names.str.split().str.join(' ')
+    base = pd.DataFrame({
+        'entity': np.arange(entities),
+        'state': rng.choice(STATES, entities),
+        'name': names.to_numpy(dtype=object),
+        # Villages grow with the table, as a bigger registry covers more of them
+        'location': pd.Series(rng.integers(0, max(5000, rows // 20), entities)).map('Village {}'.format).to_numpy(dtype=object),
+        'craft_type': rng.choice(CRAFTS, entities),
+        'contact_info': rng.integers(6000000000, 9999999999, entities).astype(str).astype(object),
+        'years_active': rng.integers(0, 50, entities).astype(str).astype(object),
+    })
+
+    duplicates = base.iloc[rng.integers(0, entities, rows - entities)].copy()
+    variant = rng.integers(0, len(VARIANTS), len(duplicates))
+    duplicates['name'] = [VARIANTS[v](name) for v, name in zip(variant, duplicates['name'])]
+    duplicates.loc[rng.random(len(duplicates)) < 0.3, 'contact_info'] = ''
+
+    artisans = pd.concat([base, duplicates], ignore_index=True)
+    artisans = artisans.iloc[rng.permutation(len(artisans))].reset_index(drop=True)
+    artisans.insert(0, 'artisan_id', generate_uuids(len(artisans)))
+    return artisans
+
+
+def pair_counts(*labels):
+    """Number of row pairs sharing every given label"""
+    sizes = pd.DataFrame({i: label for i, label in enumerate(labels)}).value_counts().to_numpy()
+    return int((sizes * (sizes - 1) // 2).sum())
+
+
+def time_dedup(rows):
+    artisans = synthetic_artisans(rows)
+    entities = artisans.pop('entity').to_numpy()
+
+    start = time.perf_counter()
+    canonical, merges = deduplicate_artisans(artisans)
+    elapsed = time.perf_counter() - start
+
+    # Pairwise quality of the clustering against the known duplicates
+    labels = cluster_artisans(artisans)
+    predicted, actual, both = pair_counts(labels), pair_counts(entities), pair_counts(labels, entities)
+    return {
+        'rows': rows,
+        'canonical_rows': len(canonical),
+        'merged': len(merges),
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else None,
+        'precision': both / predicted if predicted else 1.0,
+        'recall': both / actual if actual else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark artisan deduplication')
+    parser.add_argument('--sizes', default='250000,1000000,3000000', help='comma separated row counts')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = []
+    for rows in [int(size) for size in args.sizes.split(',')]:
+        result = time_dedup(rows)
+        results.append(result)
+        print(f"{rows:>10} rows: {result['seconds']:7.2f}s  {result['rows_per_sec']:>10,.0f} rows/s  "
+              f"precision {result['precision']:.3f}  recall {result['recall']:.3f}", file=sys.stderr)
+
+    output = json.dumps({'runs': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Saved benchmark results to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+ETL Benchmark for Handicraft Marketplace Platform
+
+Measures artisan transform throughput (rows/sec) on a synthetic state
+workbook. By default the workbook is built in memory so only the transform
+is timed; pass --write-xlsx to also time pd.read_excel on a real file. A
+sample is also run through the original row-by-row implementation for
+comparison. The product-partner and sample-order generation stages are timed
+on a synthetic catalogue of --catalogue-products products, and the generated
+relationship table is used to compare stage-to-stage I/O through CSV with the
+typed intermediate format (time and bytes on disk).
+
+Usage (from the database directory):
+    python benchmarks/bench_etl.py --rows 1000000 --legacy-rows 20000 --catalogue-products 1000000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyze_datasets import (
+    clean_column_names, transform_artisans, generate_uuid, generate_uuids, etl_rng,
+    build_product_partner_relationships, build_sample_orders
+)
+from table_store import INTERMEDIATE_EXTENSION, conform, write_table, read_table
+
+
+def synthetic_state_workbook(rows, seed=42):
+    """Build a state artisan sheet with the messy column names and nulls seen in the uploads"""
+    rng = np.random.default_rng(seed)
+    first = np.array(['Ramesh', 'Sunita', 'Iqbal', 'Lakshmi', 'Gopal', 'Meena', 'Phrangsngi', 'Bandana'])
+    last = np.array(['Prajapati', 'Ansari', 'Marak', 'Reddy', 'Patil', 'Vishwakarma', 'Lyngdoh'])
+    names = np.char.add(np.char.add(rng.choice(first, rows), ' '), rng.choice(last, rows)).astype(object)
+    names[rng.random(rows) < 0.02] = None
+
+    villages = rng.choice(np.array(['Khurja', 'Nizamabad', 'Sualkuchi', 'Channapatna', 'Kondapalli'], dtype=object), rows)
+    villages[rng.random(rows) < 0.1] = None
+
+    experience = rng.integers(0, 50, rows).astype(object)
+    experience[rng.random(rows) < 0.05] = 'N/A'
+
+    return pd.DataFrame({
+        'S. No': np.arange(1, rows + 1),
+        'Artisan Name': names,
+        'Village / Address': villages,
+        'Craft': rng.choice(np.array(['Pottery', 'Zari Zardozi', 'Woodcraft', 'Bamboo'], dtype=object), rows),
+        'Mobile No': rng.integers(6000000000, 9999999999, rows),
+        'Experience (Years)': experience,
+    })
+
+
+def legacy_transform_artisans(df, state_name):
+    """The original iterrows implementation, kept for comparison"""
+    from datetime import datetime
+    artisan_data = []
+    for _, row in df.iterrows():
+        artisan = {'artisan_id': generate_uuid(), 'state': state_name}
+        for col in df.columns:
+            if 'name' in col:
+                artisan['name'] = str(row[col]) if not pd.isna(row[col]) else ''
+            elif 'location' in col or 'address' in col or 'village' in col:
+                artisan['location'] = str(row[col]) if not pd.isna(row[col]) else ''
+            elif 'craft' in col or 'art' in col or 'skill' in col:
+                artisan['craft_type'] = str(row[col]) if not pd.isna(row[col]) else ''
+            elif 'contact' in col or 'phone' in col or 'mobile' in col:
+                artisan['contact_info'] = str(row[col]) if not pd.isna(row[col]) else ''
+            elif 'experience' in col or 'year' in col:
+                try:
+                    artisan['years_active'] = int(row[col]) if not pd.isna(row[col]) else 0
+                except:
+                    artisan['years_active'] = 0
+        if 'name' not in artisan or not artisan['name']:
+            continue
+        artisan.setdefault('location', state_name)
+        artisan.setdefault('craft_type', 'Traditional Craft')
+        artisan.setdefault('contact_info', '')
+        artisan.setdefault('years_active', 0)
+        artisan['created_at'] = datetime.now().isoformat()
+        artisan['updated_at'] = datetime.now().isoformat()
+        artisan['bio'] = f"Skilled {artisan['craft_type']} artisan from {artisan['location']}, {state_name}."
+        artisan['image_url'] = ''
+        artisan_data.append(artisan)
+    return pd.DataFrame(artisan_data)
+
+
+def time_transform(transform, df):
+    start = time.perf_counter()
+    result = transform(clean_column_names(df.copy()), 'UTTARPRADESH')
+    elapsed = time.perf_counter() - start
+    return {
+        'input_rows': len(df),
+        'output_rows': len(result),
+        'seconds': elapsed,
+        'rows_per_sec': len(df) / elapsed if elapsed else None
+    }
+
+
+def time_generation(num_products, num_orders):
+    """Time relationship and order generation on a synthetic catalogue, and check reproducibility"""
+    rng = np.random.default_rng(7)
+    products_df = pd.DataFrame({'product_id': generate_uuids(num_products),
+                                'price': np.round(rng.uniform(200, 20000, num_products), 2)})
+    partners_df = pd.DataFrame({'partner_id': generate_uuids(5)})
+    customers_df = pd.DataFrame({'customer_id': generate_uuids(5), 'address': [f'Address {i}' for i in range(5)]})
+
+    start = time.perf_counter()
+    relationships_df = build_product_partner_relationships(products_df, partners_df, etl_rng('product_partner'))
+    relationship_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    orders_df, order_items_df = build_sample_orders(relationships_df, customers_df, etl_rng('orders'), num_orders)
+    order_seconds = time.perf_counter() - start
+
+    repeat_df = build_product_partner_relationships(products_df, partners_df, etl_rng('product_partner'))
+    content = [col for col in relationships_df.columns if col not in ('created_at', 'updated_at')]
+    return {
+        'intermediate_io': time_intermediate_io(relationships_df, 'product_partner'),
+        'products': num_products,
+        'relationships': len(relationships_df),
+        'relationship_seconds': relationship_seconds,
+        'orders': len(orders_df),
+        'order_items': len(order_items_df),
+        'order_seconds': order_seconds,
+        'reproducible': bool(relationships_df[content].equals(repeat_df[content]))
+    }
+
+
+def time_intermediate_io(df, table):
+    """Write and read back a table as CSV (as the stages used to) and as a typed intermediate"""
+    df = conform(df, table)
+    results = {'rows': len(df)}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, f"{table}.csv")
+        start = time.perf_counter()
+        df.to_csv(csv_path, index=False)
+        write_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        pd.read_csv(csv_path)
+        results['csv'] = {'write_seconds': write_seconds, 'read_seconds': time.perf_counter() - start,
+                          'bytes': os.path.getsize(csv_path)}
+
+        path = os.path.join(tmp_dir, f"{table}{INTERMEDIATE_EXTENSION}")
+        start = time.perf_counter()
+        write_table(df, path, table)
+        write_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        read_table(path, table)
+        results['intermediate'] = {'format': INTERMEDIATE_EXTENSION.lstrip('.'), 'write_seconds': write_seconds,
+                                   'read_seconds': time.perf_counter() - start, 'bytes': os.path.getsize(path)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the artisan ETL transform')
+    parser.add_argument('--rows', type=int, default=1000000, help='rows in the synthetic workbook')
+    parser.add_argument('--legacy-rows', type=int, default=20000, help='rows run through the iterrows version (0 to skip)')
+    parser.add_argument('--write-xlsx', action='store_true', help='round-trip the workbook through an .xlsx file')
+    parser.add_argument('--catalogue-products', type=int, default=1000000,
+                        help='products in the catalogue for the relationship/order stages (0 to skip)')
+    parser.add_argument('--orders', type=int, default=100000, help='orders generated from the catalogue')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    df = synthetic_state_workbook(args.rows)
+    results = {'rows': args.rows}
+
+    if args.write_xlsx:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'UTTARPRADESH.xlsx')
+            df.to_excel(path, index=False)
+            start = time.perf_counter()
+            df = pd.read_excel(path)
+            results['read_excel_seconds'] = time.perf_counter() - start
+
+    results['vectorized'] = time_transform(transform_artisans, df)
+
+    if args.legacy_rows:
+        sample = df.head(args.legacy_rows)
+        results['legacy'] = time_transform(legacy_transform_artisans, sample)
+        results['speedup'] = results['vectorized']['rows_per_sec'] / results['legacy']['rows_per_sec']
+
+    if args.catalogue_products:
+        results['generation'] = time_generation(args.catalogue_products, args.orders)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Saved benchmark results to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
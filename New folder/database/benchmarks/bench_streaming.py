@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Streaming ETL Benchmark for Handicraft Marketplace Platform
+
+Writes synthetic state artisan sheets of increasing size to disk and
+processes each one in a fresh process, once loading the whole file and once
+streaming it in chunks. Reports seconds and peak resident memory per run:
+whole-file memory grows with the input, streaming memory should stay flat.
+
+Usage (from the database directory):
+    python benchmarks/bench_streaming.py --sizes 250000,1000000,4000000 --chunk-rows 100000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+DATABASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DATABASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_synthetic_sheet(path, rows, chunk_rows):
+    """Write a synthetic artisan sheet as CSV without holding it in memory"""
+    from bench_etl import synthetic_state_workbook
+    written = 0
+    while written < rows:
+        size = min(chunk_rows, rows - written)
+        chunk = synthetic_state_workbook(size, seed=written)
+        chunk['S. No'] += written
+        chunk.to_csv(path, mode='a', header=written == 0, index=False)
+        written += size
+
+
+def run_child(mode, source_path, output_path, chunk_rows):
+    """Process one sheet in this process and report time and peak memory"""
+    import pandas as pd
+    from analyze_datasets import clean_column_names, transform_artisans, stream_artisan_files
+    from table_store import write_table
+
+    start = time.perf_counter()
+    if mode == 'whole':
+        df = clean_column_names(pd.read_csv(source_path))
+        write_table(transform_artisans(df, 'UTTARPRADESH'), output_path, 'artisans')
+    else:
+        stream_artisan_files([source_path], output_path, chunk_rows)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'seconds': elapsed, 'peak_rss_mb': peak_mb}))
+
+
+def measure(mode, source_path, output_path, chunk_rows):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode, source_path, output_path, '--chunk-rows', str(chunk_rows)],
+        capture_output=True, text=True, check=True, cwd=DATABASE_DIR)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark peak memory of whole-file and streaming ETL')
+    parser.add_argument('--sizes', default='250000,1000000,4000000', help='comma separated row counts')
+    parser.add_argument('--chunk-rows', type=int, default=100000, help='rows per streamed chunk')
+    parser.add_argument('--skip-whole', action='store_true', help='only run the streaming mode')
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'SOURCE', 'OUTPUT'), help=argparse.SUPPRESS)
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child, args.chunk_rows)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in [int(size) for size in args.sizes.split(',')]:
+            source_path = os.path.join(tmp_dir, f"artisans_{rows}.csv")
+            write_synthetic_sheet(source_path, rows, args.chunk_rows)
+            run = {'rows': rows, 'source_mb': os.path.getsize(source_path) / 2 ** 20}
+            for mode in (('streaming',) if args.skip_whole else ('whole', 'streaming')):
+                run[mode] = measure(mode, source_path, os.path.join(tmp_dir, f"out_{mode}"), args.chunk_rows)
+                print(f"{rows:>10} rows {mode:>9}: {run[mode]['seconds']:7.2f}s  peak {run[mode]['peak_rss_mb']:8.1f} MB",
+                      file=sys.stderr)
+            os.remove(source_path)
+            results.append(run)
+
+    output = json.dumps({'chunk_rows': args.chunk_rows, 'runs': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f"Saved benchmark results to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Bulk Loader for Handicraft Marketplace Platform
+
+Loads the processed tables into the warehouse without manual PUT commands:
+
+1. Each table is split into gzip-compressed CSV chunks of about --chunk-mb
+   compressed (rows per chunk are sized from a compressed sample).
+2. Chunks are uploaded to the stage in parallel.
+3. One COPY per table loads all of its chunks, listed explicitly with FILES
+   so the warehouse reads them in parallel.
+4. Rows loaded (per COPY result and by COUNT(*)) are checked against the
+   rows written.
+
+Progress is recorded in a manifest after every chunk upload and COPY, so an
+interrupted load resumes after the last uploaded chunk and the last committed
+COPY. Chunks that a COPY committed before its results were recorded are
+skipped by the warehouse's load metadata and confirmed from its copy history.
+A table whose processed data changed since the manifest was written is split
+and loaded again from scratch.
+
+Usage (from the database directory):
+    python bulk_load.py                                  # load into Snowflake (SNOWFLAKE_* settings)
+    python bulk_load.py --local-stage /tmp/stage         # local stage directory and fake COPY
+    python bulk_load.py --local-stage /tmp/stage --fail-after-commit 1   # then run again to resume
+    python bulk_load.py --tables products orders --threads 16
+"""
+
+import os
+import csv
+import sys
+import gzip
+import json
+import time
+import shutil
+import argparse
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import analyze_datasets as ad
+
+LOAD_DIR = os.path.join(ad.PROCESSED_DATA_DIR, 'load')
+MANIFEST_FILE = os.path.join(LOAD_DIR, 'manifest.json')
+
+# Snowflake recommends loading files of roughly 100-250 MB compressed
+DEFAULT_CHUNK_MB = 100
+SAMPLE_ROWS = 10000
+STAGE_NAME = 'handicraft_bulk'
+FILE_FORMAT_NAME = 'handicraft_bulk_csv'
+MAX_FILES_PER_COPY = 1000  # COPY ... FILES accepts at most 1000 names
+
+# Warehouse tables in load order: (processed table, warehouse table, loaded columns)
+LOAD_TABLES = [
+    ('regions', 'REGIONS', ['region_id', 'name', 'state', 'description', 'famous_for', 'image_url', 'created_at', 'updated_at']),
+    ('artisans', 'ARTISANS', ['artisan_id', 'name', 'location', 'craft_type', 'bio', 'image_url', 'contact_info',
+                              'years_active', 'created_at', 'updated_at']),
+    ('categories', 'CATEGORIES', ['category_id', 'name', 'description', 'image_url', 'created_at', 'updated_at']),
+    ('gi_tags', 'GI_TAGS', ['gi_tag_id', 'name', 'description', 'issuing_body', 'issue_date', 'region_id', 'created_at', 'updated_at']),
+    ('cultural_stories', 'CULTURAL_STORIES', ['story_id', 'title', 'content', 'history', 'cultural_significance', 'video_url',
+                                              'created_at', 'updated_at']),
+    ('products', 'PRODUCTS', ['product_id', 'name', 'description', 'price', 'artisan_id', 'category_id', 'region_id',
+                              'is_gi_tagged', 'gi_tag_id', 'story_id', 'dimensions', 'weight', 'materials', 'created_at', 'updated_at']),
+    ('tourist_stats', 'TOURIST_STATS', ['stat_id', 'region_id', 'year', 'domestic_count', 'foreign_count', 'growth_rate',
+                                        'peak_season', 'created_at', 'updated_at']),
+    ('partner_sites', 'PARTNER_SITES', ['partner_id', 'name', 'website_url', 'rating', 'review_count', 'commission_rate',
+                                        'shipping_options', 'contact_info', 'logo_url', 'description', 'created_at', 'updated_at']),
+    ('product_partner', 'PRODUCT_PARTNER', ['id', 'product_id', 'partner_id', 'price', 'shipping_fee', 'availability',
+                                            'estimated_delivery', 'created_at', 'updated_at']),
+    ('customers', 'CUSTOMERS', ['customer_id', 'name', 'email', 'password_hash', 'address', 'phone', 'created_at', 'updated_at']),
+    ('orders', 'ORDERS', ['order_id', 'customer_id', 'order_date', 'total_amount', 'status', 'shipping_address',
+                          'payment_method', 'tracking_number', 'platform_fee', 'created_at', 'updated_at']),
+    ('order_items', 'ORDER_ITEMS', ['item_id', 'order_id', 'product_id', 'partner_id', 'quantity', 'price', 'subtotal', 'created_at']),
+]
+
+
+class LoadError(Exception):
+    pass
+
+
+class LocalStage:
+    """A directory standing in for a warehouse stage"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.target = f"local:{os.path.abspath(directory)}"
+
+    def put(self, local_path, table):
+        destination = os.path.join(self.directory, table, os.path.basename(local_path))
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(local_path, f"{destination}.tmp")
+        os.replace(f"{destination}.tmp", destination)
+
+
+class FakeCopyExecutor:
+    """Executes COPY against a LocalStage the way the warehouse would. A COPY statement is
+    atomic (ON_ERROR = ABORT_STATEMENT): every file is parsed before any row is committed.
+    Files already loaded into the table are skipped and, like COPY load metadata, left out of
+    the results; TRUNCATE clears the load metadata but not the copy history. Table contents
+    are kept as row counts in the stage directory, so they persist across runs.
+    fail_after_commit makes that many COPY statements fail after committing, as when the
+    connection drops before the results arrive, to exercise resume."""
+
+    def __init__(self, stage, fail_after_commit=0):
+        self.stage = stage
+        self.state_file = os.path.join(stage.directory, '_warehouse.json')
+        self.fail_after_commit = fail_after_commit
+        self.lock = threading.Lock()
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        with open(f"{self.state_file}.tmp", 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(f"{self.state_file}.tmp", self.state_file)
+
+    def setup(self):
+        os.makedirs(self.stage.directory, exist_ok=True)
+
+    def truncate(self, warehouse_table):
+        with self.lock:
+            state = self._load_state()
+            history = state.get(warehouse_table, {}).get('history', [])
+            state[warehouse_table] = {'rows': 0, 'files': [], 'history': history}
+            self._save_state(state)
+        return datetime.now(timezone.utc).isoformat()
+
+    def copy(self, table, warehouse_table, columns, files):
+        with self.lock:
+            state = self._load_state()
+            loaded = state.setdefault(warehouse_table, {'rows': 0, 'files': [], 'history': []})
+            results = []
+            for name in files:
+                if name in loaded['files']:
+                    continue
+                with gzip.open(os.path.join(self.stage.directory, table, name), 'rt', newline='') as f:
+                    reader = csv.reader(f)
+                    header = next(reader)
+                    if header != columns:
+                        raise LoadError(f"{name}: columns {header} do not match {columns}")
+                    rows = sum(1 for _ in reader)
+                # Reported with the stage path, as Snowflake does
+                results.append({'file': f"{STAGE_NAME}/{table}/{name}", 'status': 'LOADED',
+                                'rows_parsed': rows, 'rows_loaded': rows})
+
+            # The whole statement commits at once
+            now = datetime.now(timezone.utc).isoformat()
+            for result in results:
+                name = os.path.basename(result['file'])
+                loaded['rows'] += result['rows_loaded']
+                loaded['files'].append(name)
+                loaded['history'].append({'file': f"{table}/{name}", 'rows_loaded': result['rows_loaded'],
+                                          'status': 'Loaded', 'time': now})
+            self._save_state(state)
+
+            if self.fail_after_commit > 0:
+                self.fail_after_commit -= 1
+                raise LoadError(f"simulated connection loss after COPY INTO {warehouse_table} committed")
+        return results
+
+    def copy_history(self, table, warehouse_table, since):
+        history = self._load_state().get(warehouse_table, {}).get('history', [])
+        return {os.path.basename(load['file']): load['rows_loaded'] for load in history
+                if load['status'] == 'Loaded' and (since is None or
+                                                   datetime.fromisoformat(load['time']) >= datetime.fromisoformat(since))}
+
+    def count_rows(self, warehouse_table):
+        return self._load_state().get(warehouse_table, {}).get('rows', 0)
+
+
+class SnowflakeLoader:
+    """Stage and COPY executor for Snowflake (needs snowflake-connector-python)"""
+
+    def __init__(self):
+        import snowflake.connector
+        self.connection = snowflake.connector.connect(
+            account=os.getenv('SNOWFLAKE_ACCOUNT'),
+            user=os.getenv('SNOWFLAKE_USER'),
+            password=os.getenv('SNOWFLAKE_PASSWORD'),
+            database=os.getenv('SNOWFLAKE_DATABASE', 'HANDICRAFT_MARKETPLACE'),
+            schema=os.getenv('SNOWFLAKE_SCHEMA', 'CORE'),
+            warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
+            role=os.getenv('SNOWFLAKE_ROLE'),
+        )
+        self.target = f"snowflake:{os.getenv('SNOWFLAKE_ACCOUNT')}/{os.getenv('SNOWFLAKE_DATABASE', 'HANDICRAFT_MARKETPLACE')}"
+
+    def execute(self, sql):
+        # One cursor per statement: the connection is shared by the upload threads
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(sql)
+            columns = [col[0].lower() for col in cursor.description or []]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()] if columns else []
+        finally:
+            cursor.close()
+
+    def setup(self):
+        self.execute(f"""CREATE FILE FORMAT IF NOT EXISTS {FILE_FORMAT_NAME}
+            TYPE = 'CSV' COMPRESSION = 'GZIP' FIELD_DELIMITER = ',' SKIP_HEADER = 1
+            FIELD_OPTIONALLY_ENCLOSED_BY = '"' NULL_IF = ('') EMPTY_FIELD_AS_NULL = TRUE""")
+        self.execute(f"CREATE STAGE IF NOT EXISTS {STAGE_NAME} FILE_FORMAT = {FILE_FORMAT_NAME}")
+
+    def put(self, local_path, table):
+        self.execute(f"PUT 'file://{os.path.abspath(local_path)}' @{STAGE_NAME}/{table}/ AUTO_COMPRESS = FALSE OVERWRITE = TRUE")
+
+    def truncate(self, warehouse_table):
+        self.execute(f"TRUNCATE TABLE IF EXISTS {warehouse_table}")
+        return self.execute("SELECT CURRENT_TIMESTAMP() AS now")[0]['now'].isoformat()
+
+    def copy(self, table, warehouse_table, columns, files):
+        file_list = ', '.join(f"'{name}'" for name in files)
+        rows = self.execute(f"""COPY INTO {warehouse_table} ({', '.join(columns)})
+            FROM @{STAGE_NAME}/{table}/
+            FILES = ({file_list})
+            FILE_FORMAT = (FORMAT_NAME = '{FILE_FORMAT_NAME}')
+            ON_ERROR = 'ABORT_STATEMENT'""")
+        # Files loaded earlier are skipped by COPY load metadata and not reported
+        return [row for row in rows if 'file' in row]
+
+    def copy_history(self, table, warehouse_table, since):
+        """Rows loaded per file name by successful loads into the table since the given time
+        (or the last 14 days, as far back as COPY_HISTORY goes)"""
+        start = f"'{since}'::TIMESTAMP_LTZ" if since else "DATEADD(days, -14, CURRENT_TIMESTAMP())"
+        rows = self.execute(f"""SELECT file_name, row_count, status
+            FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(TABLE_NAME => '{warehouse_table}', START_TIME => {start}))""")
+        return {os.path.basename(row['file_name']): row['row_count'] for row in rows if row['status'].lower() == 'loaded'}
+
+    def count_rows(self, warehouse_table):
+        return self.execute(f"SELECT COUNT(*) AS count FROM {warehouse_table}")[0]['count']
+
+
+class Manifest:
+    """Chunk and load progress, saved after every change so a load can resume"""
+
+    def __init__(self, path, target):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, 'r') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+        # Progress against another stage or warehouse does not carry over
+        if self.data.get('target') != target:
+            self.data = {'target': target, 'tables': {}}
+
+    def table(self, name):
+        return self.data['tables'].get(name)
+
+    def update(self, name, entry=None, **chunk_changes):
+        with self.lock:
+            if entry is not None:
+                self.data['tables'][name] = entry
+            for file_name, changes in chunk_changes.items():
+                for chunk in self.data['tables'][name]['chunks']:
+                    if chunk['file'] == file_name:
+                        chunk.update(changes)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(f"{self.path}.tmp", 'w') as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(f"{self.path}.tmp", self.path)
+
+
+def rows_per_chunk(df, columns, chunk_bytes):
+    """Rows that compress to about chunk_bytes, estimated from a compressed sample"""
+    sample = df[columns].head(SAMPLE_ROWS)
+    if sample.empty:
+        return 1
+    compressed = len(gzip.compress(sample.to_csv(index=False).encode('utf-8'), compresslevel=6))
+    return max(1, int(chunk_bytes / (compressed / len(sample))))
+
+
+def split_table(table, columns, chunk_bytes):
+    """Write a table as gzip CSV chunks in LOAD_DIR; returns the manifest entry for it"""
+    df = ad.load_table(table, columns)
+    chunk_rows = rows_per_chunk(df, columns, chunk_bytes)
+    chunk_dir = os.path.join(LOAD_DIR, table)
+    shutil.rmtree(chunk_dir, ignore_errors=True)
+    os.makedirs(chunk_dir)
+
+    chunks = []
+    for index, start in enumerate(range(0, max(len(df), 1), chunk_rows)):
+        part = df.iloc[start:start + chunk_rows]
+        name = f"{table}_{index:05d}.csv.gz"
+        path = os.path.join(chunk_dir, name)
+        with gzip.open(path, 'wt', compresslevel=6, newline='') as f:
+            part.to_csv(f, index=False)
+        chunks.append({'file': name, 'rows': len(part), 'bytes': os.path.getsize(path), 'uploaded': False, 'loaded': False})
+
+    return {
+        'source_digest': ad.file_digest(ad.table_path(table)),
+        'rows': len(df),
+        'chunk_rows': chunk_rows,
+        'chunks': chunks,
+        'truncated': False,
+        'verified': False,
+    }
+
+
+def prepare(manifest, tables, chunk_bytes):
+    """Split tables that are new or whose processed data changed since the manifest was written"""
+    for table, _, columns in tables:
+        entry = manifest.table(table)
+        digest = ad.file_digest(ad.table_path(table))
+        if entry is not None and entry['source_digest'] == digest:
+            continue
+        entry = split_table(table, columns, chunk_bytes)
+        manifest.update(table, entry)
+        print(f"[{table}] split {entry['rows']} rows into {len(entry['chunks'])} chunks of up to {entry['chunk_rows']} rows")
+
+
+def upload(manifest, stage, tables, threads):
+    """Upload every chunk not uploaded yet, in parallel across all tables"""
+    pending = [(table, chunk['file']) for table, _, _ in tables
+               for chunk in manifest.table(table)['chunks'] if not chunk['uploaded']]
+
+    def put(item):
+        table, name = item
+        stage.put(os.path.join(LOAD_DIR, table, name), table)
+        manifest.update(table, **{name: {'uploaded': True}})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(put, pending))
+    print(f"Uploaded {len(pending)} chunks in {time.perf_counter() - start:.2f}s")
+
+
+def load(manifest, executor, tables):
+    """COPY each table's unloaded chunks and verify its row count"""
+    failures = []
+    for table, warehouse_table, columns in tables:
+        entry = manifest.table(table)
+        if not entry['truncated']:
+            # A fresh split replaces the table's contents
+            entry['truncated_at'] = executor.truncate(warehouse_table)
+            entry['truncated'] = True
+            manifest.update(table, entry)
+
+        pending = [chunk['file'] for chunk in entry['chunks'] if not chunk['loaded']]
+        start = time.perf_counter()
+        for batch_start in range(0, len(pending), MAX_FILES_PER_COPY):
+            batch = pending[batch_start:batch_start + MAX_FILES_PER_COPY]
+            # Results name the staged path (<stage>/<table>/<chunk>)
+            loaded = {}
+            for result in executor.copy(table, warehouse_table, columns, batch):
+                if result['status'] != 'LOADED':
+                    raise LoadError(f"{table}: {result['file']} failed to load: {result}")
+                loaded[os.path.basename(result['file'])] = result['rows_loaded']
+
+            # COPY leaves out files skipped by its load metadata, i.e. loaded by an earlier COPY
+            # (one that committed before its results reached the manifest); the copy history since
+            # the truncation confirms them and their row counts
+            skipped = [name for name in batch if name not in loaded]
+            if skipped:
+                history = executor.copy_history(table, warehouse_table, entry.get('truncated_at'))
+                loaded.update((name, history[name]) for name in skipped if name in history)
+            manifest.update(table, **{name: {'loaded': True, 'rows_loaded': rows} for name, rows in loaded.items()})
+
+        # Verify: every chunk committed with the rows it was written with, and the table holds them all
+        chunks = manifest.table(table)['chunks']
+        bad_chunks = [chunk['file'] for chunk in chunks if not chunk['loaded'] or chunk.get('rows_loaded') != chunk['rows']]
+        table_rows = executor.count_rows(warehouse_table)
+        verified = not bad_chunks and table_rows == entry['rows']
+        entry = manifest.table(table)
+        entry['verified'] = verified
+        manifest.update(table, entry)
+
+        status = 'verified' if verified else 'MISMATCH'
+        print(f"[{table}] loaded {len(pending)} chunks in {time.perf_counter() - start:.2f}s; "
+              f"{table_rows}/{entry['rows']} rows {status}")
+        if not verified:
+            failures.append(table)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk load the processed tables into the warehouse')
+    parser.add_argument('--tables', nargs='+', choices=[name for name, _, _ in LOAD_TABLES], metavar='TABLE',
+                        help='load only these tables')
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_MB, help='target compressed chunk size')
+    parser.add_argument('--threads', type=int, default=8, help='parallel uploads')
+    parser.add_argument('--local-stage', metavar='DIR',
+                        help='use a local stage directory and a fake COPY executor instead of Snowflake')
+    parser.add_argument('--reset', action='store_true', help='ignore the manifest and load everything again')
+    parser.add_argument('--fail-after-commit', type=int, default=0, metavar='N',
+                        help='with --local-stage, make the first N COPY statements fail after committing, to try resuming')
+    args = parser.parse_args()
+
+    tables = [spec for spec in LOAD_TABLES if not args.tables or spec[0] in args.tables]
+
+    if args.local_stage:
+        stage = LocalStage(args.local_stage)
+        executor = FakeCopyExecutor(stage, args.fail_after_commit)
+    else:
+        try:
+            stage = executor = SnowflakeLoader()
+        except ImportError:
+            print("snowflake-connector-python is not installed; use --local-stage to load into a local stage")
+            return 1
+
+    if args.reset and os.path.exists(MANIFEST_FILE):
+        os.remove(MANIFEST_FILE)
+    manifest = Manifest(MANIFEST_FILE, stage.target)
+
+    try:
+        executor.setup()
+        prepare(manifest, tables, int(args.chunk_mb * 2 ** 20))
+        upload(manifest, stage, tables, args.threads)
+        failures = load(manifest, executor, tables)
+    except LoadError as e:
+        print(f"Load failed: {str(e)} (run again to resume)")
+        return 1
+
+    if failures:
+        print(f"Row counts do not match for: {', '.join(failures)}")
+        return 1
+    print(f"Loaded {len(tables)} tables")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
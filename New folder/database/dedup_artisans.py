@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Artisan Deduplication for Handicraft Marketplace Platform
+
+Finds artisans that appear more than once across the state workbooks under
+spelling variants ("Lakshmi Devi" / "Laxmi Devi", "Shaikh" / "Sheikh") and
+collapses each group to one canonical record.
+
+Records are only compared inside blocks (same state and the same phonetic
+code of the first and last name), and inside a block only with their nearest
+neighbours when sorted by name, by location and by phone number, so the work
+grows linearly with the number of artisans instead of quadratically. Names are compared by the MinHash estimate
+of their character-trigram Jaccard similarity, computed as whole arrays.
+"""
+
+import numpy as np
+import pandas as pd
+
+from entity_linking import match_keys, canonical_states
+
+# Soundex digit classes (after match_keys has folded transliteration variants)
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6'
+}
+
+# Matching parameters
+NAME_SIMILARITY_THRESHOLD = 0.6  # estimated trigram Jaccard similarity of names
+WINDOW = 8                       # neighbours compared within a block after sorting
+NUM_HASHES = 32                  # MinHash signature length
+KEY_WIDTH = 40                   # names are compared on their first KEY_WIDTH - 3 characters
+MINHASH_SEED = 20240601
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+
+def soundex(word):
+    """Four-character Soundex code of one word"""
+    if not word:
+        return ''
+    code = word[0]
+    previous = SOUNDEX_CODES.get(word[0], '')
+    for char in word[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+        if char not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def blocking_keys(states, name_keys):
+    """state|soundex(first name)|soundex(last name); each distinct name is encoded once"""
+    codes, uniques = pd.factorize(np.asarray(name_keys, dtype=object))
+    phonetic = np.array([soundex(key.split()[0]) + soundex(key.split()[-1]) if key else '' for key in uniques], dtype=object)
+    state_keys = match_keys(canonical_states(states), compact=True)
+    return state_keys + '|' + phonetic[codes]
+
+
+def minhash_signatures(keys, num_hashes=NUM_HASHES, chunk_size=20000):
+    """MinHash signatures (len(keys), num_hashes) of the character trigrams of each key,
+    computed in chunks to bound memory. Pass distinct keys; rows share their name's signature."""
+    rng = np.random.default_rng(MINHASH_SEED)
+    a = rng.integers(1, 1 << 32, num_hashes, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, num_hashes, dtype=np.uint64)
+
+    # Pad with spaces so the first and last characters form their own trigrams
+    padded = np.array([f"  {key} " for key in keys], dtype=f'S{KEY_WIDTH}')
+    lengths = np.char.str_len(padded)
+    chars = padded.view(np.uint8).reshape(len(keys), KEY_WIDTH).astype(np.uint64)
+
+    signatures = np.empty((len(keys), num_hashes), dtype=np.uint32)
+    for start in range(0, len(keys), chunk_size):
+        block = chars[start:start + chunk_size]
+        trigrams = (block[:, :-2] << np.uint64(16)) | (block[:, 1:-1] << np.uint64(8)) | block[:, 2:]
+        valid = np.arange(KEY_WIDTH - 2) < (lengths[start:start + chunk_size, None] - 2)
+        hashed = (trigrams[:, :, None] * a + b) % MERSENNE_PRIME
+        hashed[~valid] = MERSENNE_PRIME
+        # The low 32 bits of the minimum are enough to tell equal minimums apart
+        signatures[start:start + chunk_size] = hashed.min(axis=1)
+    return signatures
+
+
+def name_similarity(signatures, left, right, chunk_size=1000000):
+    """Estimated Jaccard similarity of the names with codes left[k] and right[k] (0 for empty names)"""
+    similarity = np.zeros(len(left))
+    for start in range(0, len(left), chunk_size):
+        l, r = left[start:start + chunk_size], right[start:start + chunk_size]
+        named = (l >= 0) & (r >= 0)
+        chunk = np.zeros(len(l))
+        chunk[named] = (signatures[l[named]] == signatures[r[named]]).mean(axis=1)
+        similarity[start:start + chunk_size] = chunk
+    return similarity
+
+
+def connected_components(n, left, right):
+    """Label each of n nodes with the smallest node index in its component"""
+    parent = np.arange(n)
+    while True:
+        pl, pr = parent[left], parent[right]
+        low, high = np.minimum(pl, pr), np.maximum(pl, pr)
+        merge = low != high
+        if not merge.any():
+            return parent
+        np.minimum.at(parent, high[merge], low[merge])
+        # Pointer jumping: point every node at its root
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+
+def phone_keys(values):
+    """Digits of a contact number, without an Indian country code or trunk prefix"""
+    digits = pd.Series(np.asarray(values, dtype=object)).fillna('').astype(str).str.replace(r'\D', '', regex=True)
+    return digits.str.replace(r'^(?:91|0)(?=\d{10}$)', '', regex=True).to_numpy(dtype=object)
+
+
+def codes_of(values, sort=False):
+    """Integer codes and distinct values, with code -1 for empty values; sort=True numbers
+    the values in sorted order"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), sort=sort)
+    empty = np.flatnonzero(uniques == '')
+    if len(empty):
+        codes[codes == empty[0]] = -1
+    return codes, uniques
+
+
+def candidate_pairs(blocks, sort_key, names, contacts, locations, signatures, window=WINDOW):
+    """Compare each record with its next `window` neighbours in (block, sort_key) order and
+    return the index pairs judged to be the same artisan. All inputs except the signatures
+    (one row per name code) are integer codes (-1 for empty)."""
+    order = np.lexsort(sort_key[::-1] + (blocks,))
+    blocks, names = blocks[order], names[order]
+    contacts, locations = contacts[order], locations[order]
+
+    lefts, rights = [], []
+    for offset in range(1, window + 1):
+        i = np.arange(len(order) - offset)
+        j = i + offset
+        same_block = blocks[i] == blocks[j]
+        i, j = i[same_block], j[same_block]
+
+        similarity = name_similarity(signatures, names[i], names[j])
+        # Different phone numbers mean different people, whatever the name
+        phone_conflict = (contacts[i] >= 0) & (contacts[j] >= 0) & (contacts[i] != contacts[j])
+        # A similar name alone is not enough: the phone number or the location must also agree
+        corroborated = ((contacts[i] >= 0) & (contacts[i] == contacts[j])) \
+            | ((locations[i] >= 0) & (locations[i] == locations[j]))
+        match = (similarity >= NAME_SIMILARITY_THRESHOLD) & ~phone_conflict & corroborated
+        lefts.append(order[i[match]])
+        rights.append(order[j[match]])
+
+    return np.concatenate(lefts), np.concatenate(rights)
+
+
+def cluster_artisans(artisans, window=WINDOW):
+    """Assign every artisan row a cluster label (index of a row in the same cluster)"""
+    name_keys = match_keys(artisans['name'])
+    names, unique_names = codes_of(name_keys, sort=True)
+    signatures = minhash_signatures(unique_names)
+    blocks, _ = codes_of(blocking_keys(artisans['state'], name_keys))
+    contacts, _ = codes_of(phone_keys(artisans['contact_info']))
+    locations, _ = codes_of(match_keys(artisans['location'], compact=True))
+
+    # Multi-pass sorted neighbourhood: a common name can fill a block with namesakes, so the
+    # records are also sorted by location and by phone to bring a re-listing next to its original
+    left, right = [], []
+    for sort_key in ((names,), (locations, names), (contacts, names)):
+        pass_left, pass_right = candidate_pairs(blocks, sort_key, names, contacts, locations, signatures, window)
+        left.append(pass_left)
+        right.append(pass_right)
+    return connected_components(len(artisans), np.concatenate(left), np.concatenate(right))
+
+
+def deduplicate_artisans(artisans, window=WINDOW):
+    """Collapse duplicate artisans. Returns the canonical artisans and a mapping of
+    every merged artisan_id to its canonical_artisan_id."""
+    artisans = artisans.reset_index(drop=True)
+    labels = cluster_artisans(artisans, window)
+
+    # Canonical record: the most complete one, ties broken by artisan_id so the choice is stable
+    completeness = sum((artisans[col].astype(str).str.strip() != '').astype(int)
+                       for col in ('name', 'location', 'craft_type', 'contact_info'))
+    completeness += (pd.to_numeric(artisans['years_active'], errors='coerce').fillna(0) > 0).astype(int)
+    ranked = pd.DataFrame({'cluster': labels, 'score': -completeness.to_numpy(), 'id': artisans['artisan_id'].to_numpy()})
+    ranked = ranked.sort_values(['cluster', 'score', 'id'], kind='stable')
+    canonical_rows = ranked.drop_duplicates('cluster')
+
+    canonical_by_cluster = pd.Series(canonical_rows['id'].to_numpy(), index=canonical_rows['cluster'].to_numpy())
+    canonical_ids = canonical_by_cluster.reindex(labels).to_numpy()
+    merged = canonical_ids != artisans['artisan_id'].to_numpy()
+
+    merges = pd.DataFrame({
+        'artisan_id': artisans['artisan_id'].to_numpy()[merged],
+        'canonical_artisan_id': canonical_ids[merged]
+    })
+    canonical = artisans.loc[np.sort(canonical_rows.index.to_numpy())].reset_index(drop=True)
+    return canonical, merges
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Entity Linking for Handicraft Marketplace Platform
+
+Resolves the foreign keys of processed products and tourist statistics
+against the regions, GI tags, categories, cultural stories and artisans
+tables. Names are reduced to match keys (case, diacritics, punctuation,
+common transliteration variants and state aliases) and joined with hash
+joins, so linking is linear in the number of rows. Every link reports its
+match rate so unresolved data is visible instead of silently orphaned.
+"""
+
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# Canonical names of Indian states and union territories
+INDIAN_STATES = [
+    'Andhra Pradesh', 'Arunachal Pradesh', 'Assam', 'Bihar', 'Chhattisgarh', 'Goa', 'Gujarat',
+    'Haryana', 'Himachal Pradesh', 'Jharkhand', 'Karnataka', 'Kerala', 'Madhya Pradesh',
+    'Maharashtra', 'Manipur', 'Meghalaya', 'Mizoram', 'Nagaland', 'Odisha', 'Punjab', 'Rajasthan',
+    'Sikkim', 'Tamil Nadu', 'Telangana', 'Tripura', 'Uttar Pradesh', 'Uttarakhand', 'West Bengal',
+    'Andaman and Nicobar Islands', 'Chandigarh', 'Dadra and Nagar Haveli and Daman and Diu', 'Delhi',
+    'Jammu and Kashmir', 'Ladakh', 'Lakshadweep', 'Puducherry'
+]
+
+# Abbreviations and former or alternative names used in the source sheets
+STATE_ALIASES = {
+    'AP': 'Andhra Pradesh',
+    'UP': 'Uttar Pradesh',
+    'MP': 'Madhya Pradesh',
+    'HP': 'Himachal Pradesh',
+    'TN': 'Tamil Nadu',
+    'WB': 'West Bengal',
+    'JK': 'Jammu and Kashmir',
+    'J&K': 'Jammu and Kashmir',
+    'UK': 'Uttarakhand',
+    'Orissa': 'Odisha',
+    'Uttaranchal': 'Uttarakhand',
+    'Pondicherry': 'Puducherry',
+    'NCT of Delhi': 'Delhi',
+    'New Delhi': 'Delhi',
+}
+
+# Placeholder names written by the transforms when a sheet has no value
+PLACEHOLDER_NAMES = {'', 'unknown region', 'traditional region', 'unknown state'}
+
+# Transliteration variants folded together in match keys, applied in order: the long
+# vowels come before doubled letters are collapsed, which would otherwise reduce them to e and o
+TRANSLITERATION_RULES = [
+    (re.compile(r'ee'), 'i'),                  # meenakari/minakari
+    (re.compile(r'oo'), 'u'),                  # laddoo/laddu
+    (re.compile(r'([a-z])\1+'), r'\1'),        # doubled letters: uttar/utar, laddu/ladu
+    (re.compile(r'([bdgjkt])h'), r'\1'),       # aspirates: bhadohi/badohi, kheda/keda
+    (re.compile(r'ch'), 'c'),
+    (re.compile(r'sh'), 's'),                  # maharashtra/maharastra
+    (re.compile(r'ph'), 'f'),
+    (re.compile(r'w'), 'v'),                   # warli/varli
+    (re.compile(r'z'), 'j'),                   # zari/jari
+    (re.compile(r'q'), 'k'),
+]
+
+
+def _match_key(value, compact):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    text = unicodedata.normalize('NFKD', str(value))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r'[^a-z0-9]+', ' ', text).strip()
+    for pattern, replacement in TRANSLITERATION_RULES:
+        text = pattern.sub(replacement, text)
+    return text.replace(' ', '') if compact else text
+
+
+def match_keys(values, compact=False):
+    """Reduce names to match keys. Each distinct value is normalized once.
+    compact=True also drops spaces (UTTARPRADESH == Uttar Pradesh)."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    keys = np.array([_match_key(value, compact) for value in uniques] + [''], dtype=object)
+    return keys[codes]
+
+
+_STATE_LOOKUP = {_match_key(name, True): name for name in INDIAN_STATES}
+_STATE_LOOKUP.update({_match_key(alias, True): name for alias, name in STATE_ALIASES.items()})
+
+
+def canonical_states(values):
+    """Map state names and aliases (MAHARASTRA, AP, Orissa...) to canonical names;
+    values that are not recognised are returned stripped but otherwise unchanged"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    resolved = []
+    for value in uniques:
+        text = '' if pd.isna(value) else str(value).strip()
+        resolved.append(_STATE_LOOKUP.get(_match_key(text, True), text))
+    return np.array(resolved + [''], dtype=object)[codes]
+
+
+def is_placeholder(keys):
+    return np.isin(keys, list(PLACEHOLDER_NAMES))
+
+
+def hash_join(left_keys, right_keys, right_values):
+    """Look up each left key in a hash table built from the right side (first occurrence wins).
+    Returns the matched values (None where unmatched) and a boolean match mask."""
+    right_keys = np.asarray(right_keys, dtype=object)
+    usable = ~is_placeholder(right_keys)
+    table = pd.Series(np.asarray(right_values, dtype=object)[usable], index=right_keys[usable])
+    table = table[~table.index.duplicated()]
+
+    positions = table.index.get_indexer(np.asarray(left_keys, dtype=object))
+    matched = positions >= 0
+    values = np.full(len(positions), None, dtype=object)
+    values[matched] = table.to_numpy()[positions[matched]]
+    return values, matched
+
+
+def link_report(name, matched, keys):
+    """Match statistics for one foreign key"""
+    matched = np.asarray(matched, dtype=bool)
+    unmatched = pd.Series(np.asarray(keys, dtype=object)[~matched])
+    return {
+        'link': name,
+        'rows': int(len(matched)),
+        'matched': int(matched.sum()),
+        'match_rate': float(matched.mean()) if len(matched) else 1.0,
+        'top_unmatched': {key: int(count) for key, count in unmatched[unmatched != ''].value_counts().head(5).items()}
+    }
+
+
+def link_products(products, regions, gi_tags, categories, stories, artisans):
+    """Resolve product foreign keys. Returns the linked products and a list of link reports."""
+    products = products.copy()
+    reports = []
+    name_keys = match_keys(products['name'])
+
+    # GI tags: a product whose name is a registered GI product is GI tagged
+    gi_tag_ids, gi_matched = hash_join(name_keys, match_keys(gi_tags['name']), gi_tags['gi_tag_id'])
+    products['gi_tag_id'] = gi_tag_ids
+    products['is_gi_tagged'] = gi_matched
+    reports.append(link_report('products.gi_tag_id', gi_matched, name_keys))
+
+    # Regions: by region name, falling back to the region of the product's GI tag
+    region_keys = match_keys(products['region_name'])
+    region_ids, region_matched = hash_join(region_keys, match_keys(regions['name']), regions['region_id'])
+    gi_region_ids, gi_region_matched = hash_join(gi_tag_ids, gi_tags['gi_tag_id'], gi_tags['region_id'])
+    use_gi_region = ~region_matched & gi_region_matched
+    region_ids[use_gi_region] = gi_region_ids[use_gi_region]
+    region_matched = region_matched | use_gi_region
+    products['region_id'] = region_ids
+
+    # Replace placeholder region names with the linked region's name
+    linked_names, _ = hash_join(region_ids, regions['region_id'], regions['name'])
+    products['region_name'] = np.where(region_matched, linked_names, products['region_name'].to_numpy())
+    reports.append(link_report('products.region_id', region_matched, region_keys))
+
+    # Categories: by category name
+    category_keys = match_keys(products['category_name'])
+    category_ids, category_matched = hash_join(category_keys, match_keys(categories['name']), categories['category_id'])
+    products['category_id'] = category_ids
+    reports.append(link_report('products.category_id', category_matched, category_keys))
+
+    # Cultural stories: the story generated for the product must exist
+    story_matched = products['story_id'].isin(stories['story_id']).to_numpy()
+    products['story_id'] = np.where(story_matched, products['story_id'].to_numpy(dtype=object), None)
+    reports.append(link_report('products.story_id', story_matched, name_keys))
+
+    # Artisans: only the artisan the source row names, in the product's state or else the only
+    # artisan of that name. Products without a maker reference stay unlinked: attributing them to
+    # some artisan of the same craft would invent provenance for the transparency page.
+    artisan_keys = match_keys(products['artisan_name'])
+    artisan_name_keys = match_keys(artisans['name'])
+    region_states, _ = hash_join(region_ids, regions['region_id'], regions['state'])
+    state_keys = match_keys(canonical_states(region_states), compact=True)
+    artisan_state_keys = match_keys(canonical_states(artisans['state']), compact=True)
+    artisan_ids, artisan_matched = hash_join(
+        state_keys + '|' + artisan_keys, artisan_state_keys + '|' + artisan_name_keys, artisans['artisan_id'])
+    unique_names = ~pd.Series(artisan_name_keys).duplicated(keep=False).to_numpy()
+    any_state_ids, any_state_matched = hash_join(
+        artisan_keys, artisan_name_keys[unique_names], artisans['artisan_id'].to_numpy()[unique_names])
+    use_any_state = ~artisan_matched & any_state_matched
+    artisan_ids[use_any_state] = any_state_ids[use_any_state]
+    artisan_matched = (artisan_matched | use_any_state) & (artisan_keys != '')
+    products['artisan_id'] = np.where(artisan_matched, artisan_ids, None)
+    reports.append(link_report('products.artisan_id', artisan_matched, artisan_keys))
+
+    return products, reports
+
+
+def link_tourist_stats(stats, regions):
+    """Resolve tourist statistic regions. Rows whose region cannot be resolved are dropped
+    (TOURIST_STATS.region_id is NOT NULL) and show up in the report."""
+    region_keys = match_keys(stats['region_name'])
+    region_ids, matched = hash_join(region_keys, match_keys(regions['name']), regions['region_id'])
+    stats = stats.copy()
+    stats['region_id'] = region_ids
+    return stats[matched].reset_index(drop=True), [link_report('tourist_stats.region_id', matched, region_keys)]
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+ETL Runner for Handicraft Marketplace Platform
+
+Runs the dataset processing steps from analyze_datasets.py as a DAG of stages
+with declared inputs and outputs. A stage is skipped when the hashes of its
+inputs, its outputs and its code are the same as on its last successful run,
+and stages whose dependencies are satisfied run in parallel.
+
+Usage (from the database directory):
+    python etl_runner.py                       # run everything that is out of date
+    python etl_runner.py --only products       # run selected stages
+    python etl_runner.py --from product_partner  # run a stage and everything downstream
+    python etl_runner.py --list
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import types
+import hashlib
+import inspect
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import analyze_datasets as ad
+
+STATE_FILE = os.path.join(ad.PROCESSED_DATA_DIR, '.etl_state.json')
+
+ARTISAN_FILES = ['UTTARPRADESH.xlsx', 'AP.xlsx', 'MEGHALAYA ARTSIAN DATA.xlsx', 'MAHARASTRA.xlsx', 'KARNATAKA.xlsx']
+
+
+def upload(filename):
+    return os.path.join(ad.UPLOAD_DIR, filename)
+
+
+def processed(filename):
+    return os.path.join(ad.PROCESSED_DATA_DIR, filename)
+
+
+def table(name):
+    return ad.table_path(name)
+
+
+def staged(name):
+    return ad.table_path(os.path.join('staging', name))
+
+
+# Stage definitions. Inputs are files (raw uploads or other stages' outputs); a
+# stage depends on every stage that produces one of its inputs. `run` receives
+# the runner options and calls into analyze_datasets. Stages exchange typed
+# intermediate tables; CSV is only written by the export stage.
+STAGES = {
+    'artisans': {
+        'inputs': [upload(f) for f in ARTISAN_FILES],
+        'outputs': [staged('artisans')],
+        'run': lambda options: ad.process_artisan_data(max_workers=options['workers'], chunk_rows=options['chunk_rows']),
+    },
+    'dedup_artisans': {
+        'inputs': [staged('artisans')],
+        'outputs': [table('artisans'), table('artisan_merges')],
+        'run': lambda options: ad.deduplicate_artisan_data(),
+    },
+    'gi_tags': {
+        'inputs': [upload('GI tagged products.xlsx')],
+        'outputs': [table('gi_tags'), table('regions')],
+        'run': lambda options: ad.process_gi_tagged_products(),
+    },
+    'products': {
+        'inputs': [upload('images adn products.xlsx')],
+        'outputs': [staged('products'), table('categories'), table('cultural_stories')],
+        'run': lambda options: ad.process_products_and_images(chunk_rows=options['chunk_rows']),
+    },
+    'tourist_stats': {
+        'inputs': [upload('stats.csv')],
+        'outputs': [staged('tourist_stats')],
+        'run': lambda options: ad.process_tourist_stats(chunk_rows=options['chunk_rows']),
+    },
+    'link': {
+        'inputs': [staged('products'), staged('tourist_stats'), table('regions'), table('gi_tags'),
+                   table('categories'), table('cultural_stories'), table('artisans')],
+        'outputs': [table('products'), table('tourist_stats'), processed('linking_report.json')],
+        'run': lambda options: ad.link_entities(),
+    },
+    'partner_sites': {
+        'inputs': [],
+        'outputs': [table('partner_sites')],
+        'run': lambda options: ad.generate_partner_websites(),
+    },
+    'product_partner': {
+        'inputs': [table('products'), table('partner_sites')],
+        'outputs': [table('product_partner')],
+        'run': lambda options: ad.generate_product_partner_relationships(),
+    },
+    'customers': {
+        'inputs': [],
+        'outputs': [table('customers')],
+        'run': lambda options: ad.generate_sample_customers(),
+    },
+    'orders': {
+        'inputs': [table('product_partner'), table('customers')],
+        'outputs': [table('orders'), table('order_items')],
+        'run': lambda options: ad.generate_sample_orders(),
+    },
+    'export_csv': {
+        'inputs': [table(name) for name in ad.EXPORT_TABLES],
+        'outputs': [processed(f"{name}.csv") for name in ad.EXPORT_TABLES],
+        'run': lambda options: ad.export_csv_tables(),
+    },
+    'import_script': {
+        'inputs': [],
+        'outputs': [ad.SNOWFLAKE_IMPORT_SCRIPT],
+        'run': lambda options: ad.generate_snowflake_import_script(),
+    },
+}
+
+
+def dependencies(name):
+    """Stages producing any of this stage's inputs"""
+    inputs = set(STAGES[name]['inputs'])
+    return [other for other, stage in STAGES.items() if other != name and inputs & set(stage['outputs'])]
+
+
+def downstream(names):
+    """The given stages plus every stage that transitively depends on them"""
+    selected = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for name in STAGES:
+            if name not in selected and selected & set(dependencies(name)):
+                selected.add(name)
+                changed = True
+    return selected
+
+
+def file_hashes(paths):
+    """Content hashes of files (None for files that do not exist)"""
+    return {path: ad.file_digest(path) if os.path.exists(path) else None for path in paths}
+
+
+# Modules whose functions and constants make up a stage's code version
+ETL_MODULES = ('analyze_datasets', 'entity_linking', 'dedup_artisans', 'table_store', '__main__')
+CONSTANT_TYPES = (str, int, float, bool, tuple, list, dict, set, frozenset, re.Pattern)
+
+
+def constant_repr(value):
+    """repr() that does not depend on set iteration order"""
+    if isinstance(value, (set, frozenset)):
+        return repr(sorted(value, key=repr))
+    return repr(value)
+
+
+def code_version(func):
+    """Hash the source of a function and every function it reaches in the ETL modules"""
+    database_dir = os.path.dirname(os.path.abspath(ad.__file__))
+    digest = hashlib.sha256()
+    seen = set()
+
+    def visit(code, namespace):
+        for name in code.co_names:
+            # Stage lambdas call analyze_datasets through the `ad` module attribute
+            target = namespace.get(name, getattr(ad, name, None))
+            if isinstance(target, CONSTANT_TYPES) and namespace.get('__name__') in ETL_MODULES:
+                # Module-level settings and lookup tables (aliases, rules, defaults)
+                digest.update(f"{name}={constant_repr(target)}".encode('utf-8'))
+                continue
+            if not isinstance(target, types.FunctionType) or target in seen:
+                continue
+            if os.path.dirname(os.path.abspath(target.__code__.co_filename)) != database_dir:
+                continue
+            seen.add(target)
+            digest.update(inspect.getsource(target).encode('utf-8'))
+            visit(target.__code__, target.__globals__)
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                visit(const, namespace)
+
+    digest.update(inspect.getsource(func).encode('utf-8'))
+    visit(func.__code__, func.__globals__)
+    return digest.hexdigest()
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    with open(f"{STATE_FILE}.tmp", 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(f"{STATE_FILE}.tmp", STATE_FILE)
+
+
+def fingerprint(name):
+    """What a stage's result depends on: its code and the contents of its inputs"""
+    stage = STAGES[name]
+    return {'code': code_version(stage['run']), 'inputs': file_hashes(stage['inputs'])}
+
+
+def is_up_to_date(name, state):
+    previous = state.get(name)
+    if not previous:
+        return False
+    current = fingerprint(name)
+    if previous['code'] != current['code'] or previous['inputs'] != current['inputs']:
+        return False
+    # Outputs edited or removed since the last run also invalidate the stage
+    return previous['outputs'] == file_hashes(STAGES[name]['outputs'])
+
+
+def run_stage(name, options):
+    """Run one stage (in a worker process) and report how long it took"""
+    start = time.perf_counter()
+    STAGES[name]['run'](options)
+    return time.perf_counter() - start
+
+
+def run(selected, options):
+    """Run the selected stages in dependency order, in parallel where possible"""
+    state = load_state()
+    results = {}
+    pending = [name for name in STAGES if name in selected]
+
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=options['jobs'], mp_context=context) as executor:
+        running = {}
+        while pending or running:
+            for name in list(pending):
+                deps = [dep for dep in dependencies(name) if dep in selected]
+                if any(results.get(dep, {}).get('status') == 'failed' for dep in deps):
+                    results[name] = {'status': 'failed', 'seconds': 0.0, 'error': 'upstream stage failed'}
+                    pending.remove(name)
+                    continue
+                if not all(dep in results for dep in deps):
+                    continue
+
+                pending.remove(name)
+                if not options['force'] and is_up_to_date(name, state):
+                    results[name] = {'status': 'skipped', 'seconds': 0.0}
+                    print(f"[{name}] up to date, skipped")
+                    continue
+
+                print(f"[{name}] starting")
+                running[executor.submit(run_stage, name, options)] = (name, fingerprint(name))
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, stage_fingerprint = running.pop(future)
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    results[name] = {'status': 'failed', 'seconds': 0.0, 'error': str(e)}
+                    print(f"[{name}] failed: {str(e)}")
+                    continue
+
+                # The processing functions report their own errors and return None, so a
+                # stage only counts as successful if it produced all of its outputs
+                outputs = file_hashes(STAGES[name]['outputs'])
+                missing = [path for path, digest in outputs.items() if digest is None]
+                if missing:
+                    results[name] = {'status': 'failed', 'seconds': seconds, 'error': f"missing outputs: {missing}"}
+                    print(f"[{name}] failed: missing outputs {missing}")
+                    continue
+
+                results[name] = {'status': 'ran', 'seconds': seconds}
+                state[name] = dict(stage_fingerprint, outputs=outputs)
+                save_state(state)
+                print(f"[{name}] finished in {seconds:.2f}s")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the dataset processing stages as a memoized DAG')
+    parser.add_argument('--only', nargs='+', choices=list(STAGES), metavar='STAGE', help='run only these stages')
+    parser.add_argument('--from', dest='from_stage', choices=list(STAGES), metavar='STAGE',
+                        help='run this stage and every stage downstream of it')
+    parser.add_argument('--force', action='store_true', help='run selected stages even if they are up to date')
+    parser.add_argument('--jobs', type=int, default=None, help='stages run in parallel (default: CPU count)')
+    parser.add_argument('--workers', type=int, default=ad.ETL_WORKERS,
+                        help='worker processes for per-file stages (1 disables the pool)')
+    parser.add_argument('--chunk-rows', type=int, default=ad.ETL_CHUNK_ROWS,
+                        help='stream source files in chunks of this many rows (0 loads whole files)')
+    parser.add_argument('--list', action='store_true', help='list stages and their dependencies')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, stage in STAGES.items():
+            deps = ', '.join(dependencies(name)) or '-'
+            print(f"{name:16} depends on: {deps}")
+        return 0
+
+    selected = set(STAGES)
+    if args.only:
+        selected = set(args.only)
+    if args.from_stage:
+        selected &= downstream([args.from_stage])
+
+    start = time.perf_counter()
+    results = run(selected, {'force': args.force or bool(args.only or args.from_stage),
+                             'jobs': args.jobs, 'workers': args.workers, 'chunk_rows': args.chunk_rows})
+    total = time.perf_counter() - start
+
+    print("\nStage timings:")
+    for name in STAGES:
+        if name in results:
+            result = results[name]
+            line = f"  {name:16} {result['status']:8} {result['seconds']:8.2f}s"
+            print(line + (f"  ({result['error']})" if 'error' in result else ''))
+    print(f"  {'total':16} {'':8} {total:8.2f}s")
+
+    return 1 if any(r['status'] == 'failed' for r in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
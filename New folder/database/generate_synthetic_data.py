@@ -0,0 +1,560 @@
+#!/usr/bin/env python3
+"""
+Synthetic Data Generator for Handicraft Marketplace Platform
+
+This script generates realistic-volume datasets (regions, categories, artisans,
+products, partner sites, product-partner links, customers, orders and order
+items) for performance testing the API and the ETL. Rows are generated with
+NumPy in fixed-size chunks and streamed to CSV, NDJSON or JSON, so no table is
+ever held in memory. What is kept for the whole run is a few numbers per
+entity: each product's artisan, category, region and price and the Zipf
+popularity CDF and ranking over products (about 48 bytes per product), plus
+about 16 bytes per artisan and 8 per customer, e.g. 48 MB for a million
+products. Everything else is bounded by the chunk size.
+
+Output is fully determined by the seed and chunk size. Popularity follows a
+Zipf distribution, artisans cluster in a handful of craft regions, products
+follow their region's dominant craft and order dates peak in the festive and
+wedding season (October to February).
+
+Usage:
+    python generate_synthetic_data.py --output-dir synthetic_data --products 1000000 --orders 2000000
+"""
+
+import os
+import math
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+# Craft regions: (name, state, dominant category)
+REGIONS = [
+    ('Jaipur', 'Rajasthan', 'Pottery'),
+    ('Varanasi', 'Uttar Pradesh', 'Textiles'),
+    ('Moradabad', 'Uttar Pradesh', 'Metalwork'),
+    ('Kutch', 'Gujarat', 'Textiles'),
+    ('Lucknow', 'Uttar Pradesh', 'Textiles'),
+    ('Channapatna', 'Karnataka', 'Woodwork'),
+    ('Mysuru', 'Karnataka', 'Woodwork'),
+    ('Kondapalli', 'Andhra Pradesh', 'Woodwork'),
+    ('Srikalahasthi', 'Andhra Pradesh', 'Paintings'),
+    ('Madhubani', 'Bihar', 'Paintings'),
+    ('Bidar', 'Karnataka', 'Metalwork'),
+    ('Khurja', 'Uttar Pradesh', 'Pottery'),
+    ('Shillong', 'Meghalaya', 'Bamboo & Cane'),
+    ('Tura', 'Meghalaya', 'Bamboo & Cane'),
+    ('Kolhapur', 'Maharashtra', 'Jewelry'),
+    ('Paithan', 'Maharashtra', 'Textiles'),
+    ('Palghar', 'Maharashtra', 'Paintings'),
+    ('Bhadohi', 'Uttar Pradesh', 'Textiles'),
+    ('Kanchipuram', 'Tamil Nadu', 'Textiles'),
+    ('Thanjavur', 'Tamil Nadu', 'Paintings'),
+    ('Pochampally', 'Telangana', 'Textiles'),
+    ('Hyderabad', 'Telangana', 'Jewelry'),
+    ('Bastar', 'Chhattisgarh', 'Metalwork'),
+    ('Raghurajpur', 'Odisha', 'Paintings'),
+    ('Jodhpur', 'Rajasthan', 'Woodwork'),
+]
+
+# Categories: (name, median price in INR, craft type of artisans)
+CATEGORIES = [
+    ('Textiles', 3500, 'Weaver'),
+    ('Pottery', 1200, 'Potter'),
+    ('Woodwork', 1800, 'Woodcarver'),
+    ('Metalwork', 2500, 'Metalsmith'),
+    ('Jewelry', 4000, 'Jeweler'),
+    ('Paintings', 3000, 'Painter'),
+    ('Bamboo & Cane', 900, 'Basket Weaver'),
+]
+
+FIRST_NAMES = np.array(['Aarav', 'Priya', 'Rahul', 'Ananya', 'Vikram', 'Neha', 'Suresh', 'Lakshmi', 'Ramesh',
+                        'Kavita', 'Arjun', 'Meena', 'Ravi', 'Sunita', 'Mohan', 'Geeta', 'Iqbal', 'Fatima',
+                        'Bandana', 'Phrangsngi', 'Gopal', 'Radha', 'Venkatesh', 'Savitri'])
+LAST_NAMES = np.array(['Sharma', 'Patel', 'Singh', 'Mehta', 'Gupta', 'Reddy', 'Naidu', 'Kumar', 'Ansari',
+                       'Khan', 'Das', 'Marak', 'Lyngdoh', 'Jadhav', 'Patil', 'Iyer', 'Pillai', 'Mahto',
+                       'Prajapati', 'Vishwakarma'])
+PRODUCT_ADJECTIVES = np.array(['Handwoven', 'Hand-painted', 'Carved', 'Embroidered', 'Block-printed',
+                               'Glazed', 'Engraved', 'Traditional', 'Heritage', 'Artisanal'])
+
+# Relative order volume by calendar month (January..December): festive and wedding season peak
+MONTH_WEIGHTS = np.array([1.3, 1.1, 0.8, 0.7, 0.6, 0.6, 0.7, 0.9, 1.0, 1.6, 1.9, 1.5])
+
+ORDER_STATUSES = np.array(['Processing', 'Shipped', 'Delivered', 'Cancelled'])
+PAYMENT_METHODS = np.array(['Credit Card', 'UPI', 'Net Banking', 'Cash on Delivery'])
+AVAILABILITY = np.array(['In Stock', 'Limited Stock', 'Out of Stock'])
+DELIVERY_ESTIMATES = np.array(['3-5 days', '5-7 days', '7-10 days'])
+
+# Output columns per table (in the order snowflake_import.sql loads them)
+TABLE_COLUMNS = {
+    'regions': ['region_id', 'name', 'state', 'description', 'famous_for', 'image_url', 'created_at', 'updated_at'],
+    'categories': ['category_id', 'name', 'description', 'image_url', 'created_at', 'updated_at'],
+    'artisans': ['artisan_id', 'name', 'location', 'craft_type', 'bio', 'image_url', 'contact_info',
+                 'years_active', 'created_at', 'updated_at'],
+    'products': ['product_id', 'name', 'description', 'price', 'artisan_id', 'category_id', 'region_id',
+                 'is_gi_tagged', 'gi_tag_id', 'story_id', 'dimensions', 'weight', 'materials',
+                 'created_at', 'updated_at'],
+    'partner_sites': ['partner_id', 'name', 'website_url', 'rating', 'review_count', 'commission_rate',
+                      'shipping_options', 'contact_info', 'logo_url', 'description', 'created_at', 'updated_at'],
+    'product_partner': ['id', 'product_id', 'partner_id', 'price', 'shipping_fee', 'availability',
+                        'estimated_delivery', 'created_at', 'updated_at'],
+    'customers': ['customer_id', 'name', 'email', 'password_hash', 'address', 'phone', 'created_at', 'updated_at'],
+    'orders': ['order_id', 'customer_id', 'order_date', 'total_amount', 'status', 'shipping_address',
+               'payment_method', 'tracking_number', 'platform_fee', 'created_at', 'updated_at'],
+    'order_items': ['item_id', 'order_id', 'product_id', 'partner_id', 'quantity', 'price', 'subtotal',
+                    'created_at'],
+}
+
+# Maximum number of partner offers per product
+MAX_PARTNERS_PER_PRODUCT = 3
+
+
+def format_ids(prefix, numbers):
+    """Build zero-padded string ids such as prd-000000042 from an integer array"""
+    return np.char.add(f'{prefix}-', np.char.zfill(np.asarray(numbers).astype(str), 9))
+
+
+def make_ids(prefix, start, stop):
+    """Build ids for a half-open range of row numbers"""
+    return format_ids(prefix, np.arange(start, stop))
+
+
+def zipf_cdf(n, s):
+    """Cumulative distribution of a Zipf law truncated to n ranks"""
+    weights = 1.0 / np.power(np.arange(1, n + 1, dtype=np.float64), s)
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def sample_cdf(rng, cdf, size):
+    """Draw ranks from a precomputed cumulative distribution"""
+    return np.minimum(np.searchsorted(cdf, rng.random(size), side='right'), len(cdf) - 1)
+
+
+class ChunkWriter:
+    """Streams DataFrame chunks of a single table to CSV, NDJSON or a JSON array"""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self.file = open(path, 'w', newline='')
+        if fmt == 'json':
+            self.file.write('[')
+
+    def write(self, df):
+        if df.empty:
+            return
+
+        if self.fmt == 'csv':
+            df.to_csv(self.file, index=False, header=self.rows == 0)
+        elif self.fmt == 'ndjson':
+            body = df.to_json(orient='records', lines=True, date_format='iso')
+            self.file.write(body if body.endswith('\n') else body + '\n')
+        else:
+            body = df.to_json(orient='records', date_format='iso')[1:-1]
+            self.file.write((',\n' if self.rows else '\n') + body)
+
+        self.rows += len(df)
+
+    def close(self):
+        if self.fmt == 'json':
+            self.file.write('\n]\n')
+        self.file.close()
+        print(f"Saved {self.rows} rows to {self.path}")
+        return self.path
+
+
+class SyntheticDataGenerator:
+    """Deterministic generator for marketplace datasets of arbitrary size"""
+
+    def __init__(self, num_products=100000, num_artisans=20000, num_partners=50, num_customers=50000,
+                 num_orders=200000, seed=42, chunk_size=100000, zipf_s=1.1, as_of='2025-01-01T00:00:00',
+                 years=2):
+        self.num_products = num_products
+        self.num_artisans = num_artisans
+        self.num_partners = num_partners
+        self.num_customers = num_customers
+        self.num_orders = num_orders
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.zipf_s = zipf_s
+        self.as_of = pd.Timestamp(as_of)
+        self.years = years
+
+        # Table-level streams are derived from the seed so tables are independent of each other
+        self._table_keys = {table: i for i, table in enumerate(TABLE_COLUMNS)}
+
+        self.region_ids = make_ids('reg', 1, len(REGIONS) + 1)
+        self.category_ids = make_ids('cat', 1, len(CATEGORIES) + 1)
+        self.category_index = {name: i for i, (name, _, _) in enumerate(CATEGORIES)}
+
+    def _rng(self, table, chunk_index=None):
+        """Generator for one chunk of one table (chunk_index None is the table-wide stream)"""
+        key = 0 if chunk_index is None else chunk_index + 1
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(self._table_keys[table], key)))
+
+    def _chunks(self, total):
+        for chunk_index, start in enumerate(range(0, total, self.chunk_size)):
+            yield chunk_index, start, min(start + self.chunk_size, total)
+
+    def _timestamp(self, n):
+        return np.full(n, self.as_of.isoformat())
+
+    # Small dimension tables
+
+    def regions(self):
+        n = len(REGIONS)
+        yield pd.DataFrame({
+            'region_id': self.region_ids,
+            'name': [r[0] for r in REGIONS],
+            'state': [r[1] for r in REGIONS],
+            'description': [f"{r[0]} is known for its {r[2].lower()} traditions." for r in REGIONS],
+            'famous_for': [r[2] for r in REGIONS],
+            'image_url': '',
+            'created_at': self._timestamp(n),
+            'updated_at': self._timestamp(n),
+        })
+
+    def categories(self):
+        n = len(CATEGORIES)
+        yield pd.DataFrame({
+            'category_id': self.category_ids,
+            'name': [c[0] for c in CATEGORIES],
+            'description': [f"Collection of {c[0].lower()} items" for c in CATEGORIES],
+            'image_url': '',
+            'created_at': self._timestamp(n),
+            'updated_at': self._timestamp(n),
+        })
+
+    def partner_sites(self):
+        rng = self._rng('partner_sites')
+        n = self.num_partners
+        region = rng.integers(0, len(REGIONS), n)
+        ids = make_ids('prt', 1, n + 1)
+        names = np.array([f"{REGIONS[r][0]} Crafts {i + 1}" for i, r in enumerate(region)])
+        slugs = np.char.lower(np.char.replace(names, ' ', ''))
+        yield pd.DataFrame({
+            'partner_id': ids,
+            'name': names,
+            'website_url': np.char.add(np.char.add('https://www.', slugs), '.example.com'),
+            'rating': np.round(rng.uniform(3.5, 5.0, n), 1),
+            'review_count': rng.integers(10, 5000, n),
+            'commission_rate': rng.choice([10.0, 12.0, 14.0, 15.0, 18.0], n),
+            'shipping_options': json.dumps({'standard': {'price': 120, 'days': '3-5'},
+                                            'express': {'price': 280, 'days': '1-2'}}),
+            'contact_info': np.char.add('contact@', np.char.add(slugs, '.example.com')),
+            'logo_url': '',
+            'description': np.char.add('Marketplace for handicrafts from ', [REGIONS[r][0] for r in region]),
+            'created_at': self._timestamp(n),
+            'updated_at': self._timestamp(n),
+        })
+
+    # Large entity tables
+
+    def _artisan_regions(self):
+        """Region of every artisan: artisans cluster in a few popular craft regions"""
+        rng = self._rng('artisans')
+        region_rank = rng.permutation(len(REGIONS))
+        ranks = sample_cdf(rng, zipf_cdf(len(REGIONS), 1.0), self.num_artisans)
+        return region_rank[ranks]
+
+    def artisans(self):
+        artisan_region = self._artisan_regions()
+        dominant = np.array([self.category_index[r[2]] for r in REGIONS])
+
+        for chunk_index, start, stop in self._chunks(self.num_artisans):
+            rng = self._rng('artisans', chunk_index)
+            n = stop - start
+            region = artisan_region[start:stop]
+
+            # Most artisans practise their region's dominant craft
+            category = np.where(rng.random(n) < 0.8, dominant[region], rng.integers(0, len(CATEGORIES), n))
+            craft = np.array([c[2] for c in CATEGORIES])[category]
+            location = np.array([r[0] for r in REGIONS])[region]
+            state = np.array([r[1] for r in REGIONS])[region]
+            names = np.char.add(np.char.add(rng.choice(FIRST_NAMES, n), ' '), rng.choice(LAST_NAMES, n))
+            years = rng.integers(1, 50, n)
+
+            yield pd.DataFrame({
+                'artisan_id': make_ids('art', start + 1, stop + 1),
+                'name': names,
+                'location': location,
+                'craft_type': craft,
+                'bio': np.char.add(np.char.add(np.char.add(np.char.add('Skilled ', craft), ' artisan from '),
+                                               np.char.add(location, ', ')), state),
+                'image_url': '',
+                'contact_info': np.char.add('+91 9', np.char.zfill(rng.integers(0, 10 ** 9, n).astype(str), 9)),
+                'years_active': years,
+                'created_at': self._timestamp(n),
+                'updated_at': self._timestamp(n),
+            })
+
+    def _product_attributes(self):
+        """Per-product arrays needed by later tables (artisan, category, region, price),
+        kept for the whole run: O(num_products) memory, 32 bytes per product"""
+        if hasattr(self, '_products_cache'):
+            return self._products_cache
+
+        rng = self._rng('products')
+        artisan_region = self._artisan_regions()
+        dominant = np.array([self.category_index[r[2]] for r in REGIONS])
+
+        # Prolific artisans own many products (Zipf over a shuffled artisan ranking)
+        artisan_rank = rng.permutation(self.num_artisans)
+        artisan = artisan_rank[sample_cdf(rng, zipf_cdf(self.num_artisans, self.zipf_s), self.num_products)]
+        region = artisan_region[artisan]
+        category = np.where(rng.random(self.num_products) < 0.85, dominant[region],
+                            rng.integers(0, len(CATEGORIES), self.num_products))
+
+        median = np.array([c[1] for c in CATEGORIES], dtype=np.float64)[category]
+        price = np.round(median * rng.lognormal(0.0, 0.5, self.num_products), 2).astype(np.float64)
+
+        self._products_cache = (artisan, category, region, price)
+        return self._products_cache
+
+    def products(self):
+        artisan, category, region, price = self._product_attributes()
+        category_names = np.array([c[0] for c in CATEGORIES])
+        region_names = np.array([r[0] for r in REGIONS])
+
+        for chunk_index, start, stop in self._chunks(self.num_products):
+            rng = self._rng('products', chunk_index)
+            n = stop - start
+            cat_name = category_names[category[start:stop]]
+            reg_name = region_names[region[start:stop]]
+            names = np.char.add(np.char.add(np.char.add(rng.choice(PRODUCT_ADJECTIVES, n), ' '),
+                                            np.char.add(reg_name, ' ')), cat_name)
+
+            yield pd.DataFrame({
+                'product_id': make_ids('prd', start + 1, stop + 1),
+                'name': names,
+                'description': np.char.add('Handcrafted ', np.char.lower(names)),
+                'price': price[start:stop],
+                'artisan_id': format_ids('art', artisan[start:stop] + 1),
+                'category_id': self.category_ids[category[start:stop]],
+                'region_id': self.region_ids[region[start:stop]],
+                'is_gi_tagged': rng.random(n) < 0.15,
+                'gi_tag_id': None,
+                'story_id': None,
+                'dimensions': np.char.add(np.char.add(rng.integers(10, 120, n).astype(str), 'cm x '),
+                                          np.char.add(rng.integers(10, 120, n).astype(str), 'cm')),
+                'weight': np.round(rng.uniform(0.1, 5.0, n), 2),
+                'materials': 'Traditional materials',
+                'created_at': self._timestamp(n),
+                'updated_at': self._timestamp(n),
+            })
+
+    def _product_partners(self, products):
+        """Partner offers for a set of products: (count, partner index per slot)
+
+        Offers are a pure function of the product index so order lines can be
+        matched to a real offer without keeping the link table in memory. The
+        stride is coprime with the number of partners, so a product's slots are
+        distinct partners.
+        """
+        count = 1 + (products * 2654435761 % 7919) % MAX_PARTNERS_PER_PRODUCT
+        offset = (products * 40503) % self.num_partners
+        strides = np.array([s for s in range(1, max(2, self.num_partners)) if math.gcd(s, self.num_partners) == 1])
+        stride = strides[products % len(strides)]
+        slots = (offset[:, None] + stride[:, None] * np.arange(MAX_PARTNERS_PER_PRODUCT)) % self.num_partners
+        return np.minimum(count, self.num_partners), slots
+
+    def product_partner(self):
+        _, _, _, price = self._product_attributes()
+        partner_ids = make_ids('prt', 1, self.num_partners + 1)
+
+        for chunk_index, start, stop in self._chunks(self.num_products):
+            rng = self._rng('product_partner', chunk_index)
+            products = np.arange(start, stop)
+            count, slots = self._product_partners(products)
+
+            # Flatten (product, slot) pairs for every offer
+            mask = np.arange(MAX_PARTNERS_PER_PRODUCT)[None, :] < count[:, None]
+            product_index = np.repeat(products, count)
+            partner_index = slots[mask]
+            slot_index = np.nonzero(mask)[1]
+            n = len(product_index)
+            product_ids = format_ids('prd', product_index + 1)
+
+            yield pd.DataFrame({
+                'id': np.char.add(np.char.add(product_ids, '-'), slot_index.astype(str)),
+                'product_id': product_ids,
+                'partner_id': partner_ids[partner_index],
+                'price': np.round(price[product_index] * rng.uniform(0.9, 1.1, n), 2),
+                'shipping_fee': np.round(rng.uniform(100, 150, n), 2),
+                'availability': AVAILABILITY[sample_cdf(rng, np.array([0.7, 0.9, 1.0]), n)],
+                'estimated_delivery': rng.choice(DELIVERY_ESTIMATES, n),
+                'created_at': self._timestamp(n),
+                'updated_at': self._timestamp(n),
+            })
+
+    def customers(self):
+        region_names = np.array([r[0] for r in REGIONS])
+        states = np.array([r[1] for r in REGIONS])
+
+        for chunk_index, start, stop in self._chunks(self.num_customers):
+            rng = self._rng('customers', chunk_index)
+            n = stop - start
+            first = rng.choice(FIRST_NAMES, n)
+            last = rng.choice(LAST_NAMES, n)
+            ids = make_ids('cus', start + 1, stop + 1)
+            region = rng.integers(0, len(REGIONS), n)
+
+            yield pd.DataFrame({
+                'customer_id': ids,
+                'name': np.char.add(np.char.add(first, ' '), last),
+                'email': np.char.add(np.char.add(np.char.lower(np.char.add(np.char.add(first, '.'), last)),
+                                                 np.char.add('.', ids)), '@example.com'),
+                'password_hash': 'hashed_password_placeholder',
+                'address': np.char.add(np.char.add(np.char.add(rng.integers(1, 999, n).astype(str), ' Main Road, '),
+                                                   np.char.add(region_names[region], ', ')), states[region]),
+                'phone': np.char.add('+91 8', np.char.zfill(rng.integers(0, 10 ** 9, n).astype(str), 9)),
+                'created_at': self._timestamp(n),
+                'updated_at': self._timestamp(n),
+            })
+
+    def _order_dates(self, rng, n):
+        """Seasonal order timestamps within the `years` before as_of"""
+        start = self.as_of - pd.DateOffset(years=self.years)
+        days = pd.date_range(start, self.as_of, freq='D', inclusive='left')
+        weights = MONTH_WEIGHTS[days.month.to_numpy() - 1]
+        day = sample_cdf(rng, np.cumsum(weights) / weights.sum(), n)
+        seconds = rng.integers(0, 86400, n)
+        return days.to_numpy()[day] + seconds.astype('timedelta64[s]')
+
+    def orders_and_items(self):
+        """Yield (orders_chunk, order_items_chunk) pairs"""
+        _, _, _, price = self._product_attributes()
+        product_rank = self._rng('orders').permutation(self.num_products)
+        popularity = zipf_cdf(self.num_products, self.zipf_s)
+        customer_cdf = zipf_cdf(self.num_customers, 0.6)
+        partner_ids = make_ids('prt', 1, self.num_partners + 1)
+        commission = next(self.partner_sites())['commission_rate'].to_numpy()
+
+        for chunk_index, start, stop in self._chunks(self.num_orders):
+            rng = self._rng('orders', chunk_index)
+            n = stop - start
+            order_ids = make_ids('ord', start + 1, stop + 1)
+            order_dates = self._order_dates(rng, n)
+
+            # 1-5 lines per order, most orders are small
+            num_items = np.minimum(rng.geometric(0.55, n), 5)
+            line_order = np.repeat(np.arange(n), num_items)
+            m = len(line_order)
+
+            # Popular products appear in far more orders than the long tail
+            product = product_rank[sample_cdf(rng, popularity, m)]
+            count, slots = self._product_partners(product)
+            partner = slots[np.arange(m), rng.integers(0, MAX_PARTNERS_PER_PRODUCT, m) % count]
+
+            quantity = rng.integers(1, 4, m)
+            line_price = np.round(price[product] * rng.uniform(0.9, 1.1, m), 2)
+            subtotal = np.round(line_price * quantity, 2)
+            fee = subtotal * commission[partner] / 100
+
+            total_amount = np.round(np.bincount(line_order, weights=subtotal, minlength=n) + 150, 2)
+            platform_fee = np.round(np.bincount(line_order, weights=fee, minlength=n), 2)
+
+            # Older orders are more likely to have completed
+            age_days = (np.datetime64(self.as_of) - order_dates).astype('timedelta64[D]').astype(np.int64)
+            status = np.where(age_days > 14, np.where(rng.random(n) < 0.95, 2, 3),
+                              rng.integers(0, 3, n))
+            status_names = ORDER_STATUSES[status]
+            tracking = np.char.add('TRK', np.char.zfill(rng.integers(0, 10 ** 8, n).astype(str), 8))
+            customer = sample_cdf(rng, customer_cdf, n)
+            date_strings = np.datetime_as_string(order_dates, unit='s')
+
+            orders = pd.DataFrame({
+                'order_id': order_ids,
+                'customer_id': format_ids('cus', customer + 1),
+                'order_date': date_strings,
+                'total_amount': total_amount,
+                'status': status_names,
+                'shipping_address': 'Address on file',
+                'payment_method': rng.choice(PAYMENT_METHODS, n),
+                'tracking_number': np.where(status_names == 'Processing', None, tracking),
+                'platform_fee': platform_fee,
+                'created_at': date_strings,
+                'updated_at': date_strings,
+            })
+
+            line_number = np.arange(m) - np.repeat(np.cumsum(num_items) - num_items, num_items)
+            items = pd.DataFrame({
+                'item_id': np.char.add(np.char.add(order_ids[line_order], '-'), line_number.astype(str)),
+                'order_id': order_ids[line_order],
+                'product_id': format_ids('prd', product + 1),
+                'partner_id': partner_ids[partner],
+                'quantity': quantity,
+                'price': line_price,
+                'subtotal': subtotal,
+                'created_at': date_strings[line_order],
+            })
+
+            yield orders, items
+
+    def write(self, output_dir, fmt='csv', tables=None):
+        """Generate every table and stream it to output_dir"""
+        os.makedirs(output_dir, exist_ok=True)
+        extension = {'csv': 'csv', 'ndjson': 'ndjson', 'json': 'json'}[fmt]
+        tables = tables or list(TABLE_COLUMNS)
+        paths = {}
+
+        def writer(table):
+            return ChunkWriter(os.path.join(output_dir, f'{table}.{extension}'), fmt)
+
+        for table in ['regions', 'categories', 'partner_sites', 'artisans', 'products',
+                      'product_partner', 'customers']:
+            if table not in tables:
+                continue
+            out = writer(table)
+            for chunk in getattr(self, table)():
+                out.write(chunk[TABLE_COLUMNS[table]])
+            paths[table] = out.close()
+
+        if 'orders' in tables or 'order_items' in tables:
+            orders_out = writer('orders') if 'orders' in tables else None
+            items_out = writer('order_items') if 'order_items' in tables else None
+            for orders, items in self.orders_and_items():
+                if orders_out:
+                    orders_out.write(orders[TABLE_COLUMNS['orders']])
+                if items_out:
+                    items_out.write(items[TABLE_COLUMNS['order_items']])
+            if orders_out:
+                paths['orders'] = orders_out.close()
+            if items_out:
+                paths['order_items'] = items_out.close()
+
+        return paths
+
+
+# Main execution
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate synthetic marketplace datasets')
+    parser.add_argument('--output-dir', default='synthetic_data', help='directory to write tables to')
+    parser.add_argument('--format', choices=['csv', 'ndjson', 'json'], default='csv')
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--artisans', type=int, default=20000)
+    parser.add_argument('--partners', type=int, default=50)
+    parser.add_argument('--customers', type=int, default=50000)
+    parser.add_argument('--orders', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=100000, help='rows generated and written per chunk')
+    parser.add_argument('--zipf-s', type=float, default=1.1, help='Zipf exponent for product popularity')
+    parser.add_argument('--tables', nargs='*', choices=list(TABLE_COLUMNS), help='only generate these tables')
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(
+        num_products=args.products,
+        num_artisans=args.artisans,
+        num_partners=args.partners,
+        num_customers=args.customers,
+        num_orders=args.orders,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        zipf_s=args.zipf_s
+    )
+
+    print("Generating synthetic datasets...")
+    generator.write(args.output_dir, fmt=args.format, tables=args.tables)
+    print(f"Synthetic data written to: {args.output_dir}")
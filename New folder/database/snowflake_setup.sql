@@ -343,6 +343,7 @@ $$
                 ps.name,
                 ps.rating,
                 ps.review_count,
+                ps.commission_rate,
                 pp.price,
                 pp.shipping_fee,
                 pp.availability,
@@ -362,10 +363,11 @@ $$
                 name: partner_result.getColumnValue(2),
                 rating: partner_result.getColumnValue(3),
                 review_count: partner_result.getColumnValue(4),
-                price: partner_result.getColumnValue(5),
-                shipping_fee: partner_result.getColumnValue(6),
-                availability: partner_result.getColumnValue(7),
-                estimated_delivery: partner_result.getColumnValue(8)
+                commission_rate: partner_result.getColumnValue(5),
+                price: partner_result.getColumnValue(6),
+                shipping_fee: partner_result.getColumnValue(7),
+                availability: partner_result.getColumnValue(8),
+                estimated_delivery: partner_result.getColumnValue(9)
             });
         }
         
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Typed Intermediate Tables for Handicraft Marketplace Platform
+
+Every table passed between ETL stages has an explicit schema here. Tables are
+conformed to their schema when written and stored as zstd-compressed Parquet,
+which later stages read through a memory map with their types intact (lists
+stay lists, booleans stay booleans, timestamps stay timestamps). CSV is only
+produced as an export for the warehouse load.
+
+Tables can be written in one go or appended chunk by chunk with TableWriter,
+so a streaming stage never holds its whole output in memory.
+
+Parquet needs pyarrow (listed in requirements.txt). Without it, tables are
+written as a stream of pickled chunks, which keep the same types but are
+neither compressed nor memory-mapped, and a warning says so.
+"""
+
+import os
+import json
+import pickle
+import warnings
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+    warnings.warn("pyarrow is not installed: ETL intermediates fall back to uncompressed, non-memory-mapped "
+                  "pickles (pip install -r requirements.txt)", RuntimeWarning)
+
+INTERMEDIATE_EXTENSION = '.parquet' if pa is not None else '.pkl'
+PARQUET_COMPRESSION = 'zstd'
+
+# Column types: string, int64, float64, bool, timestamp, date, list<string>
+TIMESTAMPS = {'created_at': 'timestamp', 'updated_at': 'timestamp'}
+
+TABLE_SCHEMAS = {
+    'artisans': {
+        'artisan_id': 'string', 'state': 'string', 'name': 'string', 'location': 'string',
+        'craft_type': 'string', 'contact_info': 'string', 'years_active': 'int64',
+        **TIMESTAMPS, 'bio': 'string', 'image_url': 'string',
+    },
+    'artisan_merges': {
+        'artisan_id': 'string', 'canonical_artisan_id': 'string',
+    },
+    'gi_tags': {
+        'gi_tag_id': 'string', 'region_id': 'string', 'name': 'string', 'description': 'string',
+        'region_name': 'string', 'state': 'string', 'issue_date': 'date', 'issuing_body': 'string',
+        **TIMESTAMPS,
+    },
+    'regions': {
+        'region_id': 'string', 'name': 'string', 'state': 'string', 'description': 'string',
+        'famous_for': 'string', 'image_url': 'string', **TIMESTAMPS,
+    },
+    'products': {
+        'product_id': 'string', 'artisan_id': 'string', 'category_id': 'string', 'region_id': 'string',
+        'story_id': 'string', 'name': 'string', 'description': 'string', 'price': 'float64',
+        'category_name': 'string', 'image_url': 'string', 'region_name': 'string', 'artisan_name': 'string',
+        'materials': 'string',
+        'dimensions': 'string', 'weight': 'float64', 'is_gi_tagged': 'bool', 'gi_tag_id': 'string',
+        'image_urls': 'list<string>', **TIMESTAMPS,
+    },
+    'categories': {
+        'category_id': 'string', 'name': 'string', 'description': 'string', 'image_url': 'string',
+        **TIMESTAMPS,
+    },
+    'cultural_stories': {
+        'story_id': 'string', 'title': 'string', 'content': 'string', 'history': 'string',
+        'cultural_significance': 'string', 'image_urls': 'list<string>', 'video_url': 'string',
+        **TIMESTAMPS,
+    },
+    'tourist_stats': {
+        'stat_id': 'string', 'region_id': 'string', 'region_name': 'string', 'year': 'int64',
+        'domestic_count': 'int64', 'foreign_count': 'int64', 'growth_rate': 'float64',
+        'peak_season': 'string', **TIMESTAMPS,
+    },
+    'partner_sites': {
+        'partner_id': 'string', 'name': 'string', 'website_url': 'string', 'rating': 'float64',
+        'review_count': 'int64', 'commission_rate': 'float64', 'shipping_options': 'string',
+        'contact_info': 'string', 'logo_url': 'string', 'description': 'string', **TIMESTAMPS,
+    },
+    'product_partner': {
+        'id': 'string', 'product_id': 'string', 'partner_id': 'string', 'price': 'float64',
+        'shipping_fee': 'float64', 'availability': 'string', 'estimated_delivery': 'string',
+        **TIMESTAMPS,
+    },
+    'customers': {
+        'customer_id': 'string', 'name': 'string', 'email': 'string', 'password_hash': 'string',
+        'address': 'string', 'phone': 'string', **TIMESTAMPS,
+    },
+    'orders': {
+        'order_id': 'string', 'customer_id': 'string', 'order_date': 'timestamp', 'total_amount': 'float64',
+        'status': 'string', 'shipping_address': 'string', 'payment_method': 'string',
+        'tracking_number': 'string', 'platform_fee': 'float64', **TIMESTAMPS,
+    },
+    'order_items': {
+        'item_id': 'string', 'order_id': 'string', 'product_id': 'string', 'partner_id': 'string',
+        'quantity': 'int64', 'price': 'float64', 'subtotal': 'float64', 'created_at': 'timestamp',
+    },
+}
+
+if pa is not None:
+    ARROW_TYPES = {
+        'string': pa.string(), 'int64': pa.int64(), 'float64': pa.float64(), 'bool': pa.bool_(),
+        'timestamp': pa.timestamp('us'), 'date': pa.date32(), 'list<string>': pa.list_(pa.string()),
+    }
+
+
+def schema_of(table):
+    """Column types of a table; staging copies share the schema of the final table"""
+    return TABLE_SCHEMAS[os.path.basename(table)]
+
+
+def parse_list(value):
+    """A list column value, from a list, an array read back from Parquet or legacy CSV text"""
+    if isinstance(value, str):
+        value = json.loads(value.replace("'", '"')) if value.strip() else []
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return []
+    return [str(item) for item in value]
+
+
+def conform(df, table):
+    """Return df with exactly the table's columns, in schema order, cast to the schema types"""
+    schema = schema_of(table)
+    if df.empty:
+        df = df.reindex(columns=list(schema))
+    missing = [col for col in schema if col not in df.columns]
+    if missing:
+        raise KeyError(f"{table} is missing columns {missing}")
+
+    columns = {}
+    for col, kind in schema.items():
+        values = df[col]
+        if kind == 'string':
+            values = values.astype(object).where(values.notna(), None)
+            if pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+                values = values.map(lambda v: v if v is None else str(v))
+            columns[col] = values
+        elif kind in ('int64', 'float64'):
+            columns[col] = pd.to_numeric(values).astype(kind)
+        elif kind == 'bool':
+            if values.dtype == object or pd.api.types.is_string_dtype(values):
+                values = values.astype(str).str.strip().str.lower().isin(['true', '1', 'yes'])
+            columns[col] = values.astype(bool)
+        elif kind == 'timestamp':
+            columns[col] = pd.to_datetime(values, format='ISO8601').astype('datetime64[us]')
+        elif kind == 'date':
+            dates = pd.to_datetime(values, errors='coerce')
+            columns[col] = pd.Series(dates.dt.date, dtype=object).where(dates.notna(), None)
+        elif kind == 'list<string>':
+            columns[col] = values.map(parse_list)
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(df)))
+
+
+class TableWriter:
+    """Append conformed chunks to a table file. The file only replaces the previous
+    output when the writer is closed without an error.
+
+        with TableWriter(path, 'artisans') as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path, table):
+        self.path = path
+        self.table = table
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.rows = 0
+        self._writer = None
+        self._file = None
+
+    def write(self, df):
+        df = conform(df, self.table)
+        if pa is not None:
+            if self._writer is None:
+                schema = pa.schema([(col, ARROW_TYPES[kind]) for col, kind in schema_of(self.table).items()])
+                self._writer = pq.ParquetWriter(self.tmp_path, schema, compression=PARQUET_COMPRESSION)
+            self._writer.write_table(pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False))
+        else:
+            if self._file is None:
+                self._file = open(self.tmp_path, 'wb')
+            pickle.dump(df, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows += len(df)
+
+    def close(self):
+        # An empty table still gets a file with its schema
+        if self._writer is None and self._file is None:
+            self.write(pd.DataFrame())
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        for handle in (self._writer, self._file):
+            if handle is not None:
+                handle.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def write_table(df, path, table):
+    """Write a conformed table, replacing any previous file atomically"""
+    with TableWriter(path, table) as writer:
+        writer.write(df)
+
+
+def read_table(path, table, columns=None):
+    """Read a table written by write_table or TableWriter, memory-mapping the file when it is Parquet"""
+    if pa is None:
+        chunks = []
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    chunks.append(pickle.load(f))
+                except EOFError:
+                    break
+        df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+        return df[columns] if columns is not None else df
+
+    df = pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    # Parquet list columns come back as arrays
+    for col, kind in schema_of(table).items():
+        if kind == 'list<string>' and col in df.columns:
+            df[col] = df[col].map(parse_list)
+    return df
+
+
+def export_csv(df, path, table):
+    """Write a table as CSV for the warehouse load (list columns as JSON arrays)"""
+    df = df.copy()
+    for col, kind in schema_of(table).items():
+        if kind == 'list<string>':
+            df[col] = df[col].map(json.dumps)
+    df.to_csv(path, index=False)
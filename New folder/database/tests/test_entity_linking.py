@@ -0,0 +1,71 @@
+"""
+Tests for the match keys used by entity linking.
+
+Run from the database directory:
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entity_linking import match_keys, canonical_states, link_products
+
+# The variant pairs documented next to TRANSLITERATION_RULES
+TRANSLITERATION_PAIRS = [
+    ('Meenakari', 'Minakari'),
+    ('Laddoo', 'Laddu'),
+    ('Laddu', 'Ladu'),
+    ('Uttar', 'Utar'),
+    ('Bhadohi', 'Badohi'),
+    ('Kheda', 'Keda'),
+    ('Maharashtra', 'Maharastra'),
+    ('Warli', 'Varli'),
+    ('Zari', 'Jari'),
+]
+
+
+@pytest.mark.parametrize('left, right', TRANSLITERATION_PAIRS)
+def test_transliteration_variants_share_a_key(left, right):
+    left_key, right_key = match_keys([left, right])
+    assert left_key == right_key
+
+
+def test_compact_keys_ignore_spaces_and_case():
+    assert match_keys(['UTTARPRADESH'], compact=True)[0] == match_keys(['Uttar Pradesh'], compact=True)[0]
+
+
+def test_state_aliases_resolve_to_canonical_names():
+    assert canonical_states(['MAHARASTRA', 'Orissa', 'UP', 'Atlantis']).tolist() == \
+        ['Maharashtra', 'Odisha', 'Uttar Pradesh', 'Atlantis']
+
+
+def test_products_link_only_to_the_artisan_they_name():
+    regions = pd.DataFrame({'region_id': ['r1', 'r2'], 'name': ['Jaipur', 'Varanasi'], 'state': ['Rajasthan', 'UP']})
+    artisans = pd.DataFrame({
+        'artisan_id': ['a1', 'a2', 'a3'],
+        'name': ['Ramesh Kumar', 'Ramesh Kumar', 'Sita Devi'],
+        'state': ['Rajasthan', 'Uttar Pradesh', 'Bihar'],
+        'craft_type': ['Potter', 'Potter', 'Potter'],
+    })
+    products = pd.DataFrame({
+        'product_id': ['p1', 'p2', 'p3'],
+        'name': ['Blue Pottery Vase'] * 3,
+        'region_name': ['Varanasi', 'Jaipur', 'Jaipur'],
+        'category_name': ['Pottery'] * 3,
+        'story_id': ['s1', 's2', 's3'],
+        'artisan_name': ['Ramesh Kumar', 'Seeta Devi', ''],
+    })
+    linked, reports = link_products(
+        products, regions, pd.DataFrame({'gi_tag_id': [], 'name': [], 'region_id': []}),
+        pd.DataFrame({'category_id': ['c1'], 'name': ['Pottery']}), pd.DataFrame({'story_id': ['s1', 's2', 's3']}), artisans)
+
+    # Same-state namesake first, else the only artisan of that name; no maker, no link
+    assert linked['artisan_id'].tolist()[:2] == ['a2', 'a3']
+    assert pd.isna(linked['artisan_id'].iloc[2])
+    report = next(r for r in reports if r['link'] == 'products.artisan_id')
+    assert (report['matched'], report['rows']) == (2, 3)
@@ -178,7 +178,13 @@ export const authService = {
   },
 
   // Logout user
-  logout: () => {
+  logout: async () => {
+    // Revoke both tokens server-side; clear them locally even if the request fails
+    try {
+      await apiClient.post('/auth/logout', { refresh_token: localStorage.getItem('refreshToken') });
+    } catch (error) {
+      console.error('Error logging out:', error);
+    }
     localStorage.removeItem('accessToken');
     localStorage.removeItem('refreshToken');
     return true;